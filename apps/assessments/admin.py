@@ -26,6 +26,7 @@ class AssessmentAdmin(admin.ModelAdmin):
     )
     list_filter = ('team',)
     search_fields = ('team__name',)
+    readonly_fields = ('peak_scores',)
 
     list_select_related = (
         "team",
@@ -55,6 +56,23 @@ class AssessmentAdmin(admin.ModelAdmin):
             rel = getattr(obj, "final_reports", None) or getattr(obj, "finalreport_set", None)
             return bool(rel and rel.exists())
 
+    @admin.display(description="Peak scores")
+    def peak_scores(self, obj):
+        """Per-peak score and range: the frozen snapshot if taken, else the live counters."""
+        if not obj.pk:
+            return "—"
+        from apps.reports.models import ScoreSnapshot
+        from apps.reports.histograms import get_live_histograms
+        from apps.reports.scoring import get_peak_scores
+        snap = ScoreSnapshot.objects.filter(assessment=obj).first()
+        scores = snap.peaks if snap else get_peak_scores(obj, histograms=get_live_histograms(obj))
+        if not scores:
+            return "No answers yet"
+        return ", ".join(
+            f"{code}: {row['score']}% ({row['range_label']})"
+            for code, row in sorted(scores.items())
+        )
+
 @admin.register(AssessmentParticipant)
 class AssessmentParticipantAdmin(admin.ModelAdmin):
     list_display = ('team_member', 'assessment', 'has_submitted', 'token',)
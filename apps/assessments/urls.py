@@ -11,4 +11,5 @@ urlpatterns = [
     path('resend/<int:participant_id>/', views.resend_invite, name='resend_invite'),
     path('start/<uuid:token>/', views.start_assessment, name='start_assessment'),
     path('delete/<int:assessment_id>/', views.delete_assessment, name='delete_assessment'),
+    path('live-results/<int:assessment_id>/', views.live_results, name='live_results'),
 ]
\ No newline at end of file
@@ -1,14 +1,18 @@
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.http import HttpResponse
 from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import render, get_object_or_404, redirect
 from django.template.loader import render_to_string
-from .models import TeamMember, Question, Answer, Assessment, AssessmentParticipant
+from .models import TeamMember, Peak, Question, Answer, Assessment, AssessmentParticipant
 from apps.teams.models import Team
+from apps.reports.histograms import get_live_histograms, record_answers
+from apps.reports.scoring import get_peak_scores
+from apps.reports.snapshots import maybe_snapshot_completed
 from datetime import datetime
 from anymail.message import AnymailMessage
 
@@ -51,6 +55,48 @@ def assessments_overview(request):
         "assessments": assessments,
         "selected_assessment": selected_assessment,
         "participants": participants,
+        **_live_results_context(selected_assessment),
+    })
+
+
+def _live_results_context(assessment):
+    """
+    Peak scores for an assessment that is still open, read only from the
+    QuestionHistogram counters (never from Answer rows).
+    """
+    fr = getattr(assessment, "final_report", None) if assessment else None
+    if not assessment or (fr and fr.s3_key):
+        return {"live_results": None}
+
+    scores = get_peak_scores(assessment, histograms=get_live_histograms(assessment))
+    live_results = [
+        {"code": peak.code, "name": peak.name, **scores[peak.code]}
+        for peak in Peak.objects.order_by("code")
+        if peak.code in scores
+    ]
+    return {"live_results": live_results}
+
+
+def _snapshot_if_complete(assessment):
+    try:
+        maybe_snapshot_completed(assessment)
+    except Exception:
+        logger.exception("start_assessment: snapshot_failed",
+                         extra={"assessment_id": assessment.id})
+
+
+# HTMX refresh of the live results panel on the overview page
+@login_required
+def live_results(request, assessment_id):
+    assessment = get_object_or_404(
+        Assessment.objects.select_related("final_report"),
+        id=assessment_id,
+        team__admin=request.user,
+        launched_at__isnull=False,
+    )
+    return render(request, "assessments/_live_results.html", {
+        "selected_assessment": assessment,
+        **_live_results_context(assessment),
     })
 
 
@@ -306,18 +352,30 @@ def start_assessment(request, token):
     questions = Question.objects.all()
 
     if request.method == "POST":
-        for question in questions:
-            field_name = f"question_{question.id}"
-            score = request.POST.get(field_name)
-            if score:
-                Answer.objects.create(
-                    participant=participant,
-                    question=question,
-                    value=int(score)
-                )
-        participant.has_submitted = True
-        participant.save()
-        
+        # Answers and histogram counters are written together; the row lock
+        # stops a double-submit from counting the same participant twice.
+        with transaction.atomic():
+            participant = AssessmentParticipant.objects.select_for_update().get(pk=participant.pk)
+            if participant.has_submitted:
+                return render(request, "assessments/submit.html", {"member": member, "member_name": member_name})
+
+            values_by_question = {}
+            for question in questions:
+                field_name = f"question_{question.id}"
+                score = request.POST.get(field_name)
+                if score:
+                    Answer.objects.create(
+                        participant=participant,
+                        question=question,
+                        value=int(score)
+                    )
+                    values_by_question[question.id] = int(score)
+            record_answers(assessment, values_by_question)
+            participant.has_submitted = True
+            participant.save()
+            # Freeze the scores once the last participant is in
+            transaction.on_commit(lambda: _snapshot_if_complete(assessment))
+
         # Email confirmation to the team member respondent
         try:
             msg_thanks = AnymailMessage(
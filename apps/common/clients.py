@@ -0,0 +1,156 @@
+"""
+Shared outbound clients, one of each per process: S3, DocRaptor, Stripe
+and a plain requests.Session for everything else.
+
+Each client keeps a keep-alive connection pool, so views and workers reuse
+TLS connections instead of building a boto3 session / DocApi / socket per
+request. Timeouts, retries and pool sizes come from the OUTBOUND_* settings.
+
+Fork-safe: a forked child (gunicorn preload, multiprocessing "fork") never
+reuses its parent's sockets; the registry is dropped after fork and
+rebuilt on first use.
+
+    from apps.common.clients import s3_client, docraptor_client, stripe_client, http_session
+"""
+import os
+import threading
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_clients = {}
+_pid = os.getpid()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _timeout():
+    return (_setting("OUTBOUND_CONNECT_TIMEOUT", 5), _setting("OUTBOUND_READ_TIMEOUT", 60))
+
+
+# --- Factories (heavy SDKs are imported on first use) ---
+def _build_http():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class TimeoutSession(requests.Session):
+        """requests.Session with a default timeout; callers may still pass their own."""
+
+        def request(self, method, url, **kwargs):
+            kwargs.setdefault("timeout", _timeout())
+            return super().request(method, url, **kwargs)
+
+    pool = _setting("OUTBOUND_HTTP_POOL_SIZE", 10)
+    retries = Retry(
+        total=_setting("OUTBOUND_HTTP_RETRIES", 3),
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),  # never replay POSTs
+    )
+    session = TimeoutSession()
+    adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _build_s3():
+    import boto3
+    from botocore.client import Config
+
+    connect, read = _timeout()
+    session = boto3.session.Session(
+        aws_access_key_id=_setting("AWS_ACCESS_KEY_ID", None) or None,
+        aws_secret_access_key=_setting("AWS_SECRET_ACCESS_KEY", None) or None,
+        region_name=_setting("AWS_S3_REGION_NAME", None) or None,
+    )
+    # boto3 clients are thread-safe (sessions are not); one per process is enough
+    return session.client(
+        "s3",
+        endpoint_url=_setting("AWS_S3_ENDPOINT_URL", None) or None,
+        config=Config(
+            signature_version=_setting("AWS_S3_SIGNATURE_VERSION", "s3v4"),
+            max_pool_connections=_setting("OUTBOUND_S3_POOL_SIZE", 10),
+            connect_timeout=connect,
+            read_timeout=read,
+            retries={"max_attempts": _setting("OUTBOUND_HTTP_RETRIES", 3), "mode": "standard"},
+        ),
+    )
+
+
+def _build_docraptor():
+    import docraptor
+    from urllib3.util.retry import Retry
+
+    configuration = docraptor.Configuration(username=_setting("DOCRAPTOR_API_KEY", ""))
+    configuration.connection_pool_maxsize = _setting("OUTBOUND_HTTP_POOL_SIZE", 10)
+    configuration.retries = Retry(
+        total=_setting("OUTBOUND_HTTP_RETRIES", 3),
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),  # status polls only; creating a doc is not idempotent
+    )
+    return docraptor.DocApi(docraptor.ApiClient(configuration))
+
+
+def _build_stripe():
+    import stripe
+
+    stripe.api_key = _setting("STRIPE_SECRET_KEY", "")
+    stripe.max_network_retries = _setting("STRIPE_MAX_NETWORK_RETRIES", 2)  # Stripe retries with idempotency keys
+    stripe.default_http_client = stripe.RequestsClient(timeout=_timeout())
+    return stripe
+
+
+FACTORIES = {
+    "http": _build_http,
+    "s3": _build_s3,
+    "docraptor": _build_docraptor,
+    "stripe": _build_stripe,
+}
+
+
+def reset_clients():
+    """Forget every client (after fork, or in tests after changing settings)."""
+    global _pid
+    with _lock:
+        _clients.clear()
+        _pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_clients)
+
+
+def get_client(name):
+    """The process-wide client called `name` (see FACTORIES), built on first use."""
+    global _pid
+    client = _clients.get(name)
+    if client is not None and _pid == os.getpid():
+        return client
+    with _lock:
+        if _pid != os.getpid():  # belt and braces for forks register_at_fork missed
+            _clients.clear()
+            _pid = os.getpid()
+        if name not in _clients:
+            _clients[name] = FACTORIES[name]()
+        return _clients[name]
+
+
+def http_session():
+    return get_client("http")
+
+
+def s3_client():
+    return get_client("s3")
+
+
+def docraptor_client():
+    return get_client("docraptor")
+
+
+def stripe_client():
+    return get_client("stripe")
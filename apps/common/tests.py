@@ -0,0 +1,100 @@
+import json
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.common import clients
+
+# What a fresh web worker pays before serving its first request:
+# django.setup() plus URL resolution (which imports every view module).
+# Override on slow CI machines with IMPORT_BUDGET_MS / IMPORT_BUDGET_RSS_MB.
+IMPORT_BUDGET_MS = int(os.getenv("IMPORT_BUDGET_MS", "1000"))
+IMPORT_BUDGET_RSS_MB = int(os.getenv("IMPORT_BUDGET_RSS_MB", "80"))
+
+# Only loaded where they are used (chart drawing, checkout, PDF jobs, S3)
+LAZY_MODULES = ["matplotlib", "numpy", "stripe", "docraptor", "boto3", "botocore"]
+
+BOOT_SCRIPT = """
+import json, resource, sys
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+def peak_rss_kb():
+    # ru_maxrss survives exec on Linux, so it would include the forking test
+    # runner's own peak; VmHWM belongs to this process image only
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "rss_kb": peak_rss_kb(),
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parse `python -X importtime` output into (total_ms, [(cumulative_ms, module)]).
+    total_ms sums the top-level imports only (nested ones are already included).
+    """
+    total_us = 0
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        us = int(cumulative)
+        rows.append((us / 1000, name.strip()))
+        if not name.startswith("  "):
+            total_us += us
+    return total_us / 1000, rows
+
+
+class ImportBudgetTests(SimpleTestCase):
+    def test_worker_boot_stays_within_import_budget(self):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT % (LAZY_MODULES,)],
+            capture_output=True, text=True, env=os.environ.copy(), timeout=120,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr[-2000:])
+
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        total_ms, rows = parse_importtime(proc.stderr)
+        slowest = ", ".join(f"{name} {ms:.0f}ms" for ms, name in sorted(rows, reverse=True)[:8])
+
+        self.assertEqual(result["loaded"], [], "heavy modules imported at boot")
+        self.assertLessEqual(total_ms, IMPORT_BUDGET_MS, f"import time {total_ms:.0f}ms; slowest: {slowest}")
+        rss_mb = result["rss_kb"] / 1024
+        self.assertLessEqual(rss_mb, IMPORT_BUDGET_RSS_MB, f"RSS after boot {rss_mb:.0f}MB")
+
+
+class ClientRegistryTests(SimpleTestCase):
+    def tearDown(self):
+        clients.reset_clients()
+
+    def test_one_client_per_process(self):
+        self.assertIs(clients.http_session(), clients.http_session())
+        self.assertIs(clients.s3_client(), clients.s3_client())
+
+    def test_forked_child_builds_its_own(self):
+        session = clients.http_session()
+        with mock.patch.object(clients.os, "getpid", return_value=os.getpid() + 1):
+            self.assertIsNot(clients.http_session(), session)
+
+    @override_settings(OUTBOUND_CONNECT_TIMEOUT=1, OUTBOUND_READ_TIMEOUT=2, OUTBOUND_HTTP_POOL_SIZE=3)
+    def test_http_session_defaults(self):
+        clients.reset_clients()
+        session = clients.http_session()
+        adapter = session.get_adapter("https://example.com")
+        self.assertEqual(adapter._pool_maxsize, 3)
+        with mock.patch("requests.Session.request") as request:
+            session.get("https://example.com")
+            session.get("https://example.com", timeout=9)
+        self.assertEqual(request.call_args_list[0].kwargs["timeout"], (1, 2))
+        self.assertEqual(request.call_args_list[1].kwargs["timeout"], 9)
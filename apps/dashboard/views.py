@@ -17,7 +17,7 @@ def dashboard_home(request):
     recent_assessments = (
         Assessment.objects
         .filter(team__admin=user, launched_at__isnull=False)
-        .select_related("team")
+        .select_related("team", "final_report", "score_snapshot")
         .order_by("-created_at")[:3]
     )
 
@@ -29,12 +29,22 @@ def dashboard_home(request):
             .order_by("has_submitted")  # False (incomplete) first
             
         )
+        # Scores are only shown once the report has been paid for
+        fr = getattr(assessment, "final_report", None)
+        snap = getattr(assessment, "score_snapshot", None)
+        peak_scores = []
+        if fr and fr.paid_at and snap:
+            peak_scores = [
+                {"code": code, **snap.peaks[code]} for code in sorted(snap.peaks)
+            ]
+
         assessments_data.append({
             "assessment": assessment,
             "team": assessment.team,
             "participants": participants,
             "total": participants.count(),
             "complete": participants.filter(has_submitted=True).count(),
+            "peak_scores": peak_scores,
         })
 
     # Reports 
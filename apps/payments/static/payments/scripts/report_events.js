@@ -0,0 +1,44 @@
+(function(){
+  "use strict";
+  // Follow report generation over Server-Sent Events. Every state change
+  // re-fetches the #report-status partial once; while the stream is up the
+  // partial's own (backing-off) polling is suppressed. If the stream drops,
+  // polling resumes until EventSource reconnects.
+  const box = document.getElementById('report-status');
+  const url = box && box.dataset.eventsUrl;
+  if (!url || !window.EventSource) return;
+
+  let live = false;
+  let refreshing = false;
+
+  function refresh(){
+    refreshing = true;
+    document.body.dispatchEvent(new CustomEvent('report:changed'));
+  }
+
+  document.body.addEventListener('htmx:beforeRequest', function(evt){
+    if (!evt.detail.elt || evt.detail.elt.id !== 'report-status') return;
+    if (refreshing){
+      refreshing = false;
+      return;
+    }
+    if (live) evt.preventDefault();
+  });
+
+  const source = new EventSource(url);
+  source.addEventListener('open', function(){ live = true; });
+  source.addEventListener('status', function(evt){
+    let data = {};
+    try { data = JSON.parse(evt.data); } catch (err) { /* ignore */ }
+    if (data.state === 'ready' || data.state === 'failed'){
+      source.close();
+      live = false;
+    }
+    refresh();
+  });
+  source.addEventListener('error', function(){
+    if (!live) return;
+    live = false;
+    refresh();  // restart the polling chain until the stream is back
+  });
+})();
@@ -1,3 +1,55 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.assessments.models import Assessment
+from apps.pdfexport import status
+from apps.pdfexport.models import FinalReport
+from apps.teams.models import Team
+
+
+@override_settings(REPORT_EVENTS_TICK_SECONDS=0.01, REPORT_EVENTS_MAX_SECONDS=5)
+class ReportProgressTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("admin", "admin@example.com", "pw")
+        team = Team.objects.create(name="Imperials", admin=cls.user)
+        cls.assessment = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+
+    def setUp(self):
+        cache.clear()
+
+    async def _events(self):
+        await self.async_client.aforce_login(self.user)
+        r = await self.async_client.get(f"/payments/report-events/{self.assessment.id}/")
+        self.assertEqual(r["Content-Type"], "text/event-stream")
+        return r, b"".join([chunk async for chunk in r.streaming_content]).decode()
+
+    async def test_stream_ends_once_the_report_is_ready(self):
+        await FinalReport.objects.acreate(assessment=self.assessment, s3_key="reports/x.pdf")
+        _, body = await self._events()
+        self.assertTrue(body.startswith("retry: 3000"))
+        self.assertIn('event: status\ndata: {"state": "ready", "error": ""}', body)
+
+    async def test_stream_pushes_published_changes(self):
+        status.publish_report_status(self.assessment.id, status.FAILED, "nope")
+        _, body = await self._events()
+        self.assertIn('"state": "failed"', body)
+        self.assertEqual(body.count("event: status"), 1)
+
+    async def test_stream_is_only_for_the_team_admin(self):
+        other = await get_user_model().objects.acreate_user("other", "other@example.com", "pw")
+        await self.async_client.aforce_login(other)
+        r = await self.async_client.get(f"/payments/report-events/{self.assessment.id}/")
+        self.assertEqual(r.status_code, 404)
+
+    def test_polling_fallback_backs_off(self):
+        self.client.force_login(self.user)
+        status.publish_report_status(self.assessment.id, status.RENDERING)
+        r = self.client.get(f"/payments/report-status/{self.assessment.id}/")
+        self.assertContains(r, "load delay:3s")
+        self.assertContains(r, "?attempt=1")
+        r = self.client.get(f"/payments/report-status/{self.assessment.id}/?attempt=20")
+        self.assertContains(r, "load delay:30s")
@@ -9,5 +9,6 @@ urlpatterns = [
     path("success/", views.checkout_success, name="checkout_success"),  # returns redirect to payments:success/<id> if paid
     path("success/<int:assessment_id>/", views.success, name="success"),  # the page that polls + kicks off DocRaptor
     path("report-status/<int:assessment_id>/", views.report_status, name="report_status"),  # HTMX polled partial
+    path("report-events/<int:assessment_id>/", views.report_events, name="report_events"),  # SSE stream (ASGI)
     path("webhook/", views.stripe_webhook_success, name="stripe_webhook"), 
 ]
\ No newline at end of file
@@ -1,28 +1,33 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
-import stripe
-import requests
-import docraptor
-from docraptor.rest import ApiException
-
 from apps.assessments.models import Assessment
+from apps.common.clients import stripe_client
+from apps.pdfexport import status as report_state
+from apps.pdfexport.jobs import enqueue_report_job
 from apps.pdfexport.models import FinalReport
-from apps.pdfexport.views import build_report_filenames
-from apps.pdfexport.utils.storage import S3Uploader
+from apps.pdfexport.status import aget_report_status, current_report_status
 
 import logging
 logger = logging.getLogger(__name__)
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+
+# --- Helper: Stripe SDK, imported on first use (large package; keeps worker boot light) ---
+def _stripe():
+    return stripe_client()
 
 
 @login_required
@@ -34,7 +39,7 @@ def checkout(request, assessment_id: int):
         return redirect(f"{reverse('assessments:assessments_overview')}?assessment={assessment.id}")
 
     price_id = getattr(settings, "STRIPE_PRICE_FINAL_REPORT", None)
-    price = stripe.Price.retrieve(price_id)
+    price = _stripe().Price.retrieve(price_id)
     amount_minor = price["unit_amount"]
     currency = price["currency"]
 
@@ -69,7 +74,7 @@ def create_checkout_session(request, assessment_id: int):
     ) + f"?assessment={assessment.id}"
 
     try:
-        session = stripe.checkout.Session.create(
+        session = _stripe().checkout.Session.create(
             mode="payment",
             line_items=[{"price": price_id, "quantity": 1}],
             allow_promotion_codes=True,
@@ -99,7 +104,7 @@ def checkout_success(request):
 
     # Optional: verify the session (not strictly required if webhook is authoritative)
     try:
-        sess = stripe.checkout.Session.retrieve(session_id, expand=["payment_intent"])
+        sess = _stripe().checkout.Session.retrieve(session_id, expand=["payment_intent"])
     except Exception:
         sess = None
 
@@ -127,6 +132,7 @@ def payment_return(request):
         return redirect("assessments:assessments_overview")
 
     try:
+        stripe = _stripe()
         pi = stripe.PaymentIntent.retrieve(pi_id) if pi_id else stripe.PaymentIntent.retrieve(client_secret)
     except Exception:
         messages.error(request, "Could not verify your payment.")
@@ -177,18 +183,29 @@ def success(request, assessment_id: int):
     })
 
 
+# --- Helper: HTMX fallback polling backs off 3s, 4.5s, 6.75s ... up to REPORT_POLL_MAX_SECONDS ---
+def _poll_interval(attempt):
+    cap = getattr(settings, "REPORT_POLL_MAX_SECONDS", 30)
+    return int(min(cap, 3 * 1.5 ** max(0, min(attempt, 20))))
+
+
 @login_required
 def report_status(request, assessment_id: int):
     """
-    HTMX polled endpoint:
+    HTMX polled endpoint (and what the SSE page script re-fetches on each event):
     - returns not-ready while queueing/processing
-    - when DocRaptor completes, downloads bytes, uploads to S3, marks FinalReport ready
-    - resilient to transient DocRaptor/S3 errors and double-writes
+    - reads the status published by the job queue and the DocRaptor watcher
+      (apps.pdfexport.status); no DocRaptor/S3 calls from here
+    - falls back to the FinalReport/ReportJob rows if the cache is cold
     """
     assessment = get_object_or_404(
         Assessment, pk=assessment_id, team__admin=request.user
     )
     fr = FinalReport.objects.filter(assessment=assessment).first()
+    try:
+        attempt = max(0, int(request.GET.get("attempt", 0)))
+    except ValueError:
+        attempt = 0
 
     # Default context
     ctx = {
@@ -197,110 +214,69 @@ def report_status(request, assessment_id: int):
         "ready": False,
         "status_text": None,
         "error": None,
+        "attempt": attempt + 1,
+        "retry_in": _poll_interval(attempt),
     }
 
-    # No FinalReport row yet (e.g., kickoff hasn’t persisted it); keep polling quietly.
-    if not fr:
-        ctx["status_text"] = "Starting…"
-        return render(request, "payments/_report_status.html", ctx)
-
-    # Already finalized
-    if fr.s3_key:
+    current = current_report_status(assessment.id)
+    state = current.get("state")
+    if state == report_state.READY and fr and fr.s3_key:
         ctx["ready"] = True
-        return render(request, "payments/_report_status.html", ctx)
-    
-    # Job id from DocRaptor
-    job_id = fr.docraptor_status_id
+    elif state == report_state.FAILED:
+        ctx["error"] = current.get("error") or "PDF generation failed. Please try again."
+    else:
+        ctx["stage"] = state
+        ctx["status_text"] = "Generating your report…"
+    return render(request, "payments/_report_status.html", ctx)
 
-    # We have a FinalReport row but no job id yet (kickoff in flight); keep polling.
-    if not job_id:
-        ctx["status_text"] = "Queuing…"
-        return render(request, "payments/_report_status.html", ctx)
 
-    # Ask DocRaptor for job status
-    client = docraptor.DocApi()
-    client.api_client.configuration.username = settings.DOCRAPTOR_API_KEY
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    try:
-        status = client.get_async_doc_status(job_id)
-    except ApiException as e:
-        # Hard failures: treat as error (let UI offer retry)
-        if getattr(e, "status", None) in (404, 422):
-            logger.error("DocRaptor status hard error for job %s (assessment %s): %s",
-                         job_id, assessment.id, e, exc_info=True)
-            ctx["error"] = "The PDF job could not be found or failed to initialize. Please try again."
-            return render(request, "payments/_report_status.html", ctx)
-        # Transient failures: keep polling
-        logger.warning("DocRaptor status transient error for job %s: %s", job_id, e)
-        ctx["status_text"] = "Still working…"
-        return render(request, "payments/_report_status.html", ctx)
-
-    st = getattr(status, "status", None)
-    if st in (None, "queued", "processing"):
-        ctx["status_text"] = "Generating your report…"
-        return render(request, "payments/_report_status.html", ctx)
-
-    if st == "failed":
-        # Log as much detail as possible, but don’t leak it to users.
-        detail = getattr(status, "message", None) or getattr(status, "validation_errors", None)
-        logger.error("DocRaptor job failed for assessment %s (job %s): %r", assessment.id, job_id, detail)
-        ctx["error"] = "PDF generation failed. Please try again."
-        return render(request, "payments/_report_status.html", ctx)
-
-    if st == "completed":
-        # Another poller could have just finished the upload
-        if fr.s3_key:
-            ctx["ready"] = True
-            return render(request, "payments/_report_status.html", ctx)
-
-        download_url = getattr(status, "download_url", None)
-        if not download_url:
-            # Rare but harmless; wait for DocRaptor to expose the URL.
-            ctx["status_text"] = "Finalizing…"
-            return render(request, "payments/_report_status.html", ctx)
-
-        # Fetch PDF
-        try:
-            r = requests.get(download_url, stream=True, timeout=60)
-            r.raise_for_status()
-            pdf_bytes = r.content
-        except requests.RequestException as e:
-            logger.warning("DocRaptor download transient error for job %s: %s", job_id, e)
-            ctx["status_text"] = "Finalizing…"
-            return render(request, "payments/_report_status.html", ctx)
-
-        # Upload to S3 (private)
-        try:
-            pretty_name, slug_name = build_report_filenames(assessment)
-            s3_key = f"reports/assessments/{assessment.id}/{slug_name}"
-
-            uploader = S3Uploader(
-                bucket=settings.AWS_STORAGE_BUCKET_NAME,
-                region=settings.AWS_S3_REGION_NAME,
-                access_key=getattr(settings, "AWS_ACCESS_KEY_ID", None),
-                secret_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
-            )
-            uploaded_key, size_bytes = uploader.upload_bytes(
-                pdf_bytes, s3_key, content_type="application/pdf"
-            )
-        except Exception as e:
-            logger.error("S3 upload failed for assessment %s: %s", assessment.id, e, exc_info=True)
-            ctx["error"] = "We generated the PDF but couldn’t store it. Please retry in a moment."
-            return render(request, "payments/_report_status.html", ctx)
-
-        # Persist and return ready
-        fr.s3_key = uploaded_key
-        fr.size_bytes = size_bytes
-        fr.save(update_fields=["s3_key", "size_bytes"])
-
-        ctx["final_report"] = fr
-        ctx["ready"] = True
-        return render(request, "payments/_report_status.html", ctx)
 
-    # Unknown status: keep polling conservatively
-    logger.warning("DocRaptor returned unexpected status %r for job %s", st, job_id)
-    ctx["status_text"] = "Working…"
-    return render(request, "payments/_report_status.html", ctx)
+async def _report_event_stream(assessment_id):
+    """
+    Push the report state whenever it changes; only cache reads per tick.
+    Ends on ready/failed, or after REPORT_EVENTS_MAX_SECONDS (the browser
+    reconnects on its own).
+    """
+    tick = getattr(settings, "REPORT_EVENTS_TICK_SECONDS", 1)
+    heartbeat = getattr(settings, "REPORT_EVENTS_HEARTBEAT_SECONDS", 15)
+    deadline = time.monotonic() + getattr(settings, "REPORT_EVENTS_MAX_SECONDS", 300)
+
+    yield f"retry: {int(_poll_interval(0) * 1000)}\n\n"
+    current = await sync_to_async(current_report_status)(assessment_id)
+    last, last_sent = None, time.monotonic()
+    while True:
+        state = {"state": current.get("state"), "error": current.get("error", "")}
+        if state != last:
+            yield _sse("status", state)
+            last, last_sent = state, time.monotonic()
+            if state["state"] in report_state.FINAL_STATES:
+                return
+        elif time.monotonic() - last_sent >= heartbeat:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        if time.monotonic() >= deadline:
+            return
+        await asyncio.sleep(tick)
+        current = await aget_report_status(assessment_id) or last
+
+
+@login_required
+async def report_events(request, assessment_id: int):
+    """
+    Server-Sent Events stream of report state (queued → rendering →
+    uploading → ready | failed) for the success page. Needs the ASGI server;
+    report_status polling stays as the fallback.
+    """
+    user = await request.auser()
+    if not await Assessment.objects.filter(pk=assessment_id, team__admin=user).aexists():
+        raise Http404
+    response = StreamingHttpResponse(_report_event_stream(assessment_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @csrf_exempt
@@ -313,7 +289,7 @@ def stripe_webhook_success(request):
         return HttpResponse(status=200)  # no-op if not configured
 
     try:
-        event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
+        event = _stripe().Webhook.construct_event(payload, sig_header, endpoint_secret)
     except Exception as e:
         logger.warning("Stripe webhook signature verify failed: %s", e)
         return HttpResponse(status=400)
@@ -340,14 +316,12 @@ def stripe_webhook_success(request):
             fr.paid_at = timezone.now()
             fr.save(update_fields=["paid_at"])
 
-        # Kick off async PDF generation via internal endpoint (idempotent)
-        try:
-            base = getattr(settings, "BASE_URL", None) or request.build_absolute_uri("/").rstrip("/")
-            internal_url = f"{base}/pdfexport/{assessment.id}/docraptor/start-internal/"
-            headers = {"X-Internal-Token": getattr(settings, "INTERNAL_WEBHOOK_TOKEN", "")}
-            requests.post(internal_url, headers=headers, timeout=10)
-        except Exception as e:
-            logger.warning("Failed to trigger internal DocRaptor enqueue for assessment %s: %s", assessment_id, e)
+        # Queue PDF generation for the report workers (idempotent)
+        if not fr.s3_key and not fr.docraptor_status_id:
+            try:
+                enqueue_report_job(assessment)
+            except Exception as e:
+                logger.warning("Failed to queue report job for assessment %s: %s", assessment_id, e)
 
         # Resolve user for redemption (metadata user_id preferred; fallback to assessment owner)
         User = get_user_model()
@@ -1,7 +1,14 @@
 from django.contrib import admin
-from .models import FinalReport
+from .models import FinalReport, ReportJob
 
 @admin.register(FinalReport)
 class FinalReportAdmin(admin.ModelAdmin):
     list_display = ("assessment", "s3_key", "size_bytes", "created_at")
-    search_fields = ("assessment__team__name", "s3_key")
\ No newline at end of file
+    search_fields = ("assessment__team__name", "s3_key")
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "assessment", "status", "attempts", "run_after", "locked_by", "lease_expires_at", "created_at")
+    list_filter = ("status", "renderer")
+    search_fields = ("assessment__team__name",)
+    readonly_fields = ("locked_by", "lease_expires_at", "attempts", "last_error", "created_at", "updated_at", "finished_at")
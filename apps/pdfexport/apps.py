@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PdfexportConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.pdfexport'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,305 @@
+"""
+Self-contained asset bundle for the final report (`manage.py build_report_assets`).
+
+The report used to point the PDF renderer at ~12 static URLs (three
+Metropolis weights, finalreport.css, logos, peak icons, focus images), all
+fetched back from our own web dyno on every render. The bundle holds the
+same assets, prepared once per deploy and inlined into the report HTML:
+
+- fonts: subset to report_charset() (Latin, punctuation, and every
+  character in the report template), woff2, as data URIs
+- finalreport.css: minified
+- images: downscaled to print resolution (REPORT_ASSET_DPI at their CSS
+  width), re-encoded only when that makes them smaller, PNGs as exact
+  palette images without metadata, as data URIs
+
+The bundle is one versioned JSON file (report-assets-<hash>.json) in
+REPORT_ASSET_BUNDLE_DIR plus a pointer file naming the current one. If no
+bundle was built, the first report in a process builds one in memory.
+Set REPORT_ASSETS=static to go back to static URLs.
+"""
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from apps.pdfexport.utils.images import optimize_png
+
+import logging
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 2
+POINTER_NAME = "report-assets.current"
+
+# (weight, woff2, woff) as used by finalreport/head.html
+FONTS = [
+    (400, "fonts/Metropolis/metropolis-regular-webfont.woff2", "fonts/Metropolis/metropolis-regular-webfont.woff"),
+    (500, "fonts/Metropolis/metropolis-medium-webfont.woff2", "fonts/Metropolis/metropolis-medium-webfont.woff"),
+    (700, "fonts/Metropolis/metropolis-bold-webfont.woff2", "fonts/Metropolis/metropolis-bold-webfont.woff"),
+]
+
+CSS = "pdfexport/finalreport.css"
+
+# name -> (static path, widest size it is printed at, in CSS px; see finalreport.css)
+IMAGES = {
+    "logo": ("images/logo.png", 80),  # @page background
+    "logo_square": ("images/logo-square.png", 267),  # .title-logo img: 200pt
+    "model_labels": ("images/Ascent-Organizational-Health-labels.png", 250),
+    "icon_cc": ("images/collaborative-culture.png", 40),
+    "icon_la": ("images/leadership-accountability.png", 40),
+    "icon_sm": ("images/strategic-momentum.png", 40),
+    "icon_tm": ("images/talent-magnetism.png", 40),
+    "focus_cc": ("images/ascent-cc-focus.png", 200),
+    "focus_la": ("images/ascent-la-focus.png", 200),
+    "focus_sm": ("images/ascent-sm-focus.png", 200),
+    "focus_tm": ("images/ascent-tm-focus.png", 200),
+}
+
+# Any one of the report's templates; the rest sit next to it (pdfexport/finalreport/)
+REPORT_TEMPLATE = "pdfexport/finalreport/head.html"
+
+# Team names, questions and markdown content can hold any of these
+CHARSET_RANGES = [
+    (0x20, 0x7E),      # Basic Latin
+    (0xA0, 0x17F),     # Latin-1 Supplement, Latin Extended-A
+    (0x2010, 0x2027),  # dashes, quotes, bullets, ellipsis
+    (0x2030, 0x203A),
+    (0x20AC, 0x20AC),  # euro
+    (0x2122, 0x2122),  # trademark
+    (0x2190, 0x2193),  # arrows
+]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _find(path):
+    found = finders.find(path)
+    if not found:
+        raise FileNotFoundError(f"static file not found: {path}")
+    return Path(found)
+
+
+def _data_uri(mime, data):
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+# --- Helper: what the fonts are subset to ---
+def report_charset():
+    chars = {chr(cp) for lo, hi in CHARSET_RANGES for cp in range(lo, hi + 1)}
+    template_dir = Path(get_template(REPORT_TEMPLATE).origin.name).parent
+    for template in sorted(template_dir.glob("*.html")):
+        chars |= {ch for ch in template.read_text(encoding="utf-8") if ch.isprintable()}
+    chars |= set(_setting("REPORT_ASSET_EXTRA_CHARS", ""))
+    return "".join(sorted(chars))
+
+
+def subset_font(path, text):
+    """woff2 bytes of the font at `path` with only the glyphs for `text` (plus kerning/ligatures)."""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["kern", "liga", "calt", "ccmp", "locl", "mark", "mkmk"]
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    options.drop_tables += ["FFTM"]  # FontForge timestamps
+    font = TTFont(path)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    buf = io.BytesIO()
+    font.flavor = "woff2"
+    font.save(buf)
+    return buf.getvalue()
+
+
+_CSS_STRING = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')""")
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_AROUND = re.compile(r"\s*([{};,>])\s*")
+_CSS_SPACE_AFTER_COLON = re.compile(r":\s+")
+
+
+def minify_css(css):
+    """Conservative minifier: comments, indentation and spaces around punctuation; strings untouched."""
+    parts = _CSS_STRING.split(css)
+    for i in range(0, len(parts), 2):  # odd indexes are string literals
+        code = _CSS_COMMENT.sub("", parts[i])
+        code = re.sub(r"\s+", " ", code)
+        code = _CSS_SPACE_AROUND.sub(r"\1", code)
+        parts[i] = _CSS_SPACE_AFTER_COLON.sub(":", code)
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def print_image(path, css_px, dpi):
+    """
+    (mime, bytes) for an image no wider than it can be printed at `dpi`.
+    PNGs are then made palette images where that is lossless, without metadata.
+    """
+    from PIL import Image
+
+    original = path.read_bytes()
+    mime = "image/png" if path.suffix.lower() == ".png" else "image/jpeg"
+    data = original
+    with Image.open(io.BytesIO(original)) as im:
+        target = math.ceil(css_px * dpi / 96)
+        if im.width > target:
+            height = max(1, round(im.height * target / im.width))
+            small = im.resize((target, height), Image.LANCZOS)
+            buf = io.BytesIO()
+            if mime == "image/png":
+                small.save(buf, format="PNG", optimize=True)
+            else:
+                small.convert("RGB").save(buf, format="JPEG", quality=90, optimize=True)
+            if len(buf.getvalue()) < len(original):
+                data = buf.getvalue()
+    if mime == "image/png":
+        data = optimize_png(data, lossless=True)
+    return mime, data
+
+
+def build_bundle():
+    """Build the bundle dict (see module docstring)."""
+    dpi = _setting("REPORT_ASSET_DPI", 300)
+    charset = report_charset()
+
+    fonts = [
+        {"weight": weight, "src": _data_uri("font/woff2", subset_font(_find(woff2), charset))}
+        for weight, woff2, _woff in FONTS
+    ]
+    css = minify_css(_find(CSS).read_text(encoding="utf-8"))
+    images = {}
+    for name, (path, css_px) in IMAGES.items():
+        mime, data = print_image(_find(path), css_px, dpi)
+        images[name] = _data_uri(mime, data)
+
+    bundle = {"format": BUNDLE_FORMAT, "charset": charset, "fonts": fonts, "css": css, "images": images}
+    bundle["version"] = hashlib.sha256(json.dumps(bundle, sort_keys=True).encode()).hexdigest()[:12]
+    return bundle
+
+
+def bundle_dir():
+    return Path(_setting("REPORT_ASSET_BUNDLE_DIR", Path(settings.BASE_DIR) / "build" / "report-assets"))
+
+
+def write_bundle(bundle, directory=None):
+    """Write report-assets-<version>.json and point the current-bundle file at it. Returns the path."""
+    directory = Path(directory or bundle_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"report-assets-{bundle['version']}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(bundle), encoding="utf-8")
+    os.replace(tmp, path)
+    pointer = directory / POINTER_NAME
+    tmp = pointer.with_suffix(".tmp")
+    tmp.write_text(path.name, encoding="utf-8")
+    os.replace(tmp, pointer)
+    return path
+
+
+def read_bundle(directory=None):
+    directory = Path(directory or bundle_dir())
+    try:
+        name = (directory / POINTER_NAME).read_text(encoding="utf-8").strip()
+        bundle = json.loads((directory / name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return bundle if bundle.get("format") == BUNDLE_FORMAT else None
+
+
+_lock = threading.Lock()
+_bundle = None
+
+
+def get_bundle():
+    """This process's bundle: the prebuilt one, else one built now (and saved if possible)."""
+    global _bundle
+    if _bundle is not None:
+        return _bundle
+    with _lock:
+        if _bundle is None:
+            bundle = read_bundle()
+            if bundle is None:
+                logger.warning("[PDF] no prebuilt report asset bundle in %s; building one now", bundle_dir())
+                bundle = build_bundle()
+                try:
+                    write_bundle(bundle)
+                except OSError:
+                    logger.warning("[PDF] could not save the report asset bundle", exc_info=True)
+            logger.info("[PDF] report asset bundle %s", bundle["version"])
+            _bundle = bundle
+        return _bundle
+
+
+def reset_bundle():
+    global _bundle
+    with _lock:
+        _bundle = None
+
+
+def assets_version():
+    """What the report's fonts, CSS and images currently are: the bundle version, or the stylesheet's hash."""
+    if _setting("REPORT_ASSETS", "bundle") == "bundle":
+        try:
+            return f"bundle:{get_bundle()['version']}"
+        except Exception:
+            pass  # report_assets falls back to static URLs too
+    return f"static:{hashlib.sha256(_find(CSS).read_bytes()).hexdigest()[:12]}"
+
+
+def report_assets(static_abs):
+    """
+    Template context for the report's fonts, stylesheet and images:
+    {"mode", "version", "fonts": [{"weight", "src"}], "css", "img": {name: src}, "charset"}.
+    In static mode css is None and everything points at static_abs.
+    """
+    if _setting("REPORT_ASSETS", "bundle") == "bundle":
+        try:
+            bundle = get_bundle()
+        except Exception:
+            logger.exception("[PDF] report asset bundle unavailable; using static URLs")
+        else:
+            return {
+                "mode": "bundle",
+                "version": bundle["version"],
+                "fonts": [
+                    {"weight": f["weight"], "src": mark_safe(f'url("{f["src"]}") format("woff2")')}
+                    for f in bundle["fonts"]
+                ],
+                "css": mark_safe(bundle["css"]),
+                "img": bundle["images"],
+                "charset": frozenset(bundle["charset"]),
+            }
+
+    return {
+        "mode": "static",
+        "version": "",
+        "fonts": [
+            {"weight": weight, "src": mark_safe(
+                f'url("{static_abs}{woff2}") format("woff2"), url("{static_abs}{woff}") format("woff")'
+            )}
+            for weight, woff2, woff in FONTS
+        ],
+        "css": None,
+        "img": {name: f"{static_abs}{path}" for name, (path, _) in IMAGES.items()},
+        "charset": None,
+    }
+
+
+def missing_glyphs(html, assets):
+    """Characters in the report the subset fonts cannot draw (the renderer falls back to sans-serif)."""
+    if not assets.get("charset"):
+        return ""
+    return "".join(sorted(set(html) - assets["charset"] - {"\n", "\r", "\t"}))
@@ -0,0 +1,57 @@
+"""
+Presigned download URLs for report PDFs, cached in the shared cache.
+
+One entry per FinalReport maps (filename, content type) to a signed URL
+and its expiry; URLs are reused until REPORT_DOWNLOAD_URL_MARGIN seconds
+before they expire. Each entry remembers the s3_key it was signed for, and
+signals drop it whenever a FinalReport's s3_key is saved or the row is deleted.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def url_cache_key(report_id):
+    return f"report:url:{report_id}"
+
+
+def invalidate_download_urls(report_id):
+    cache.delete(url_cache_key(report_id))
+
+
+def report_download_url(fr, *, pretty_filename=None, content_type="application/pdf"):
+    """Presigned GET URL for this report's PDF; signs only on a cache miss."""
+    from apps.pdfexport.renderers import report_uploader
+
+    ttl = _setting("REPORT_DOWNLOAD_URL_TTL", 300)
+    margin = min(_setting("REPORT_DOWNLOAD_URL_MARGIN", 60), ttl // 2)
+    variant = f"{pretty_filename or ''}|{content_type or ''}"
+    now = time.time()
+
+    key = url_cache_key(fr.id)
+    entry = cache.get(key)
+    if not entry or entry.get("s3_key") != fr.s3_key:
+        entry = {"s3_key": fr.s3_key, "urls": {}}
+    cached = entry["urls"].get(variant)
+    if cached and cached[1] - margin > now:
+        return cached[0]
+
+    url = report_uploader().presign_get(
+        fr.s3_key,
+        expires_seconds=ttl,
+        pretty_filename=pretty_filename,
+        content_type=content_type,
+    )
+    # Drop variants that are already too old to hand out
+    entry["urls"] = {v: u for v, u in entry["urls"].items() if u[1] - margin > now}
+    entry["urls"][variant] = (url, now + ttl)
+    cache.set(key, entry, timeout=max(1, ttl - margin))
+    return url
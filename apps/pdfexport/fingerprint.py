@@ -0,0 +1,121 @@
+"""
+Input fingerprint of a report PDF, and reuse of a PDF already rendered
+from the same inputs.
+
+The fingerprint is a sha256 over everything the PDF is made from:
+
+- the score snapshot's input_hash (question ids, texts and answer counts)
+- team name and deadline (cover page)
+- benchmark percentiles (stage 2+) and the team's trend series (stage 4+)
+- the content tables (insights, actions, summaries), by content digest
+- the report templates, the asset bundle / stylesheet version and the
+  chart style version and palette
+- stage, chart format and renderer (plus DocRaptor's test flag)
+
+Report PDFs are stored under a key that carries the fingerprint
+(renderers.report_s3_key), so an object at that key is a PDF of exactly
+these inputs. Bump FINGERPRINT_VERSION when something else starts to
+affect the PDF.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+
+from apps.pdfexport.assets import REPORT_TEMPLATE, assets_version
+from apps.pdfexport.models import FinalReport
+from apps.pdfexport.status import READY, publish_report_status
+from apps.pdfexport.utils.chart_cache import STYLE_VERSION
+from apps.reports.benchmarks import load_benchmarks
+from apps.reports.content import get_report_content
+from apps.reports.snapshots import get_or_take_snapshot
+from apps.reports.trends import get_team_trends
+
+import logging
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_VERSION = 1
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def templates_digest():
+    template_dir = Path(get_template(REPORT_TEMPLATE).origin.name).parent
+    digest = hashlib.sha256()
+    for template in sorted(template_dir.glob("*.html")):
+        digest.update(template.name.encode())
+        digest.update(template.read_bytes())
+    return digest.hexdigest()
+
+
+def report_fingerprint(assessment, *, stage, chart_format, renderer):
+    """sha256 hex of the report's inputs (see module docstring); stage and chart_format already resolved."""
+    snapshot = get_or_take_snapshot(assessment)
+
+    trends = None
+    if stage >= 4:
+        series = get_team_trends(assessment.team, until=assessment)
+        if len(series["assessments"]) >= 2:
+            trends = [series["labels"], series["peaks"], series["questions"]]
+
+    inputs = {
+        "version": FINGERPRINT_VERSION,
+        "snapshot": snapshot.input_hash,
+        "team": assessment.team.name,
+        "deadline": assessment.deadline.isoformat() if assessment.deadline else None,
+        "benchmarks": load_benchmarks(snapshot) if stage >= 2 else None,
+        "trends": trends,
+        "content": get_report_content().digest,
+        "templates": templates_digest(),
+        "assets": assets_version(),
+        "charts": [STYLE_VERSION, _setting("REPORT_CHART_PALETTE_COLORS", 0),
+                   bool(_setting("REPORT_CHART_PALETTE_LOSSY", False))],
+        "stage": stage,
+        "chart_format": chart_format,
+        "renderer": renderer,
+        "docraptor_test": bool(_setting("DOCRAPTOR_TEST", True)) if renderer == "docraptor" else None,
+    }
+    blob = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def find_stored_pdf(fingerprint, key):
+    """
+    (s3_key, size_bytes) of a stored PDF rendered from `fingerprint`: another
+    FinalReport with that fingerprint, or an object already at `key` (this
+    report's fingerprinted key). None when it has to be rendered.
+    """
+    from apps.pdfexport.renderers import report_uploader
+
+    row = (
+        FinalReport.objects
+        .filter(input_fingerprint=fingerprint, s3_key__isnull=False)
+        .exclude(s3_key="")
+        .values_list("s3_key", "size_bytes")
+        .first()
+    )
+    if row:
+        return row
+
+    try:
+        size = report_uploader().object_size(key)
+    except Exception:
+        logger.warning("[PDF] could not check S3 for %s; rendering", key, exc_info=True)
+        return None
+    return (key, size) if size is not None else None
+
+
+def reuse_stored_pdf(fr, fingerprint, s3_key, size_bytes):
+    """Point `fr` at an already stored PDF of the same inputs; the report is ready without rendering."""
+    fr.s3_key = s3_key
+    fr.size_bytes = size_bytes
+    fr.input_fingerprint = fingerprint
+    fr.docraptor_status_id = None
+    fr.save(update_fields=["s3_key", "size_bytes", "input_fingerprint", "docraptor_status_id"])
+    publish_report_status(fr.assessment_id, READY)
+    logger.info("[PDF] assessment %s: inputs unchanged (%s), reusing %s", fr.assessment_id, fingerprint[:12], s3_key)
+    return {"ok": True, "ready": True, "reused": True}
@@ -0,0 +1,234 @@
+"""
+Report generation queue (ReportJob) and the worker loop behind
+`manage.py run_report_workers`.
+
+- enqueue_report_job: what web requests and the Stripe webhook call; idempotent
+- claim_next_job:     SELECT ... FOR UPDATE SKIP LOCKED over due jobs, plus
+                      running jobs whose lease expired (their worker died)
+- run_job:            builds the report and hands it to the PDF renderer while a
+                      heartbeat thread keeps the lease alive
+- failures are retried with exponential backoff until max_attempts
+"""
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.pdfexport import status
+from apps.pdfexport.models import FinalReport, ReportJob
+from apps.pdfexport.status import publish_report_status
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_report_job(assessment, stage=6, chart_format="", renderer=""):
+    """
+    Queue report generation for this assessment. Returns (job, created); an
+    already queued/running job is returned as is.
+    """
+    active = ReportJob.objects.filter(assessment=assessment, status__in=ReportJob.ACTIVE).first()
+    if active:
+        return active, False
+    try:
+        with transaction.atomic():
+            job = ReportJob.objects.create(
+                assessment=assessment,
+                stage=stage,
+                chart_format=chart_format or "",
+                renderer=renderer or "",
+                max_attempts=_setting("REPORT_JOB_MAX_ATTEMPTS", 5),
+            )
+    except IntegrityError:
+        # Lost the race with a concurrent enqueue (one active job per assessment)
+        return ReportJob.objects.get(assessment=assessment, status__in=ReportJob.ACTIVE), False
+    publish_report_status(assessment.id, status.QUEUED)
+    logger.info("[JOBS] queued job %s for assessment %s", job.id, assessment.id)
+    return job, True
+
+
+def latest_job(assessment):
+    return ReportJob.objects.filter(assessment=assessment).order_by("-created_at", "-id").first()
+
+
+def claim_next_job(worker):
+    """
+    Lock and return the next due job for `worker`, or None. A job whose
+    lease ran out on its last attempt (its worker died mid-render) is failed
+    instead of being run again.
+    """
+    lease = timedelta(seconds=_setting("REPORT_JOB_LEASE_SECONDS", 120))
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                ReportJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=ReportJob.QUEUED, run_after__lte=now)
+                    | Q(status=ReportJob.RUNNING, lease_expires_at__lt=now)
+                )
+                .order_by("run_after", "id")
+                .first()
+            )
+            if job is None:
+                return None
+            if job.status == ReportJob.RUNNING and job.attempts >= job.max_attempts:
+                error = f"lease expired on attempt {job.attempts} ({job.locked_by})"
+                _finish(job, job.locked_by, status=ReportJob.FAILED, finished_at=now, last_error=error)
+                transaction.on_commit(lambda job=job: publish_report_status(
+                    job.assessment_id, status.FAILED, "PDF generation failed. Please try again."))
+                logger.error("[JOBS] job %s failed for good: %s", job.id, error)
+                continue
+            if job.status == ReportJob.RUNNING:
+                logger.warning("[JOBS] recovering job %s from %s (lease expired)", job.id, job.locked_by)
+            job.status = ReportJob.RUNNING
+            job.locked_by = worker
+            job.lease_expires_at = now + lease
+            job.attempts += 1
+            job.save(update_fields=["status", "locked_by", "lease_expires_at", "attempts", "updated_at"])
+        publish_report_status(job.assessment_id, status.RENDERING)
+        return job
+
+
+def renew_lease(job, worker):
+    """Extend the lease; False if another worker has taken the job over."""
+    lease = timedelta(seconds=_setting("REPORT_JOB_LEASE_SECONDS", 120))
+    return bool(
+        ReportJob.objects
+        .filter(id=job.id, status=ReportJob.RUNNING, locked_by=worker)
+        .update(lease_expires_at=timezone.now() + lease, updated_at=timezone.now())
+    )
+
+
+def retry_delay(attempts):
+    base = _setting("REPORT_JOB_RETRY_BASE_SECONDS", 30)
+    cap = _setting("REPORT_JOB_RETRY_MAX_SECONDS", 30 * 60)
+    return min(cap, base * 2 ** max(0, attempts - 1))
+
+
+def _finish(job, worker, **fields):
+    fields.setdefault("locked_by", "")
+    fields.setdefault("lease_expires_at", None)
+    fields["updated_at"] = timezone.now()
+    # Only the lease holder may finish a job
+    return ReportJob.objects.filter(id=job.id, locked_by=worker).update(**fields)
+
+
+def mark_succeeded(job, worker):
+    _finish(job, worker, status=ReportJob.SUCCEEDED, finished_at=timezone.now(), last_error="")
+
+
+def mark_failed(job, worker, error):
+    if job.attempts >= job.max_attempts:
+        _finish(job, worker, status=ReportJob.FAILED, finished_at=timezone.now(), last_error=error)
+        publish_report_status(job.assessment_id, status.FAILED, "PDF generation failed. Please try again.")
+        logger.error("[JOBS] job %s failed for good after %s attempts: %s", job.id, job.attempts, error)
+        return
+    delay = retry_delay(job.attempts)
+    _finish(job, worker, status=ReportJob.QUEUED, last_error=error,
+            run_after=timezone.now() + timedelta(seconds=delay))
+    publish_report_status(job.assessment_id, status.QUEUED)
+    logger.warning("[JOBS] job %s attempt %s failed, retrying in %ss: %s", job.id, job.attempts, delay, error)
+
+
+class Heartbeat(threading.Thread):
+    """Renews a job's lease every third of the lease period until stopped."""
+
+    def __init__(self, job, worker):
+        super().__init__(daemon=True, name=f"heartbeat-{job.id}")
+        self.job = job
+        self.worker = worker
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        interval = max(1, _setting("REPORT_JOB_LEASE_SECONDS", 120) / 3)
+        try:
+            while not self.stopped.wait(interval):
+                if not renew_lease(self.job, self.worker):
+                    self.lost = True
+                    logger.warning("[JOBS] lost lease on job %s", self.job.id)
+                    return
+        finally:
+            close_old_connections()
+
+    def stop(self):
+        self.stopped.set()
+        self.join(timeout=5)
+
+
+def run_job(job, worker):
+    """Generate the report for a claimed job; records success or schedules a retry."""
+    from apps.pdfexport.views import render_report
+
+    fr, _ = FinalReport.objects.get_or_create(assessment=job.assessment)
+    if fr.s3_key:
+        mark_succeeded(job, worker)
+        return
+    if fr.docraptor_status_id:
+        # A previous attempt submitted the document before its worker died; the watcher tracks it
+        logger.info("[JOBS] job %s: DocRaptor job %s already submitted, leaving it to the watcher",
+                    job.id, fr.docraptor_status_id)
+        mark_succeeded(job, worker)
+        return
+
+    heartbeat = Heartbeat(job, worker)
+    heartbeat.start()
+    t0 = time.monotonic()
+    error = None
+    try:
+        if not heartbeat.lost:
+            render_report(job.assessment, fr, stage=job.stage,
+                          chart_format=job.chart_format or None, renderer=job.renderer or None)
+    except Exception as e:
+        logger.exception("[JOBS] job %s raised", job.id)
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        heartbeat.stop()
+
+    if heartbeat.lost:
+        # Another worker holds the job now (and may have started its own render); it records the outcome
+        logger.warning("[JOBS] job %s: lease lost, leaving the result to the worker holding it", job.id)
+        return
+    if error:
+        mark_failed(job, worker, error)
+        return
+    mark_succeeded(job, worker)
+    logger.info("[JOBS] job %s done in %.2fs", job.id, time.monotonic() - t0)
+
+
+def work(worker=None, once=False, stop=None, poll_seconds=None):
+    """
+    Worker loop: claim, run, repeat. Sleeps poll_seconds when the queue is
+    empty. once=True returns when the queue is drained. `stop` is an
+    optional threading.Event checked between jobs. Returns the number of jobs run.
+    """
+    worker = worker or worker_id()
+    poll_seconds = poll_seconds or _setting("REPORT_JOB_POLL_SECONDS", 2)
+    done = 0
+    while not (stop and stop.is_set()):
+        close_old_connections()
+        job = claim_next_job(worker)
+        if job is None:
+            if once:
+                break
+            (stop.wait if stop else time.sleep)(poll_seconds)
+            continue
+        run_job(job, worker)
+        done += 1
+    return done
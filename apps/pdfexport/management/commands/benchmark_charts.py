@@ -0,0 +1,99 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.pdfexport.utils.charts import (
+    generate_peak_mountain_chart,
+    generate_question_bar_chart,
+    generate_question_bar_charts,
+    render_chart_png,
+)
+from apps.pdfexport.utils.images import png_bytes_to_data_uri, png_path_to_data_uri
+
+# A spread of realistic distributions, cycled through by each run
+SAMPLE_COUNTS = [
+    [0, 1, 4, 3], [2, 2, 2, 2], [0, 0, 1, 7], [5, 2, 1, 0],
+    [1, 3, 3, 1], [0, 2, 5, 1], [3, 0, 0, 5], [1, 1, 1, 5],
+]
+
+
+def via_tempfile(chart_fn, title, values):
+    """The old path: NamedTemporaryFile -> savefig -> read back -> unlink."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
+        path = tmp.name
+    try:
+        chart_fn(title, values, path)
+        return png_path_to_data_uri(path)
+    finally:
+        os.remove(path)
+
+
+def via_buffer(chart_fn, title, values):
+    return png_bytes_to_data_uri(render_chart_png(chart_fn, title, values))
+
+
+class Command(BaseCommand):
+    help = (
+        "Time per-chart cost of report chart rendering (tempfile round-trip vs in-memory), "
+        "and per-question cost of one figure per question vs the batch figure."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--iterations", type=int, default=40,
+                            help="Charts rendered per chart kind and method.")
+        parser.add_argument("--peak-sizes", type=int, nargs="+", default=[10, 25, 50],
+                            help="Questions per peak for the batch comparison.")
+        parser.add_argument("--repeat", type=int, default=3,
+                            help="Peaks rendered per size (best run is reported).")
+
+    def time_method(self, method, chart_fn, n):
+        method(chart_fn, "warmup", SAMPLE_COUNTS[0])  # fonts, first-figure setup
+        samples = []
+        for i in range(n):
+            t0 = time.perf_counter()
+            method(chart_fn, f"chart {i}", SAMPLE_COUNTS[i % len(SAMPLE_COUNTS)])
+            samples.append((time.perf_counter() - t0) * 1000)
+        return samples
+
+    def time_peak(self, render, size, repeat):
+        """Best per-question ms over `repeat` renders of one peak with `size` questions."""
+        counts = [SAMPLE_COUNTS[i % len(SAMPLE_COUNTS)] for i in range(size)]
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            render(counts)
+            ms = (time.perf_counter() - t0) * 1000 / size
+            best = ms if best is None else min(best, ms)
+        return best
+
+    def handle(self, *args, iterations=40, peak_sizes=(10, 25, 50), repeat=3, **options):
+        charts = [
+            ("mountain", generate_peak_mountain_chart),
+            ("bar", generate_question_bar_chart),
+        ]
+        methods = [("tempfile", via_tempfile), ("buffer", via_buffer)]
+
+        self.stdout.write(f"{'chart':<10}{'method':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for kind, chart_fn in charts:
+            for name, method in methods:
+                samples = sorted(self.time_method(method, chart_fn, iterations))
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+                self.stdout.write(
+                    f"{kind:<10}{name:<10}{statistics.mean(samples):>10.2f}"
+                    f"{statistics.median(samples):>10.2f}{p95:>10.2f}"
+                )
+
+        def one_figure_each(counts):
+            return [bytes(render_chart_png(generate_question_bar_chart, "q", c)) for c in counts]
+
+        generate_question_bar_charts([SAMPLE_COUNTS[0]])  # build the batch figure once
+
+        self.stdout.write("")
+        self.stdout.write(f"{'questions':<10}{'single ms/q':>12}{'batch ms/q':>12}{'speedup':>10}")
+        for size in peak_sizes:
+            single = self.time_peak(one_figure_each, size, repeat)
+            batch = self.time_peak(generate_question_bar_charts, size, repeat)
+            self.stdout.write(f"{size:<10}{single:>12.2f}{batch:>12.2f}{single / batch:>9.1f}x")
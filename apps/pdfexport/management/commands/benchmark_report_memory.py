@@ -0,0 +1,101 @@
+import gc
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from apps.assessments.models import Assessment, Peak
+from apps.pdfexport import views
+from apps.pdfexport.testing import PEAKS, synthetic_snapshot
+from apps.pdfexport.utils.chart_cache import ChartCache
+from apps.teams.models import Team
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Peak Python memory (tracemalloc) of building a stage 6 report at several question counts: "
+        "one HTML string with every chart of a peak drawn at once, vs section-wise rendering into a "
+        "spooled temp file. Every chart reuses one pre-drawn PNG (--draw draws them all, which "
+        "mostly measures matplotlib); nothing is cached and test rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, nargs="+", default=[50, 100, 200],
+                            help="Question counts to build reports for.")
+        parser.add_argument("--charts", default="png", choices=["png", "svg"])
+        parser.add_argument("--spool-kb", type=int, default=256,
+                            help="Spooled file size kept in memory before it moves to disk.")
+        parser.add_argument("--draw", action="store_true",
+                            help="Draw every chart instead of reusing one.")
+
+    def measure(self, build):
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        try:
+            size = build()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return size, peak / (1024 * 1024), time.perf_counter() - t0
+
+    def handle(self, *args, questions=(50, 100, 200), charts="png", spool_kb=256, draw=False, **options):
+        render_charts = views.render_charts
+        if not draw:
+            png = bytes(views.render_charts([("bar", ("", [3, 5, 8, 2]))])[0])
+
+            def render_charts(jobs):
+                return [png] * len(jobs)
+
+        def whole_string(assessment):
+            # The pre-streaming shape: all of a peak's charts at once, one string, one encoded copy
+            with override_settings(REPORT_HTML_CHUNK_QUESTIONS=10 ** 6):
+                html = views.build_report_html(assessment, stage=6, chart_format=charts)
+                return len(html.encode("utf-8"))
+
+        def spooled(assessment):
+            with tempfile.SpooledTemporaryFile(max_size=spool_kb * 1024, mode="w+", encoding="utf-8") as out:
+                views.write_report_html(assessment, out, stage=6, chart_format=charts)
+                return out.tell()
+
+        results = []
+        try:
+            with transaction.atomic(), \
+                    override_settings(REPORT_CHART_POOL_SIZE=0, REPORT_CHART_CACHE_SHARED=False), \
+                    mock.patch.object(views, "chart_cache", ChartCache(max_items=0)), \
+                    mock.patch.object(views, "render_charts", render_charts), \
+                    mock.patch.object(views, "get_team_trends", return_value={"assessments": []}), \
+                    mock.patch.object(views, "load_benchmarks", return_value=None):
+                user = get_user_model().objects.create_user("memory-benchmark", "bench@example.com", "x")
+                team = Team.objects.create(name="Benchmark", admin=user)
+                for code in PEAKS:
+                    Peak.objects.get_or_create(code=code, defaults={"name": views.NAMES[code]})
+
+                warm = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+                synthetic_snapshot(warm, 8)
+                spooled(warm)  # templates, asset bundle, matplotlib
+
+                for n in questions:
+                    assessment = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+                    synthetic_snapshot(assessment, n)
+                    results.append((n, self.measure(lambda: whole_string(assessment)),
+                                    self.measure(lambda: spooled(assessment))))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f"{'questions':>10}{'html KB':>10}{'string MB':>12}{'spooled MB':>12}"
+                          f"{'string s':>10}{'spooled s':>11}")
+        for n, (size, whole_peak, whole_s), (_, spool_peak, spool_s) in results:
+            self.stdout.write(f"{n:>10}{size / 1024:>10.0f}{whole_peak:>12.2f}{spool_peak:>12.2f}"
+                              f"{whole_s:>10.2f}{spool_s:>11.2f}")
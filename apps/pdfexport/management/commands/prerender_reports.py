@@ -0,0 +1,25 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-render report HTML for recently closed assessments so a paid report only "
+        "needs PDF conversion. Runs at low priority and yields to queued report jobs. "
+        "Stops cleanly on SIGTERM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Run one sweep and exit.")
+
+    def handle(self, *args, once=False, **options):
+        from apps.pdfexport.prerender import run
+
+        stop = threading.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stop.set())
+        built = run(stop=stop, once=once)
+        self.stdout.write(self.style.SUCCESS(f"Pre-renderer stopped after {built} report(s)."))
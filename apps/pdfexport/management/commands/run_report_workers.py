@@ -0,0 +1,71 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+
+def _child_main(once, poll_seconds):
+    """Entry point of a spawned worker process (imported before Django is set up)."""
+    import django
+    django.setup()
+    from apps.pdfexport import renderers
+    from apps.pdfexport.jobs import work, worker_id
+    from apps.pdfexport.utils import chart_pool
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    try:
+        work(worker=worker_id(), once=once, stop=stop, poll_seconds=poll_seconds)
+    finally:
+        # multiprocessing joins our own pool processes on exit; stop them first
+        chart_pool.shutdown_pool()
+        renderers.shutdown_pool()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run report generation workers: claim queued ReportJobs (SKIP LOCKED), "
+        "build and render the PDF, retry failures with backoff. Safe to run on "
+        "several dynos at once; stops cleanly on SIGTERM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1,
+                            help="Worker processes to run on this node (default 1).")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit once the queue is empty instead of polling.")
+        parser.add_argument("--poll", type=float, default=None,
+                            help="Seconds to sleep when the queue is empty (REPORT_JOB_POLL_SECONDS).")
+
+    def handle(self, *args, processes=1, once=False, poll=None, **options):
+        from apps.pdfexport.jobs import work, worker_id
+
+        if processes <= 1:
+            stop = threading.Event()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, lambda *_: stop.set())
+            done = work(worker=worker_id(), once=once, stop=stop, poll_seconds=poll)
+            self.stdout.write(self.style.SUCCESS(f"Report worker stopped after {done} job(s)."))
+            return
+
+        ctx = multiprocessing.get_context("spawn")
+        children = [
+            ctx.Process(target=_child_main, args=(once, poll), name=f"report-worker-{i}")
+            for i in range(processes)
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f"Started {processes} report worker processes.")
+
+        def forward(signum, _frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()  # SIGTERM: finish the current job, then exit
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for child in children:
+            child.join()
+        self.stdout.write(self.style.SUCCESS("Report workers stopped."))
@@ -0,0 +1,25 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Watch in-flight DocRaptor jobs: poll each one with backoff, store finished "
+        "PDFs in S3 and publish report status for report_status to read. "
+        "Stops cleanly on SIGTERM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Check every due job once and exit.")
+
+    def handle(self, *args, once=False, **options):
+        from apps.pdfexport.watcher import watch
+
+        stop = threading.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stop.set())
+        checks = watch(stop=stop, once=once)
+        self.stdout.write(self.style.SUCCESS(f"DocRaptor watcher stopped after {checks} check(s)."))
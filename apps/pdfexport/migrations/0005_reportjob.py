@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0004_participant_snapshots'),
+        ('pdfexport', '0004_finalreport_paid_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('stage', models.PositiveSmallIntegerField(default=6)),
+                ('chart_format', models.CharField(blank=True, default='', max_length=10)),
+                ('renderer', models.CharField(blank=True, default='', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to='assessments.assessment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='reportjob_claim_idx'), models.Index(fields=['status', 'lease_expires_at'], name='reportjob_lease_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('assessment',), name='reportjob_one_active_per_assessment')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdfexport', '0005_reportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='finalreport',
+            name='docraptor_checks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='finalreport',
+            name='docraptor_next_check_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='finalreport',
+            name='docraptor_status',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdfexport', '0006_finalreport_docraptor_watch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='finalreport',
+            name='input_fingerprint',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -1,12 +1,20 @@
 from django.db import models
 from django.conf import settings
 from apps.assessments.models import Assessment
+from django.utils import timezone
 from django.utils.text import slugify
 
 class FinalReport(models.Model):
     assessment = models.OneToOneField(Assessment, on_delete=models.CASCADE, related_name="final_report")
     docraptor_status_id = models.CharField(max_length=64, blank=True, null=True)
+    # Last state seen by the DocRaptor watcher (manage.py watch_docraptor)
+    docraptor_status = models.CharField(max_length=20, blank=True, default="")
+    docraptor_checks = models.PositiveIntegerField(default=0)
+    docraptor_next_check_at = models.DateTimeField(null=True, blank=True, db_index=True)
     s3_key = models.CharField(max_length=512, blank=True, null=True)
+    # sha256 of everything the PDF is made from (apps.pdfexport.fingerprint);
+    # identical inputs reuse the stored PDF instead of rendering again
+    input_fingerprint = models.CharField(max_length=64, blank=True, default="", db_index=True)
     file_name = models.CharField(max_length=255, blank=True, default="")
     size_bytes = models.BigIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -15,4 +23,58 @@ class FinalReport(models.Model):
 
     def s3_url(self):
         # non-public; serve via presigned URL or through Django view
-        return f"s3://{settings.AWS_STORAGE_BUCKET_NAME}/{self.s3_key}"
\ No newline at end of file
+        return f"s3://{settings.AWS_STORAGE_BUCKET_NAME}/{self.s3_key}"
+
+class ReportJob(models.Model):
+    """
+    One request to generate an assessment's final report PDF. Web requests
+    only insert rows; `manage.py run_report_workers` claims them with
+    SELECT ... FOR UPDATE SKIP LOCKED, holds a lease while working (renewed by
+    heartbeats) and retries failures with exponential backoff. A running job
+    whose lease ran out (crashed worker) is claimed again by the next worker.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+    ACTIVE = (QUEUED, RUNNING)
+
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name="report_jobs")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    stage = models.PositiveSmallIntegerField(default=6)
+    chart_format = models.CharField(max_length=10, blank=True, default="")
+    renderer = models.CharField(max_length=20, blank=True, default="")
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="reportjob_claim_idx"),
+            models.Index(fields=["status", "lease_expires_at"], name="reportjob_lease_idx"),
+        ]
+        constraints = [
+            # at most one queued/running job per assessment
+            models.UniqueConstraint(
+                fields=["assessment"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="reportjob_one_active_per_assessment",
+            ),
+        ]
+
+    def __str__(self):
+        return f"ReportJob {self.id} ({self.status}) for {self.assessment}"
@@ -0,0 +1,198 @@
+"""
+Speculative pre-rendering of final reports (manage.py prerender_reports).
+
+Once an assessment closes (the last participant submits, or the deadline
+passes) its report can no longer change, so the sweeper does the slow part
+before anyone pays:
+
+- snapshots assessments whose deadline passed within the age window (older
+  ones are left to snapshot_scores)
+- builds the report HTML with the options a paid report uses (stage 6,
+  default charts and renderer), which also leaves its charts in the chart cache
+- stores the HTML in S3 at <REPORT_PRERENDER_PREFIX><fingerprint>-<site>.html
+
+render_report looks the HTML up by the report's input fingerprint
+(apps.pdfexport.fingerprint) and goes straight to PDF conversion. A stale
+copy is never used: any change to the inputs changes the fingerprint.
+
+Throttled so paid reports and web traffic come first:
+
+- the process runs at nice REPORT_PRERENDER_NICE (chart workers inherit it)
+- nothing is built while report jobs are queued or running
+- one report at a time, REPORT_PRERENDER_PAUSE_SECONDS apart, at most
+  REPORT_PRERENDER_BATCH per sweep, a sweep every REPORT_PRERENDER_INTERVAL
+- only assessments that closed in the last REPORT_PRERENDER_MAX_AGE_DAYS
+
+Pre-rendered HTML is disposable: expire the prefix with an S3 lifecycle
+rule a little longer than REPORT_PRERENDER_MAX_AGE_DAYS.
+"""
+import codecs
+import hashlib
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.assessments.models import Assessment
+from apps.pdfexport.models import ReportJob
+from apps.reports.snapshots import assessments_due_for_snapshot, take_snapshot
+
+import logging
+logger = logging.getLogger(__name__)
+
+CHUNK = 256 * 1024
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def prerender_key(fingerprint, base_url):
+    site = hashlib.sha256(base_url.rstrip("/").encode("utf-8")).hexdigest()[:8]
+    return f"{_setting('REPORT_PRERENDER_PREFIX', 'report-prerender/')}{fingerprint}-{site}.html"
+
+
+def default_render_options():
+    """(stage, chart_format, renderer name) of a report generated after payment."""
+    from apps.pdfexport.renderers import get_renderer
+    from apps.pdfexport.views import resolve_chart_format
+
+    return 6, resolve_chart_format(None), get_renderer(None).name
+
+
+def load_prerendered_html(fingerprint, base_url, out):
+    """
+    Copy the pre-rendered HTML for `fingerprint` into the text file `out`.
+    Returns False (with `out` left empty) when there is none or it cannot be read.
+    """
+    from apps.pdfexport.renderers import report_uploader
+
+    key = prerender_key(fingerprint, base_url)
+    try:
+        chunks = report_uploader().download_stream(key, chunk_size=CHUNK)
+        if chunks is None:
+            return False
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for chunk in chunks:
+            out.write(decoder.decode(chunk))
+        out.write(decoder.decode(b"", final=True))
+    except Exception:
+        logger.warning("[PRERENDER] could not read %s; building the HTML now", key, exc_info=True)
+        out.seek(0)
+        out.truncate()
+        return False
+    logger.info("[PRERENDER] using pre-rendered HTML %s", key)
+    return True
+
+
+# --- Sweeper ---
+def _since(now=None):
+    return (now or timezone.now()) - timedelta(days=_setting("REPORT_PRERENDER_MAX_AGE_DAYS", 14))
+
+
+def snapshot_closed(now=None):
+    """Deadline snapshots for assessments closed within REPORT_PRERENDER_MAX_AGE_DAYS. Returns how many."""
+    due = assessments_due_for_snapshot().filter(deadline__gte=timezone.localdate(_since(now)))
+    taken = 0
+    for assessment in due:
+        take_snapshot(assessment, reason="deadline")
+        taken += 1
+    return taken
+
+
+def candidates(now=None):
+    """Assessments closed within REPORT_PRERENDER_MAX_AGE_DAYS without a stored PDF, most recent first."""
+    since = _since(now)
+    return (
+        Assessment.objects
+        .filter(score_snapshot__reason__in=["completed", "deadline"], score_snapshot__computed_at__gte=since)
+        .filter(Q(final_report__isnull=True) | Q(final_report__s3_key__isnull=True) | Q(final_report__s3_key=""))
+        .select_related("team")
+        .order_by("-score_snapshot__computed_at", "-id")
+    )
+
+
+def report_jobs_pending():
+    """Paid reports waiting or rendering; the sweeper stays out of their way."""
+    return ReportJob.objects.filter(status__in=ReportJob.ACTIVE).exists()
+
+
+def prerender(assessment, base_url=None):
+    """Build and store the report HTML for `assessment` unless it is stored already. Returns True if it built it."""
+    from apps.pdfexport.fingerprint import report_fingerprint
+    from apps.pdfexport.renderers import report_uploader
+    from apps.pdfexport.views import write_report_html
+
+    base_url = (base_url or settings.BASE_URL).rstrip("/")
+    stage, chart_format, renderer = default_render_options()
+    fingerprint = report_fingerprint(assessment, stage=stage, chart_format=chart_format, renderer=renderer)
+    key = prerender_key(fingerprint, base_url)
+
+    done = f"report:prerendered:{assessment.id}"
+    if cache.get(done) == key:
+        return False
+    uploader = report_uploader()
+    built = False
+    if uploader.object_size(key) is None:
+        t0 = time.monotonic()
+        spool_max = _setting("REPORT_HTML_SPOOL_MAX_BYTES", 1024 * 1024)
+        with tempfile.SpooledTemporaryFile(max_size=spool_max, mode="w+", encoding="utf-8") as document:
+            write_report_html(assessment, document, stage=stage, chart_format=chart_format, base_url=base_url)
+            document.seek(0)
+            _, size = uploader.upload_stream(
+                (chunk.encode("utf-8") for chunk in iter(lambda: document.read(CHUNK), "")),
+                key, content_type="text/html; charset=utf-8",
+            )
+        logger.info("[PRERENDER] assessment %s: %s bytes of HTML in %.2fs", assessment.id, size, time.monotonic() - t0)
+        built = True
+    cache.set(done, key, timeout=_setting("REPORT_PRERENDER_MAX_AGE_DAYS", 14) * 24 * 60 * 60)
+    return built
+
+
+def sweep(stop=None):
+    """One pass over closed assessments. Returns the number of reports pre-rendered."""
+    snapshot_closed()
+
+    limit = _setting("REPORT_PRERENDER_BATCH", 5)
+    pause = _setting("REPORT_PRERENDER_PAUSE_SECONDS", 5)
+    built = 0
+    for assessment in candidates().iterator():
+        if (stop and stop.is_set()) or built >= limit:
+            break
+        if report_jobs_pending():
+            logger.info("[PRERENDER] report jobs pending; pausing the sweep")
+            break
+        try:
+            if not prerender(assessment):
+                continue
+        except Exception:
+            logger.exception("[PRERENDER] assessment %s failed", assessment.id)
+            continue
+        built += 1
+        (stop.wait if stop else time.sleep)(pause)
+    return built
+
+
+def run(stop=None, once=False):
+    """Sweeper loop (manage.py prerender_reports). once=True returns after one sweep. Returns reports built."""
+    nice = _setting("REPORT_PRERENDER_NICE", 10)
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+    interval = _setting("REPORT_PRERENDER_INTERVAL", 300)
+    built = 0
+    while not (stop and stop.is_set()):
+        close_old_connections()
+        try:
+            built += sweep(stop)
+        except Exception:
+            logger.exception("[PRERENDER] sweep failed")
+        if once:
+            break
+        (stop.wait if stop else time.sleep)(interval)
+    return built
@@ -0,0 +1,274 @@
+"""
+PDF renderers: turn the report HTML into a stored PDF for a FinalReport.
+
+- DocRaptorRenderer   queues an async DocRaptor job; the watcher
+                      (apps.pdfexport.watcher) polls it, downloads the PDF
+                      and uploads it to S3
+- WeasyPrintRenderer  renders locally in a worker process that writes the
+                      PDF straight to S3; the report is ready when start() returns
+
+Pick one with REPORT_PDF_RENDERER ("docraptor" | "weasyprint") or per job
+(?renderer=weasyprint on the start endpoints).
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.pdfexport.status import READY, RENDERING, publish_report_status
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class PdfRenderError(Exception):
+    """A renderer could not start or finish a job. `error` is the short code returned to clients."""
+
+    def __init__(self, error, detail="", status=502):
+        super().__init__(detail or error)
+        self.error = error
+        self.detail = detail
+        self.status = status
+
+
+class PdfRenderer:
+    name = ""
+
+    def start(self, fr, document, *, filename, pretty_name, baseurl):
+        """
+        Start rendering the report HTML for FinalReport `fr`. `document` is a
+        readable text file (render_report spools the HTML) or a str. Returns
+        the JSON payload for the start endpoint; raises PdfRenderError on failure.
+        """
+        raise NotImplementedError
+
+
+def read_document(document):
+    """The whole report HTML, for renderers that need it as one string."""
+    if isinstance(document, str):
+        return document
+    document.seek(0)
+    return document.read()
+
+
+# --- Helper: where a report PDF lives in the bucket ---
+def report_s3_key(assessment, slug_name, fingerprint=""):
+    """Fingerprinted reports get a key of their own, so a stored object always matches its inputs."""
+    if fingerprint:
+        return f"reports/assessments/{assessment.id}/{fingerprint[:16]}/{slug_name}"
+    return f"reports/assessments/{assessment.id}/{slug_name}"
+
+
+def report_uploader():
+    """S3Uploader for the reports bucket on this process's pooled S3 client."""
+    from apps.common.clients import s3_client
+    from apps.pdfexport.utils.storage import S3Uploader
+
+    return S3Uploader(settings.AWS_STORAGE_BUCKET_NAME, client=s3_client())
+
+
+class DocRaptorRenderer(PdfRenderer):
+    name = "docraptor"
+
+    def document_source(self, fr, document):
+        """
+        {"document_content": html}, or {"document_url": ...} when
+        REPORT_DOCRAPTOR_DELIVERY is "staged" (see apps.pdfexport.staging).
+        """
+        if getattr(settings, "REPORT_DOCRAPTOR_DELIVERY", "inline") != "staged":
+            return {"document_content": read_document(document)}
+
+        from apps.pdfexport.staging import stage_report_html
+
+        t0 = time.monotonic()
+        try:
+            url, stats = stage_report_html(document, fr.assessment_id)
+        except Exception:
+            logger.exception("[PDF] staging report HTML failed; sending it inline")
+            return {"document_content": read_document(document)}
+        saved = stats["inline_bytes"] - len(url)
+        logger.info(
+            "[PDF] staged report in %.2fs: %s assets (%s uploaded), html %s bytes; "
+            "request body %s bytes smaller (%.0f%%)",
+            time.monotonic() - t0, stats["assets"], stats["uploaded"], stats["html_bytes"],
+            saved, 100 * saved / max(1, stats["inline_bytes"]),
+        )
+        return {"document_url": url}
+
+    def start(self, fr, document, *, filename, pretty_name, baseurl):
+        from docraptor.rest import ApiException
+
+        from apps.common.clients import docraptor_client
+
+        client = docraptor_client()
+        doc = {
+            "test": bool(getattr(settings, "DOCRAPTOR_TEST", True)),
+            "document_type": "pdf",
+            "name": filename,
+            "prince_options": {"media": "print", "baseurl": baseurl},
+        }
+        doc.update(self.document_source(fr, document))
+        try:
+            t0 = time.monotonic()
+            job = client.create_async_doc(doc, _request_timeout=(10, 700))
+            logger.info("[PDF] DocRaptor job queued in %.2fs", time.monotonic() - t0)
+        except ApiException as e:
+            logger.exception("DocRaptor API error")
+            raise PdfRenderError("docraptor_api", str(e), status=502)
+
+        # status_id is a Docraptor attribute; call for status_id object first
+        status_id = getattr(job, "status_id", None)
+        if not status_id and hasattr(job, "to_dict"):
+            status_id = job.to_dict().get("status_id")
+
+        if not status_id:
+            logger.error("DocRaptor async response missing status_id; resp=%r",
+                         job.to_dict() if hasattr(job, "to_dict") else job)
+            raise PdfRenderError("docraptor_missing_status_id", status=502)
+
+        # Cache + persist using our model field name (docraptor_status_id)
+        cache.set(
+            f"docraptor:{status_id}",
+            {"assessment_id": fr.assessment_id, "filename": filename, "pretty_name": pretty_name},
+            timeout=60 * 60,
+        )
+
+        # The watcher (manage.py watch_docraptor) takes it from here
+        fr.docraptor_status_id = status_id
+        fr.docraptor_status = "queued"
+        fr.docraptor_checks = 0
+        fr.docraptor_next_check_at = timezone.now() + timedelta(
+            seconds=getattr(settings, "REPORT_WATCH_MIN_INTERVAL", 2)
+        )
+        fr.size_bytes = None
+        fr.save(update_fields=[
+            "docraptor_status_id", "docraptor_status", "docraptor_checks",
+            "docraptor_next_check_at", "size_bytes",
+        ])
+        publish_report_status(fr.assessment_id, RENDERING)
+
+        return {"ok": True, "docraptor_status_id": status_id}
+
+
+# --- WeasyPrint worker side (settings only, no app registry in here) ---
+def _static_url_fetcher(static_base, static_dirs):
+    """
+    url_fetcher that reads our own static files from disk instead of making
+    HTTP requests back to the web dyno; everything else goes to WeasyPrint.
+    """
+    from weasyprint import default_url_fetcher
+
+    def fetch(url):
+        if url.startswith(static_base):
+            rel = unquote(urlsplit(url).path[len(urlsplit(static_base).path):])
+            for root in static_dirs:
+                path = Path(root, rel)
+                if path.is_file():
+                    return {"string": path.read_bytes(), "redirected_url": url}
+        return default_url_fetcher(url)
+
+    return fetch
+
+
+def _render_and_store(html, baseurl, static_base, static_dirs, key):
+    """Runs in the worker process. Returns (s3_key, size_bytes, render_seconds)."""
+    from weasyprint import HTML
+
+    t0 = time.monotonic()
+    pdf = HTML(
+        string=html,
+        base_url=baseurl,
+        url_fetcher=_static_url_fetcher(static_base, static_dirs),
+        media_type="print",
+    ).write_pdf()
+    render_seconds = time.monotonic() - t0
+
+    uploaded_key, size_bytes = report_uploader().upload_bytes(pdf, key, content_type="application/pdf")
+    return uploaded_key, size_bytes, render_seconds
+
+
+# --- WeasyPrint caller side (report job worker) ---
+_pool_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+
+
+def _weasyprint_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, "REPORT_WEASYPRINT_WORKERS", 1),
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=getattr(settings, "REPORT_WEASYPRINT_MAX_TASKS", 20) or None,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_pool(wait=True):
+    global _pool, _pool_pid
+    with _pool_lock:
+        pool, pid = _pool, _pool_pid
+        _pool = _pool_pid = None
+    if pool is not None and pid == os.getpid():
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def static_search_dirs():
+    """Where static files live on disk, in staticfiles finder order (collected files first)."""
+    dirs = [settings.STATIC_ROOT, *getattr(settings, "STATICFILES_DIRS", [])]
+    dirs += [Path(app.path, "static") for app in apps.get_app_configs()]
+    return [str(d) for d in dirs if d and Path(d).is_dir()]
+
+
+class WeasyPrintRenderer(PdfRenderer):
+    name = "weasyprint"
+
+    def start(self, fr, document, *, filename, pretty_name, baseurl):
+        key = report_s3_key(fr.assessment, filename, fr.input_fingerprint)
+        static_base = baseurl.rstrip("/") + settings.STATIC_URL
+
+        try:
+            future = _weasyprint_pool().submit(
+                _render_and_store, read_document(document), baseurl, static_base, static_search_dirs(), key,
+            )
+            uploaded_key, size_bytes, render_seconds = future.result(
+                timeout=getattr(settings, "REPORT_WEASYPRINT_TIMEOUT", 300)
+            )
+        except Exception as e:
+            logger.exception("WeasyPrint render failed for assessment %s", fr.assessment_id)
+            raise PdfRenderError("weasyprint", str(e), status=500)
+
+        logger.info("[PDF] WeasyPrint rendered and stored %s bytes in %.2fs", size_bytes, render_seconds)
+
+        fr.s3_key = uploaded_key
+        fr.size_bytes = size_bytes
+        fr.docraptor_status_id = None
+        fr.save(update_fields=["s3_key", "size_bytes", "docraptor_status_id"])
+        publish_report_status(fr.assessment_id, READY)
+
+        return {"ok": True, "ready": True}
+
+
+RENDERERS = {
+    DocRaptorRenderer.name: DocRaptorRenderer,
+    WeasyPrintRenderer.name: WeasyPrintRenderer,
+}
+
+
+def get_renderer(name=None):
+    """Renderer for this job: `name` if it is known, else REPORT_PDF_RENDERER, else DocRaptor."""
+    for candidate in (name, getattr(settings, "REPORT_PDF_RENDERER", DocRaptorRenderer.name)):
+        if candidate and str(candidate).lower() in RENDERERS:
+            return RENDERERS[str(candidate).lower()]()
+    return DocRaptorRenderer()
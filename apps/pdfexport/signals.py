@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.pdfexport.downloads import invalidate_download_urls
+from apps.pdfexport.models import FinalReport
+
+
+# A new PDF (or none) behind a report invalidates its cached download URLs
+@receiver(post_save, sender=FinalReport)
+def final_report_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "s3_key" in update_fields:
+        invalidate_download_urls(instance.pk)
+
+
+@receiver(post_delete, sender=FinalReport)
+def final_report_deleted(sender, instance, **kwargs):
+    invalidate_download_urls(instance.pk)
@@ -0,0 +1,104 @@
+"""
+Staged delivery of report HTML to DocRaptor (REPORT_DOCRAPTOR_DELIVERY=staged).
+
+Instead of posting the whole HTML, with every chart, image and font as a
+base64 data URI, as document_content:
+
+- each data URI is decoded and uploaded once as a private object named by
+  its content hash (<REPORT_STAGING_PREFIX>assets/<sha256>.<ext>), so the
+  same chart or logo is shared by every report that uses it
+- the data URIs are replaced with short-lived presigned URLs
+- the HTML itself is uploaded (<prefix>html/<assessment>/<hash>.html) and
+  DocRaptor gets its presigned URL as document_url
+
+A retry re-uploads only the HTML; the enqueue request carries a URL
+instead of the document. Staged objects are throwaway: expire the
+REPORT_STAGING_PREFIX prefix with an S3 lifecycle rule (a day is plenty).
+"""
+import base64
+import hashlib
+import io
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+
+import logging
+logger = logging.getLogger(__name__)
+
+DATA_URI = re.compile(r"data:(image/png|image/jpeg|image/svg\+xml|font/woff2);base64,([A-Za-z0-9+/=]+)")
+
+EXTENSIONS = {"image/png": "png", "image/jpeg": "jpg", "image/svg+xml": "svg", "font/woff2": "woff2"}
+
+UPLOAD_CHUNK = 256 * 1024
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _prefix():
+    return _setting("REPORT_STAGING_PREFIX", "report-staging/")
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _put_once(uploader, key, data, content_type):
+    """Upload unless this key is known to be there already. Returns True if it uploaded."""
+    seen = f"report:staged:{key}"
+    if cache.get(seen):
+        return False
+    uploader.upload_bytes(data, key, content_type=content_type)
+    # Forget it well before the lifecycle rule removes the object
+    cache.set(seen, True, timeout=_setting("REPORT_STAGING_SEEN_SECONDS", 6 * 60 * 60))
+    return True
+
+
+def stage_report_html(document, assessment_id):
+    """
+    Upload the report's embedded assets and HTML; returns (document_url, stats)
+    where stats = {"assets", "uploaded", "html_bytes", "inline_bytes"}.
+    `document` is the report HTML as a readable text file or a str. It is
+    read line by line and the staged copy is spooled, so neither is held
+    in memory whole.
+    """
+    from apps.pdfexport.renderers import report_uploader
+
+    uploader = report_uploader()
+    ttl = _setting("REPORT_STAGING_URL_TTL", 60 * 60)
+    urls = {}
+    stats = {"assets": 0, "uploaded": 0, "inline_bytes": 0, "html_bytes": 0}
+
+    def replace(match):
+        mime, payload = match.group(1), match.group(2)
+        if payload not in urls:
+            data = base64.b64decode(payload)
+            key = f"{_prefix()}assets/{_digest(data)}.{EXTENSIONS[mime]}"
+            stats["uploaded"] += _put_once(uploader, key, data, mime)
+            stats["assets"] += 1
+            urls[payload] = uploader.presign_get(key, expires_seconds=ttl)
+        return urls[payload]
+
+    if isinstance(document, str):
+        document = io.StringIO(document)
+    document.seek(0)
+
+    spool_max = _setting("REPORT_HTML_SPOOL_MAX_BYTES", 1024 * 1024)
+    digest = hashlib.sha256()
+    with tempfile.SpooledTemporaryFile(max_size=spool_max) as staged:
+        for line in document:  # data URIs never span lines
+            stats["inline_bytes"] += len(line.encode("utf-8"))
+            out = DATA_URI.sub(replace, line).encode("utf-8")
+            digest.update(out)
+            staged.write(out)
+        stats["html_bytes"] = staged.tell()
+        staged.seek(0)
+
+        key = f"{_prefix()}html/{assessment_id}/{digest.hexdigest()[:32]}.html"
+        uploader.upload_stream(
+            iter(lambda: staged.read(UPLOAD_CHUNK), b""), key, content_type="text/html; charset=utf-8",
+        )
+    return uploader.presign_get(key, expires_seconds=ttl), stats
@@ -0,0 +1,69 @@
+"""
+Report generation status shared through the cache, so the report_status
+poll is a cache read instead of a DocRaptor API call per browser tab.
+
+Writers: the job queue (queued / rendering / failed) and the DocRaptor
+watcher (rendering / uploading / ready / failed). Readers: report_status
+and the report_events SSE stream.
+"""
+from django.core.cache import cache
+from django.utils import timezone
+
+QUEUED = "queued"
+RENDERING = "rendering"
+UPLOADING = "uploading"
+READY = "ready"
+FAILED = "failed"
+
+FINAL_STATES = (READY, FAILED)
+
+STATUS_TIMEOUT = 60 * 60 * 24
+
+
+def status_key(assessment_id):
+    return f"report:status:{assessment_id}"
+
+
+def publish_report_status(assessment_id, state, error=""):
+    cache.set(
+        status_key(assessment_id),
+        {"state": state, "error": error, "updated_at": timezone.now().isoformat()},
+        timeout=STATUS_TIMEOUT,
+    )
+
+
+def get_report_status(assessment_id):
+    """{"state", "error", "updated_at"} or None if nothing was published yet."""
+    return cache.get(status_key(assessment_id))
+
+
+async def aget_report_status(assessment_id):
+    return await cache.aget(status_key(assessment_id))
+
+
+def current_report_status(assessment_id):
+    """
+    Published status, or one worked out from the FinalReport/ReportJob rows
+    when the cache is cold. Always returns {"state", "error"}.
+    """
+    from apps.pdfexport.models import FinalReport, ReportJob
+
+    fr = FinalReport.objects.filter(assessment_id=assessment_id).first()
+    if fr and fr.s3_key:
+        return {"state": READY, "error": ""}
+
+    published = get_report_status(assessment_id)
+    if published:
+        return published
+
+    failed = {"state": FAILED, "error": "PDF generation failed. Please try again."}
+    if fr and fr.docraptor_status_id:
+        return {"state": RENDERING, "error": ""}
+    if fr and fr.docraptor_status == "failed":
+        return failed
+    job = ReportJob.objects.filter(assessment_id=assessment_id).order_by("-created_at", "-id").first()
+    if job and job.status == ReportJob.FAILED:
+        return failed
+    if job and job.status == ReportJob.RUNNING:
+        return {"state": RENDERING, "error": ""}
+    return {"state": QUEUED, "error": ""}
@@ -0,0 +1,50 @@
+"""
+Test data for the report pipeline, shared by tests.py and the benchmark
+commands (e.g. benchmark_report_memory). Not used by the app itself.
+"""
+from datetime import date
+
+from django.contrib.auth import get_user_model
+
+from apps.assessments.models import Assessment, Peak
+from apps.reports.models import ScoreSnapshot
+from apps.teams.models import Team
+
+PEAKS = ["CC", "LA", "SM", "TM"]
+
+
+def synthetic_snapshot(assessment, questions):
+    """
+    A stage-6-ready snapshot with `questions` rows spread over the four peaks,
+    no two charts alike. Stored as a closed ("deadline") snapshot, so it is
+    read as is rather than retaken from the (empty) answers.
+    """
+    rows = []
+    for i in range(questions):
+        counts = [i % 7, (i * 3) % 11, (i * 5) % 13 + 1, (i * 7) % 17]
+        rows.append({
+            "id": 100000 + i,
+            "peak_code": PEAKS[i % 4],
+            "text": f"Question {i + 1}: our team follows through on what it agrees to do together.",
+            "counts": counts,
+            "health_percentage": round(100 * (counts[2] + counts[3]) / max(1, sum(counts))),
+        })
+    peaks = {
+        code: {"score": 60 + n, "range_label": "MODERATE", "counts": [1, 2, 3, 4], "percentages": [10, 20, 30, 40]}
+        for n, code in enumerate(PEAKS)
+    }
+    return ScoreSnapshot.objects.create(assessment=assessment, peaks=peaks, questions=rows, input_hash="benchmark",
+                                        reason="deadline")
+
+
+def report_assessment(questions=10):
+    """A closed assessment (team "Imperials", admin "admin"/"pw") with a synthetic snapshot of `questions` rows."""
+    from apps.pdfexport.views import NAMES
+
+    user = get_user_model().objects.create_user("admin", "admin@example.com", "pw")
+    team = Team.objects.create(name="Imperials", admin=user)
+    for code in PEAKS:
+        Peak.objects.get_or_create(code=code, defaults={"name": NAMES[code]})
+    assessment = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+    synthetic_snapshot(assessment, questions)
+    return assessment
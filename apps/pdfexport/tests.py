@@ -1,3 +1,829 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+import uuid
+import xml.etree.ElementTree as ET
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.assessments.models import Assessment, Peak
+from apps.pdfexport import assets, downloads, jobs, staging, status, watcher
+from apps.pdfexport.models import FinalReport, ReportJob
+from apps.pdfexport.renderers import DocRaptorRenderer, WeasyPrintRenderer, get_renderer
+from apps.pdfexport.testing import report_assessment
+from apps.pdfexport.utils.chart_cache import ChartCache, chart_key
+from apps.pdfexport.utils.charts import (
+    generate_question_bar_chart,
+    generate_question_bar_charts,
+    render_chart_png,
+)
+from apps.pdfexport.utils.storage import MIN_PART_SIZE, ChecksumMismatch, S3Uploader
+from apps.pdfexport.utils.images import optimize_png
+from apps.pdfexport.utils.svg_charts import peak_mountain_svg, question_bar_svg
+from apps.pdfexport.views import resolve_chart_format
+from apps.teams.models import Team
+
+
+class ChartCacheTests(SimpleTestCase):
+    def test_mountain_keys_ignore_scale_but_bar_keys_do_not(self):
+        self.assertEqual(chart_key("mountain", [2, 4, 6, 8]), chart_key("mountain", [1, 2, 3, 4]))
+        self.assertNotEqual(chart_key("bar", [2, 4, 6, 8]), chart_key("bar", [1, 2, 3, 4]))
+        self.assertEqual(chart_key("bar", [0, 1]), chart_key("bar", [0, 1, 0, 0]))
+
+    def test_png_keys_follow_the_palette_size(self):
+        with override_settings(REPORT_CHART_PALETTE_COLORS=256):
+            bar, svg = chart_key("bar", [1, 2, 3, 4]), chart_key("bar-svg", [1, 2, 3, 4])
+        with override_settings(REPORT_CHART_PALETTE_COLORS=64):
+            self.assertNotEqual(chart_key("bar", [1, 2, 3, 4]), bar)
+            self.assertEqual(chart_key("bar-svg", [1, 2, 3, 4]), svg)
+
+    def test_lru_hits_misses_and_eviction(self):
+        cache = ChartCache(max_items=2)
+        renders = []
+
+        def render(tag):
+            renders.append(tag)
+            return tag
+
+        cache.get_or_render("bar", [1, 0, 0, 0], lambda: render("a"))
+        cache.get_or_render("bar", [0, 1, 0, 0], lambda: render("b"))
+        self.assertEqual(cache.get_or_render("bar", [1, 0, 0, 0], lambda: render("a2")), "a")
+        cache.get_or_render("bar", [0, 0, 1, 0], lambda: render("c"))  # evicts [0, 1, 0, 0]
+        cache.get_or_render("bar", [0, 1, 0, 0], lambda: render("b2"))
+
+        self.assertEqual(renders, ["a", "b", "c", "b2"])
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 4, 2))
+
+    def test_batch_renders_each_distinct_miss_once_and_keeps_order(self):
+        cache = ChartCache(max_items=10)
+        cache.get_or_render("bar", [1, 0, 0, 0], lambda: "cached")
+        batches = []
+
+        def render_many(jobs):
+            batches.append(jobs)
+            return [f"img-{job}" for job in jobs]
+
+        items = [
+            ("bar", [0, 2, 0, 0], "q1"),
+            ("bar", [1, 0, 0, 0], "q2"),
+            ("bar", [0, 2, 0, 0], "q3"),
+            ("mountain", [2, 4, 6, 8], "p1"),
+        ]
+        self.assertEqual(
+            cache.get_or_render_many(items, render_many),
+            ["img-q1", "cached", "img-q1", "img-p1"],
+        )
+        self.assertEqual(batches, [["q1", "p1"]])
+
+
+class SvgChartTests(SimpleTestCase):
+    NS = "{http://www.w3.org/2000/svg}"
+
+    def test_mountain_is_valid_svg_scaled_like_the_png(self):
+        root = ET.fromstring(peak_mountain_svg([1, 2, 3, 4]))
+        self.assertEqual(root.tag, f"{self.NS}svg")
+        # Scale invariant, like the matplotlib chart (values are rescaled to 0–100)
+        self.assertEqual(peak_mountain_svg([1, 2, 3, 4]), peak_mountain_svg([10, 20, 30, 40]))
+        # All zeros still draws a flat area instead of dividing by zero
+        ET.fromstring(peak_mountain_svg([0, 0, 0, 0]))
+
+    def test_bar_draws_one_rect_per_answered_rating_and_all_value_labels(self):
+        root = ET.fromstring(question_bar_svg([3, 0, 1, 5]))
+        rects = root.findall(f".//{self.NS}rect")
+        self.assertEqual(len(rects), 3)
+        heights = [float(r.get("height")) for r in rects]
+        self.assertEqual(max(heights), heights[2])  # the 5 is the tallest bar
+
+        texts = ["".join(t.itertext()) for t in root.iter(f"{self.NS}text")]
+        self.assertEqual(texts[:4], ["3", "0", "1", "5"])
+
+    def test_chart_format_resolution(self):
+        with override_settings(REPORT_CHART_FORMAT="png"):
+            self.assertEqual(resolve_chart_format(None), "png")
+            self.assertEqual(resolve_chart_format("SVG"), "svg")
+            self.assertEqual(resolve_chart_format("gif"), "png")
+        with override_settings(REPORT_CHART_FORMAT="svg"):
+            self.assertEqual(resolve_chart_format(None), "svg")
+            self.assertEqual(resolve_chart_format("png"), "png")
+
+
+class QuestionBarBatchTests(SimpleTestCase):
+    def test_batch_figure_matches_one_figure_per_question(self):
+        samples = [[0, 1, 4, 3], [0, 0, 0, 0], [12, 0, 0, 1], [2, 2, 2, 2]]
+        single = [bytes(render_chart_png(generate_question_bar_chart, "q", c)) for c in samples]
+        self.assertEqual(generate_question_bar_charts(samples), single)
+
+
+class RendererSelectionTests(SimpleTestCase):
+    def test_per_job_choice_then_setting_then_docraptor(self):
+        with override_settings(REPORT_PDF_RENDERER="docraptor"):
+            self.assertIsInstance(get_renderer(None), DocRaptorRenderer)
+            self.assertIsInstance(get_renderer("WeasyPrint"), WeasyPrintRenderer)
+            self.assertIsInstance(get_renderer("prince"), DocRaptorRenderer)
+        with override_settings(REPORT_PDF_RENDERER="weasyprint"):
+            self.assertIsInstance(get_renderer(None), WeasyPrintRenderer)
+            self.assertIsInstance(get_renderer("docraptor"), DocRaptorRenderer)
+        with override_settings(REPORT_PDF_RENDERER="bogus"):
+            self.assertIsInstance(get_renderer(None), DocRaptorRenderer)
+
+
+@override_settings(REPORT_JOB_LEASE_SECONDS=60, REPORT_JOB_RETRY_BASE_SECONDS=10, REPORT_JOB_MAX_ATTEMPTS=2)
+class ReportJobQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("admin", "admin@example.com", "pw")
+        team = Team.objects.create(name="Imperials", admin=user)
+        cls.assessment = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+
+    def test_enqueue_is_idempotent_while_a_job_is_active(self):
+        job, created = jobs.enqueue_report_job(self.assessment)
+        again, created_again = jobs.enqueue_report_job(self.assessment)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(job.id, again.id)
+
+    def test_claim_takes_due_jobs_and_recovers_expired_leases(self):
+        job, _ = jobs.enqueue_report_job(self.assessment)
+        claimed = jobs.claim_next_job("w1")
+        self.assertEqual((claimed.id, claimed.status, claimed.attempts), (job.id, ReportJob.RUNNING, 1))
+        self.assertIsNone(jobs.claim_next_job("w2"))  # leased to w1
+
+        # w1 dies: once the lease runs out another worker takes the job over
+        ReportJob.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        recovered = jobs.claim_next_job("w2")
+        self.assertEqual((recovered.locked_by, recovered.attempts), ("w2", 2))
+        self.assertFalse(jobs.renew_lease(job, "w1"))
+        self.assertTrue(jobs.renew_lease(job, "w2"))
+
+    def test_failures_back_off_then_fail_for_good(self):
+        jobs.enqueue_report_job(self.assessment)
+        with mock.patch("apps.pdfexport.views.render_report", side_effect=RuntimeError("boom")):
+            job = jobs.claim_next_job("w1")
+            jobs.run_job(job, "w1")
+            job.refresh_from_db()
+            self.assertEqual(job.status, ReportJob.QUEUED)
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=5))
+            self.assertIn("boom", job.last_error)
+            self.assertIsNone(jobs.claim_next_job("w1"))  # not due yet
+
+            ReportJob.objects.filter(id=job.id).update(run_after=timezone.now())
+            jobs.run_job(jobs.claim_next_job("w1"), "w1")
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (ReportJob.FAILED, 2))
+
+    def test_lease_expired_on_the_last_attempt_fails_the_job(self):
+        job, _ = jobs.enqueue_report_job(self.assessment)
+        ReportJob.objects.filter(id=job.id).update(
+            status=ReportJob.RUNNING, attempts=job.max_attempts, locked_by="w1",
+            lease_expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(jobs.claim_next_job("w2"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ReportJob.FAILED, job.max_attempts))
+        self.assertEqual(status.current_report_status(self.assessment.id)["state"], status.FAILED)
+
+    def test_recovered_job_does_not_resubmit_to_docraptor(self):
+        job, _ = jobs.enqueue_report_job(self.assessment, renderer="docraptor")
+        jobs.claim_next_job("w1")
+        # w1 submitted the document, then died before recording success
+        FinalReport.objects.create(assessment=self.assessment, docraptor_status_id="job-1")
+        ReportJob.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        recovered = jobs.claim_next_job("w2")
+        with mock.patch("apps.pdfexport.views.render_report") as render:
+            jobs.run_job(recovered, "w2")
+        render.assert_not_called()
+        self.assertEqual(ReportJob.objects.get(id=job.id).status, ReportJob.SUCCEEDED)
+        self.assertEqual(FinalReport.objects.get(assessment=self.assessment).docraptor_status_id, "job-1")
+
+    def test_run_job_records_nothing_after_losing_its_lease(self):
+        jobs.enqueue_report_job(self.assessment)
+        job = jobs.claim_next_job("w1")
+        heartbeat = mock.Mock(lost=False)
+
+        def lose_lease(*args, **kwargs):
+            heartbeat.lost = True
+
+        with mock.patch.object(jobs, "Heartbeat", return_value=heartbeat), \
+                mock.patch("apps.pdfexport.views.render_report", side_effect=lose_lease), \
+                mock.patch.object(jobs, "mark_succeeded") as succeeded:
+            jobs.run_job(job, "w1")
+        succeeded.assert_not_called()
+        self.assertEqual(ReportJob.objects.get(id=job.id).status, ReportJob.RUNNING)
+
+    def test_worker_runs_the_queue_dry(self):
+        jobs.enqueue_report_job(self.assessment, renderer="docraptor")
+
+        def fake_render(assessment, fr, **kwargs):
+            fr.docraptor_status_id = "job-1"
+            fr.save()
+            return {"ok": True}
+
+        with mock.patch("apps.pdfexport.views.render_report", side_effect=fake_render) as render:
+            self.assertEqual(jobs.work(worker="w1", once=True), 1)
+        render.assert_called_once()
+        self.assertEqual(render.call_args.kwargs["renderer"], "docraptor")
+        self.assertEqual(ReportJob.objects.get().status, ReportJob.SUCCEEDED)
+        self.assertEqual(FinalReport.objects.get().docraptor_status_id, "job-1")
+
+    def test_start_endpoint_only_enqueues(self):
+        self.client.login(username="admin", password="pw")
+        with mock.patch("apps.pdfexport.views.render_report") as render:
+            r = self.client.post(f"/pdfexport/final-report/{self.assessment.id}/docraptor/start/?renderer=weasyprint")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.json()["queued"])
+        render.assert_not_called()
+        self.assertEqual(ReportJob.objects.get().renderer, "weasyprint")
+
+
+@override_settings(REPORT_WATCH_MIN_INTERVAL=2, REPORT_WATCH_MAX_INTERVAL=30)
+class DocRaptorWatcherTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("admin", "admin@example.com", "pw")
+        team = Team.objects.create(name="Imperials", admin=user)
+        cls.assessment = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+
+    def setUp(self):
+        cache.clear()
+        self.fr = FinalReport.objects.create(assessment=self.assessment, docraptor_status_id="job-1")
+        self.client_api = mock.Mock()
+
+    def _answer(self, st, **extra):
+        self.client_api.get_async_doc_status.return_value = mock.Mock(status=st, **extra)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual([watcher.next_interval(n) for n in range(1, 6)], [4, 8, 16, 30, 30])
+
+    def test_claim_due_pushes_the_next_check_out(self):
+        self.assertEqual([fr.id for fr in watcher.claim_due()], [self.fr.id])
+        self.assertEqual(watcher.claim_due(), [])  # not due again until the backoff passes
+        self.fr.refresh_from_db()
+        self.assertEqual(self.fr.docraptor_checks, 1)
+
+    def test_processing_publishes_rendering(self):
+        self._answer("processing")
+        watcher.check(self.fr, self.client_api)
+        self.assertEqual(status.get_report_status(self.assessment.id)["state"], status.RENDERING)
+        self.fr.refresh_from_db()
+        self.assertEqual(self.fr.docraptor_status, "processing")
+
+    def test_completed_stores_the_pdf_once(self):
+        self._answer("completed", download_url="https://docraptor.example/doc.pdf")
+        with mock.patch.object(watcher, "store_pdf", return_value=("reports/x.pdf", 1234)) as store:
+            watcher.check(self.fr, self.client_api)
+        store.assert_called_once_with(self.fr, "https://docraptor.example/doc.pdf")
+        self.fr.refresh_from_db()
+        self.assertEqual((self.fr.s3_key, self.fr.size_bytes), ("reports/x.pdf", 1234))
+        self.assertEqual(status.get_report_status(self.assessment.id)["state"], status.READY)
+        self.assertEqual(watcher.claim_due(), [])  # no longer in flight
+
+    def test_failed_job_is_cleared_and_published(self):
+        self._answer("failed", message="bad html")
+        watcher.check(self.fr, self.client_api)
+        self.fr.refresh_from_db()
+        self.assertIsNone(self.fr.docraptor_status_id)
+        self.assertEqual(status.get_report_status(self.assessment.id)["state"], status.FAILED)
+
+    @override_settings(REPORT_WATCH_MAX_CHECKS=3)
+    def test_job_that_never_stores_is_failed_after_max_checks(self):
+        self._answer("completed", download_url="https://docraptor.example/expired.pdf")
+        with mock.patch.object(watcher, "store_pdf", side_effect=OSError("upload rejected")) as store:
+            for _ in range(5):
+                FinalReport.objects.filter(id=self.fr.id).update(docraptor_next_check_at=None)
+                for fr in watcher.claim_due():
+                    watcher.check(fr, self.client_api)
+        self.assertEqual(store.call_count, 3)
+        self.fr.refresh_from_db()
+        self.assertIsNone(self.fr.docraptor_status_id)
+        self.assertEqual(status.get_report_status(self.assessment.id)["state"], status.FAILED)
+
+    def test_report_status_is_a_cache_read(self):
+        self.client.login(username="admin", password="pw")
+        status.publish_report_status(self.assessment.id, status.RENDERING)
+        with mock.patch("docraptor.DocApi") as api, \
+                mock.patch("apps.pdfexport.utils.storage.S3Uploader") as s3:
+            r = self.client.get(f"/payments/report-status/{self.assessment.id}/")
+        self.assertContains(r, "Rendering the PDF")
+        api.assert_not_called()
+        s3.assert_not_called()
+
+        status.publish_report_status(self.assessment.id, status.FAILED, "PDF generation failed. Please try again.")
+        self.assertContains(self.client.get(f"/payments/report-status/{self.assessment.id}/"), "hit a snag")
+
+
+class FakeS3:
+    """In-memory stand-in for the boto3 S3 calls upload_stream makes; ETags follow S3's rules."""
+
+    def __init__(self, corrupt_etag=False, kms=False):
+        self.objects, self.uploads = {}, {}
+        self.corrupt_etag = corrupt_etag
+        # SSE-KMS buckets return opaque ETags
+        self.sse = {"ServerSideEncryption": "aws:kms", "SSEKMSKeyId": "arn:aws:kms:key"} if kms else {}
+        self.in_flight = self.max_in_flight = 0
+        self.aborted = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _check_md5(body, content_md5):
+        digest = hashlib.md5(body).digest()
+        assert base64.b64encode(digest).decode() == content_md5, "Content-MD5 mismatch"
+        return digest
+
+    def put_object(self, Bucket, Key, Body, ContentMD5, **kw):
+        self._check_md5(Body, ContentMD5)
+        self.objects[Key] = bytes(Body)
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def create_multipart_upload(self, Bucket, Key, **kw):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, ContentMD5):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            digest = self._check_md5(Body, ContentMD5)
+            self.uploads[UploadId][PartNumber] = bytes(Body)
+            return {"ETag": f'"{uuid.uuid4().hex if self.sse else digest.hex()}"', **self.sse}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        self.objects[Key] = b"".join(parts[n] for n in numbers)
+        etag = hashlib.md5(b"".join(hashlib.md5(parts[n]).digest() for n in numbers)).hexdigest()
+        if self.sse:
+            return {"ETag": f'"{uuid.uuid4().hex}-{len(numbers)}"', **self.sse}
+        return {"ETag": f'"{"0" * 32 if self.corrupt_etag else etag}-{len(numbers)}"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(UploadId)
+        self.uploads.pop(UploadId, None)
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+
+class StreamedUploadTests(SimpleTestCase):
+    def _uploader(self, fake):
+        uploader = S3Uploader("bucket", "us-east-1", "test", "test", endpoint_url="http://localhost:9000")
+        uploader.client = fake
+        return uploader
+
+    @staticmethod
+    def _chunks(data, size=64 * 1024):
+        return (data[i:i + size] for i in range(0, len(data), size))
+
+    def test_multipart_round_trip_with_bounded_parts_in_flight(self):
+        fake = FakeS3()
+        data = os.urandom(3 * MIN_PART_SIZE + 12345)
+        key, size = self._uploader(fake).upload_stream(
+            self._chunks(data), "r.pdf", part_size=MIN_PART_SIZE, max_workers=2
+        )
+        self.assertEqual((key, size), ("r.pdf", len(data)))
+        self.assertEqual(fake.objects["r.pdf"], data)
+        self.assertLessEqual(fake.max_in_flight, 2)
+
+    def test_small_objects_use_a_single_put(self):
+        fake = FakeS3()
+        self.assertEqual(self._uploader(fake).upload_stream(self._chunks(b"%PDF-1.7 tiny"), "s.pdf"), ("s.pdf", 13))
+        self.assertEqual(fake.objects["s.pdf"], b"%PDF-1.7 tiny")
+        self.assertEqual(fake.uploads, {})
+
+    def test_etag_mismatch_deletes_the_object(self):
+        fake = FakeS3(corrupt_etag=True)
+        with self.assertRaises(ChecksumMismatch):
+            self._uploader(fake).upload_stream(
+                self._chunks(os.urandom(MIN_PART_SIZE + 1)), "bad.pdf", part_size=MIN_PART_SIZE
+            )
+        self.assertNotIn("bad.pdf", fake.objects)
+
+    def test_kms_etags_are_not_compared(self):
+        fake = FakeS3(kms=True)
+        data = os.urandom(MIN_PART_SIZE + 1)
+        self._uploader(fake).upload_stream(self._chunks(data), "kms.pdf", part_size=MIN_PART_SIZE)
+        self.assertEqual(fake.objects["kms.pdf"], data)
+
+    def test_broken_download_aborts_the_upload(self):
+        fake = FakeS3()
+
+        def chunks():
+            yield os.urandom(MIN_PART_SIZE)
+            raise ConnectionError("download dropped")
+
+        with self.assertRaises(ConnectionError):
+            self._uploader(fake).upload_stream(chunks(), "half.pdf", part_size=MIN_PART_SIZE)
+        self.assertEqual(len(fake.aborted), 1)
+        self.assertNotIn("half.pdf", fake.objects)
+
+
+@unittest.skipUnless(os.getenv("S3_TEST_ENDPOINT_URL"), "set S3_TEST_ENDPOINT_URL/S3_TEST_BUCKET to run against MinIO or moto_server")
+class StreamedUploadLiveTests(SimpleTestCase):
+    def test_round_trip(self):
+        uploader = S3Uploader(
+            os.environ.get("S3_TEST_BUCKET", "reports-test"), os.environ.get("AWS_S3_REGION_NAME", "us-east-1"),
+            os.environ.get("AWS_ACCESS_KEY_ID", "test"), os.environ.get("AWS_SECRET_ACCESS_KEY", "test"),
+            endpoint_url=os.environ["S3_TEST_ENDPOINT_URL"],
+        )
+        data = os.urandom(2 * MIN_PART_SIZE + 1)
+        key = f"tests/{uuid.uuid4().hex}.pdf"
+        self.assertEqual(uploader.upload_stream(iter([data]), key)[1], len(data))
+        try:
+            body = uploader.client.get_object(Bucket=uploader.bucket, Key=key)["Body"].read()
+            self.assertEqual(hashlib.md5(body).digest(), hashlib.md5(data).digest())
+        finally:
+            uploader.client.delete_object(Bucket=uploader.bucket, Key=key)
+
+
+@override_settings(REPORT_DOWNLOAD_URL_TTL=300, REPORT_DOWNLOAD_URL_MARGIN=60)
+class DownloadUrlCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user("admin", "admin@example.com", "pw")
+        team = Team.objects.create(name="Imperials", admin=user)
+        cls.assessment = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+
+    def setUp(self):
+        cache.clear()
+        self.fr = FinalReport.objects.create(assessment=self.assessment, s3_key="reports/a.pdf")
+        self.signed = []
+
+        def presign_get(key, expires_seconds, pretty_filename=None, content_type=None):
+            self.signed.append(key)
+            return f"https://s3.example/{key}?n={len(self.signed)}"
+
+        patcher = mock.patch("apps.pdfexport.renderers.report_uploader")
+        patcher.start().return_value.presign_get.side_effect = presign_get
+        self.addCleanup(patcher.stop)
+
+    def url(self, **kwargs):
+        return downloads.report_download_url(self.fr, pretty_filename="Imperials.pdf", **kwargs)
+
+    def test_reused_until_shortly_before_expiry(self):
+        with mock.patch.object(downloads.time, "time", return_value=1000):
+            first = self.url()
+            self.assertEqual(self.url(), first)
+            self.assertNotEqual(self.url(content_type="text/plain"), first)  # its own variant
+        with mock.patch.object(downloads.time, "time", return_value=1000 + 241):
+            self.assertNotEqual(self.url(), first)
+        self.assertEqual(len(self.signed), 3)
+
+    def test_new_s3_key_drops_cached_urls(self):
+        self.url()
+        self.fr.s3_key = "reports/b.pdf"
+        self.fr.save(update_fields=["s3_key"])
+        self.assertIsNone(cache.get(downloads.url_cache_key(self.fr.id)))
+        self.assertIn("reports/b.pdf", self.url())
+        self.assertEqual(self.signed, ["reports/a.pdf", "reports/b.pdf"])
+
+
+class ReportAssetBundleTests(SimpleTestCase):
+    def setUp(self):
+        assets.reset_bundle()
+        self.addCleanup(assets.reset_bundle)
+
+    def test_css_minifier_keeps_strings_and_selectors(self):
+        css = 'a > b , c { content: " | Page  " counter(page) ; } /* note */ @page :first { x: calc(1px - 2px) }'
+        self.assertEqual(assets.minify_css(css), 'a>b,c{content:" | Page  " counter(page)}@page :first{x:calc(1px - 2px)}')
+
+    def test_images_are_downscaled_to_print_size_only(self):
+        path = assets._find("images/Ascent-Organizational-Health-labels.png")
+        mime, data = assets.print_image(path, css_px=250, dpi=300)
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as im:
+            self.assertEqual((mime, im.width), ("image/png", 782))
+        small = assets._find("images/talent-magnetism.png")
+        _, data = assets.print_image(small, css_px=40, dpi=300)
+        with Image.open(small) as before, Image.open(io.BytesIO(data)) as after:
+            self.assertEqual(after.size, before.size)  # not resized, only re-encoded
+            self.assertEqual(after.mode, "P")
+            self.assertNotIn("dpi", after.info)
+        self.assertLess(len(data), small.stat().st_size)
+
+    def test_bundle_round_trip_and_inlined_context(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(REPORT_ASSET_BUNDLE_DIR=tmp):
+            bundle = assets.build_bundle()
+            assets.write_bundle(bundle)
+            self.assertEqual(assets.read_bundle(), bundle)
+            ctx = assets.report_assets("http://testserver/static/")
+
+        self.assertEqual((ctx["mode"], ctx["version"]), ("bundle", bundle["version"]))
+        self.assertEqual(set(ctx["img"]), set(assets.IMAGES))
+        self.assertTrue(all(src.startswith("data:image/") for src in ctx["img"].values()))
+        self.assertIn('format("woff2")', ctx["fonts"][0]["src"])
+        self.assertIn("“", bundle["charset"])  # from the template text
+        self.assertEqual(assets.missing_glyphs("Équipe “Ω”", ctx), "Ω")
+
+    @override_settings(REPORT_ASSETS="static")
+    def test_static_mode_links_static_urls(self):
+        ctx = assets.report_assets("http://testserver/static/")
+        self.assertIsNone(ctx["css"])
+        self.assertEqual(ctx["img"]["logo"], "http://testserver/static/images/logo.png")
+        self.assertEqual(assets.missing_glyphs("Ω", ctx), "")
+
+
+class StagedDeliveryTests(SimpleTestCase):
+    PNG = base64.b64encode(b"\x89PNG chart bytes").decode()
+
+    def setUp(self):
+        cache.clear()
+        self.uploads = {}
+        uploader = mock.Mock()
+        uploader.upload_bytes.side_effect = lambda data, key, content_type: self.uploads.setdefault(key, data)
+        uploader.upload_stream.side_effect = lambda chunks, key, content_type: self.uploads.setdefault(key, b"".join(chunks))
+        uploader.presign_get.side_effect = lambda key, expires_seconds: f"https://s3.example/{key}?sig=1"
+        patcher = mock.patch("apps.pdfexport.renderers.report_uploader", return_value=uploader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.uploader = uploader
+
+    def html(self):
+        uri = f"data:image/png;base64,{self.PNG}"
+        return f'<img src="{uri}"><img src="{uri}"><style>@page {{ background: url("{uri}") }}</style>'
+
+    def test_data_uris_become_shared_content_hashed_objects(self):
+        url, stats = staging.stage_report_html(self.html(), 7)
+        asset_keys = [k for k in self.uploads if "/assets/" in k]
+        self.assertEqual(len(asset_keys), 1)
+        self.assertTrue(asset_keys[0].endswith(".png"))
+        self.assertEqual(self.uploads[asset_keys[0]], b"\x89PNG chart bytes")
+
+        html_key = url.split("https://s3.example/")[1].split("?")[0]
+        self.assertTrue(html_key.startswith("report-staging/html/7/"))
+        staged = self.uploads[html_key].decode()
+        self.assertNotIn("data:image", staged)
+        self.assertEqual(staged.count(asset_keys[0]), 3)
+        self.assertEqual((stats["assets"], stats["uploaded"]), (1, 1))
+
+        # A retry (or another report with the same chart) only uploads its HTML
+        _, stats = staging.stage_report_html(self.html(), 8)
+        self.assertEqual(stats["uploaded"], 0)
+
+    @override_settings(REPORT_DOCRAPTOR_DELIVERY="staged")
+    def test_docraptor_gets_a_document_url(self):
+        fr = mock.Mock(assessment_id=7)
+        source = DocRaptorRenderer().document_source(fr, self.html())
+        self.assertEqual(list(source), ["document_url"])
+
+        self.uploader.upload_stream.side_effect = OSError("S3 down")
+        self.assertEqual(DocRaptorRenderer().document_source(fr, "<p>x</p>"), {"document_content": "<p>x</p>"})
+
+
+class ImageOptimizationTests(SimpleTestCase):
+    def pixels(self, png):
+        import numpy as np
+        from PIL import Image
+
+        with Image.open(io.BytesIO(png)) as im:
+            rgba = np.asarray(im.convert("RGBA")).astype(int)
+        rgba[rgba[..., 3] == 0] = 0
+        return rgba
+
+    def test_few_colour_images_get_an_exact_palette(self):
+        from PIL import Image
+
+        im = Image.new("RGBA", (120, 60), (0, 0, 0, 0))
+        im.paste((0, 147, 237, 255), (10, 10, 50, 50))
+        im.paste((11, 129, 203, 128), (60, 10, 110, 50))
+        buf = io.BytesIO()
+        im.save(buf, format="PNG", dpi=(180, 180))
+        original = buf.getvalue()
+
+        smaller = optimize_png(original, lossless=True)
+        self.assertLessEqual(len(smaller), len(original))
+        self.assertEqual(self.pixels(smaller).tolist(), self.pixels(original).tolist())
+        with Image.open(io.BytesIO(smaller)) as out:
+            self.assertEqual(out.mode, "P")
+            self.assertNotIn("dpi", out.info)
+
+    def test_charts_are_recompressed_without_changing_a_pixel(self):
+        png = bytes(generate_question_bar_charts([[1, 5, 7, 2]])[0])
+        small = optimize_png(png, max_colors=256)
+        self.assertLess(len(small), len(png))
+        self.assertEqual(self.pixels(small).tolist(), self.pixels(png).tolist())
+
+    def test_lossy_quantization_is_opt_in(self):
+        png = bytes(generate_question_bar_charts([[1, 5, 7, 2]])[0])
+        small = optimize_png(png, max_colors=256, lossless=False)
+        self.assertLess(len(small), len(png) * 0.6)
+        # Only anti-aliased edges move, and not far
+        self.assertLess(abs(self.pixels(small) - self.pixels(png)).max(), 48)
+
+    @override_settings(REPORT_CHART_PALETTE_COLORS=256, REPORT_CHART_POOL_SIZE=0)
+    def test_render_charts_returns_optimized_pngs(self):
+        from PIL import Image
+        from apps.pdfexport.utils.chart_pool import _render_many, render_charts
+
+        job = ("mountain", ("m", [1, 2, 3, 4]))
+        png, = render_charts([job])
+        raw, = _render_many([job])
+        self.assertEqual(self.pixels(png).tolist(), self.pixels(raw).tolist())
+        with Image.open(io.BytesIO(png)) as im:
+            self.assertNotIn("Software", im.info)
+        with override_settings(REPORT_CHART_PALETTE_LOSSY=True):
+            lossy, = render_charts([job])
+        with Image.open(io.BytesIO(lossy)) as im:
+            self.assertEqual(im.mode, "P")
+
+
+@override_settings(REPORT_ASSETS="static", REPORT_HTML_CHUNK_QUESTIONS=2, REPORT_CHART_CACHE_SHARED=False)
+class SectionedReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.assessment = report_assessment(questions=10)
+
+    def test_charts_are_drawn_chunk_by_chunk(self):
+        from apps.pdfexport import views
+
+        drawn = []
+        draw = views._draw_charts
+        with mock.patch.object(views, "_draw_charts", side_effect=lambda charts, fmt: (drawn.append(len(charts)), draw(charts, fmt))):
+            html = views.build_report_html(self.assessment, stage=6, chart_format="svg")
+
+        self.assertLessEqual(max(drawn), 2)
+        self.assertEqual(sum(drawn), 4 + 10)
+        self.assertEqual(html.count('class="question-block"'), 10)
+        self.assertIn("<strong>3. Question 9:", html)  # numbering carries across chunks
+        self.assertTrue(html.rstrip().endswith("</html>"))
+
+    def test_render_report_hands_renderers_a_spooled_file(self):
+        from apps.pdfexport import views
+        from apps.pdfexport.renderers import read_document
+
+        fr = FinalReport.objects.create(assessment=self.assessment)
+        renderer = mock.Mock()
+        renderer.start.side_effect = lambda fr, document, **kwargs: read_document(document)
+        renderer.name = "docraptor"
+        with mock.patch.object(views, "get_renderer", return_value=renderer), \
+                mock.patch("apps.pdfexport.renderers.report_uploader") as uploader:
+            uploader.return_value.object_size.return_value = None  # nothing stored for these inputs yet
+            uploader.return_value.download_stream.return_value = None
+            html = views.render_report(self.assessment, fr, stage=6, chart_format="svg")
+        self.assertEqual(html, views.build_report_html(self.assessment, stage=6, chart_format="svg"))
+        self.assertEqual(len(FinalReport.objects.get(id=fr.id).input_fingerprint), 64)
+
+
+@override_settings(REPORT_ASSETS="static", REPORT_CHART_CACHE_SHARED=False)
+class ReportFingerprintTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.assessment = report_assessment(questions=10)
+
+    def setUp(self):
+        cache.clear()
+        self.renderer = mock.Mock()
+        self.renderer.name = "docraptor"
+        self.uploader = mock.Mock()
+        self.uploader.object_size.return_value = None
+        self.uploader.download_stream.return_value = None
+        for target, value in (("apps.pdfexport.views.get_renderer", self.renderer),
+                              ("apps.pdfexport.renderers.report_uploader", self.uploader)):
+            patcher = mock.patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fingerprint(self, **kwargs):
+        from apps.pdfexport.fingerprint import report_fingerprint
+
+        return report_fingerprint(self.assessment, **{"stage": 6, "chart_format": "svg", "renderer": "docraptor", **kwargs})
+
+    def render(self):
+        from apps.pdfexport import views
+
+        fr, _ = FinalReport.objects.get_or_create(assessment=self.assessment)
+        return views.render_report(self.assessment, fr, stage=6, chart_format="svg"), fr
+
+    def test_fingerprint_covers_stage_renderer_and_content(self):
+        from apps.reports.content import invalidate_report_content
+        from apps.reports.models import PeakInsights
+
+        fp = self.fingerprint()
+        self.assertEqual(self.fingerprint(), fp)
+        self.assertNotEqual(self.fingerprint(stage=5), fp)
+        self.assertNotEqual(self.fingerprint(renderer="weasyprint"), fp)
+
+        PeakInsights.objects.create(peak="CC", range_label="MODERATE", insight_text="New insight")
+        invalidate_report_content()
+        self.assertNotEqual(self.fingerprint(), fp)
+
+    def test_unchanged_inputs_reuse_another_reports_pdf(self):
+        other = Assessment.objects.create(team=self.assessment.team, deadline=date(2025, 3, 31))
+        FinalReport.objects.create(assessment=other, s3_key="reports/shared.pdf", size_bytes=123,
+                                   input_fingerprint=self.fingerprint())
+
+        payload, fr = self.render()
+        self.assertTrue(payload["reused"])
+        self.renderer.start.assert_not_called()
+        fr.refresh_from_db()
+        self.assertEqual((fr.s3_key, fr.size_bytes), ("reports/shared.pdf", 123))
+        self.assertEqual(status.current_report_status(self.assessment.id)["state"], status.READY)
+
+    def test_pdf_already_at_the_fingerprinted_key_is_reused(self):
+        self.uploader.object_size.return_value = 4567
+        payload, fr = self.render()
+        self.renderer.start.assert_not_called()
+        fr.refresh_from_db()
+        self.assertIn(f"/{self.fingerprint()[:16]}/", fr.s3_key)
+        self.assertEqual(fr.size_bytes, 4567)
+
+    def test_new_inputs_render_under_a_fingerprinted_key(self):
+        self.render()
+        self.renderer.start.assert_called_once()
+        fr = FinalReport.objects.get(assessment=self.assessment)
+        self.assertEqual(fr.input_fingerprint, self.fingerprint())
+        key = self.uploader.object_size.call_args.args[0]
+        self.assertTrue(key.startswith(f"reports/assessments/{self.assessment.id}/{fr.input_fingerprint[:16]}/"))
+
+
+@override_settings(REPORT_PRERENDER_PAUSE_SECONDS=0, REPORT_PRERENDER_PREFIX="prerender/")
+class PrerenderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.assessment = report_assessment(questions=10)
+
+    def setUp(self):
+        cache.clear()
+        self.assessment.score_snapshot.reason = "completed"
+        self.assessment.score_snapshot.save()
+        self.stored = {}
+        self.uploader = mock.Mock()
+        self.uploader.object_size.side_effect = lambda key: len(self.stored[key]) if key in self.stored else None
+        self.uploader.upload_stream.side_effect = self.upload
+        self.uploader.download_stream.side_effect = lambda key, **kw: iter([self.stored[key]]) if key in self.stored else None
+        for target, kwargs in (("apps.pdfexport.renderers.report_uploader", {"return_value": self.uploader}),
+                               ("apps.pdfexport.prerender.default_render_options", {"return_value": (6, "svg", "docraptor")})):
+            patcher = mock.patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def upload(self, chunks, key, content_type=None):
+        self.stored[key] = b"".join(chunks)
+        return "etag", len(self.stored[key])
+
+    def test_sweep_stores_html_of_closed_assessments_once(self):
+        from apps.pdfexport import prerender
+        from apps.pdfexport.fingerprint import report_fingerprint
+
+        open_assessment = Assessment.objects.create(team=self.assessment.team, deadline=date.today() + timedelta(days=7))
+        self.assertEqual(prerender.sweep(), 1)
+        fingerprint = report_fingerprint(self.assessment, stage=6, chart_format="svg", renderer="docraptor")
+        [key] = self.stored
+        self.assertTrue(key.startswith(f"prerender/{fingerprint}-"))
+        self.assertTrue(self.stored[key].decode("utf-8").rstrip().endswith("</html>"))
+        self.assertNotIn(open_assessment, prerender.candidates())
+
+        self.assertEqual(prerender.sweep(), 0)
+        self.uploader.upload_stream.assert_called_once()
+
+    def test_deadline_snapshots_stay_within_the_age_window(self):
+        from apps.pdfexport import prerender
+        from apps.reports.models import ScoreSnapshot
+
+        team = self.assessment.team
+        recent = Assessment.objects.create(team=team, deadline=date.today() - timedelta(days=2), launched_at=timezone.now())
+        Assessment.objects.create(team=team, deadline=date.today() - timedelta(days=400), launched_at=timezone.now())
+
+        self.assertEqual(prerender.snapshot_closed(), 1)
+        self.assertEqual(list(ScoreSnapshot.objects.filter(reason="deadline").values_list("assessment", flat=True)), [recent.id])
+
+    def test_sweep_yields_to_queued_report_jobs(self):
+        from apps.pdfexport import prerender
+
+        job, _ = jobs.enqueue_report_job(Assessment.objects.create(team=self.assessment.team, deadline=date(2025, 9, 30)))
+        self.assertEqual(prerender.sweep(), 0)
+        self.uploader.upload_stream.assert_not_called()
+
+        ReportJob.objects.filter(id=job.id).update(status=ReportJob.SUCCEEDED)
+        self.assertEqual(prerender.sweep(), 1)
+
+    def test_render_report_converts_prerendered_html(self):
+        from apps.pdfexport import prerender, views
+        from apps.pdfexport.renderers import read_document
+
+        prerender.prerender(self.assessment)
+        [html] = self.stored.values()
+        fr = FinalReport.objects.create(assessment=self.assessment)
+        renderer = mock.Mock()
+        renderer.name = "docraptor"
+        renderer.start.side_effect = lambda fr, document, **kwargs: read_document(document)
+        with mock.patch.object(views, "get_renderer", return_value=renderer), \
+                mock.patch.object(views, "write_report_html") as build:
+            rendered = views.render_report(self.assessment, fr, stage=6, chart_format="svg")
+        build.assert_not_called()
+        self.assertEqual(rendered, html.decode("utf-8"))
@@ -0,0 +1,162 @@
+"""
+Content-addressed cache for report chart images.
+
+A peak or question chart depends only on its four counts, and identical
+distributions are common across questions and assessments, so finished
+images are cached by (chart kind, normalized counts, style version and,
+for PNGs, palette size and mode):
+
+- tier 1: in-process LRU (REPORT_CHART_CACHE_SIZE entries per worker)
+- tier 2: optional shared Django cache (REPORT_CHART_CACHE_SHARED), so
+  every worker and deploy reuses images rendered elsewhere
+
+Trend charts are drawn from a series instead of four counts; they are
+keyed by a digest of (labels, scores).
+
+Bump STYLE_VERSION whenever the look of a chart changes.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import reduce
+from math import gcd
+
+from django.conf import settings
+from django.core.cache import cache
+
+STYLE_VERSION = 2
+
+# Charts that rescale their input to percentages, so [2, 4, 6, 8] and
+# [1, 2, 3, 4] draw the same image.
+SCALE_INVARIANT_KINDS = {"mountain", "mountain-svg"}
+
+# Charts keyed by a digest of their data rather than four counts
+SERIES_KINDS = {"trend"}
+
+
+def normalize_counts(kind, counts):
+    vals = tuple(int(counts[i]) if i < len(counts) else 0 for i in range(4))
+    if kind in SCALE_INVARIANT_KINDS:
+        divisor = reduce(gcd, vals) or 1
+        vals = tuple(v // divisor for v in vals)
+    return vals
+
+
+def style_tag(kind):
+    """
+    Style version, plus for PNG charts the palette size and mode
+    (REPORT_CHART_PALETTE_COLORS, REPORT_CHART_PALETTE_LOSSY).
+    """
+    if kind.endswith("-svg"):
+        return f"v{STYLE_VERSION}"
+    lossy = "q" if getattr(settings, "REPORT_CHART_PALETTE_LOSSY", False) else ""
+    return f"v{STYLE_VERSION}p{int(getattr(settings, 'REPORT_CHART_PALETTE_COLORS', 0) or 0)}{lossy}"
+
+
+def chart_key(kind, counts):
+    if kind in SERIES_KINDS:
+        blob = json.dumps(counts, separators=(",", ":"), ensure_ascii=False)
+        return f"chart:{kind}:{style_tag(kind)}:{hashlib.sha1(blob.encode('utf-8')).hexdigest()}"
+    vals = normalize_counts(kind, counts)
+    return f"chart:{kind}:{style_tag(kind)}:{'-'.join(str(v) for v in vals)}"
+
+
+class ChartCache:
+    def __init__(self, max_items=512, shared=False, shared_timeout=60 * 60 * 24 * 30):
+        self.max_items = max_items
+        self.shared = shared
+        self.shared_timeout = shared_timeout
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get_or_render(self, kind, counts, render):
+        """
+        Return the cached image for (kind, counts); otherwise call render()
+        and cache its result. render() takes no arguments.
+        """
+        key = chart_key(kind, counts)
+        value = self._lookup(key)
+        if value is None:
+            value = render()
+            self._store(key, value)
+        return value
+
+    def get_or_render_many(self, items, render_many):
+        """
+        Batch form of get_or_render. items: [(kind, counts, job)]. render_many
+        gets the jobs of the distinct misses in one call and must return their
+        images in the same order. Returns one image per item, in order.
+        """
+        keys = [chart_key(kind, counts) for kind, counts, _ in items]
+        found = {}
+        missing = {}
+        for key, (_, _, job) in zip(keys, items):
+            if key in found or key in missing:
+                with self._lock:
+                    self.hits += 1  # repeated within the batch; drawn once
+                continue
+            value = self._lookup(key)
+            if value is None:
+                missing[key] = job
+            else:
+                found[key] = value
+
+        if missing:
+            for key, value in zip(missing, render_many(list(missing.values()))):
+                self._store(key, value)
+                found[key] = value
+        return [found[key] for key in keys]
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._lru[key]
+
+        value = cache.get(key) if self.shared else None
+        if value is not None:
+            with self._lock:
+                self.shared_hits += 1
+            self._remember(key, value)
+        return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self.misses += 1
+        self._remember(key, value)
+        if self.shared:
+            cache.set(key, value, timeout=self.shared_timeout)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_items:
+                self._lru.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "size": len(self._lru),
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+
+chart_cache = ChartCache(
+    max_items=getattr(settings, "REPORT_CHART_CACHE_SIZE", 512),
+    shared=getattr(settings, "REPORT_CHART_CACHE_SHARED", False),
+)
@@ -0,0 +1,161 @@
+"""
+Warm process pool for matplotlib chart rendering.
+
+matplotlib holds the GIL and slowly leaks figure memory, so report charts are
+drawn in a small pool of worker processes instead of the web worker:
+
+- each worker imports matplotlib once, sets Agg and draws a throwaway figure
+  so fonts and the text layout cache are warm before the first real chart
+- a report submits all of its charts as one batch and gets PNGs back in order;
+  bar charts in a chunk reuse the worker's pre-laid-out figure
+  (charts.generate_question_bar_charts)
+- workers are replaced after REPORT_CHART_POOL_MAX_TASKS charts to cap memory
+- PNGs are recompressed losslessly (images.optimize_png: exact palette when
+  they have few enough colours) in the worker, so the web process only gets
+  and caches the small version; REPORT_CHART_PALETTE_LOSSY opts into quantizing
+
+REPORT_CHART_POOL_SIZE = 0 draws in-process (local dev, tests). If the pool
+breaks, the batch is drawn in-process and the pool is rebuilt on next use.
+
+Workers never load Django: they only import apps.pdfexport.utils.charts.
+"""
+import atexit
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+import logging
+logger = logging.getLogger(__name__)
+
+# kind -> name of the drawing function in apps.pdfexport.utils.charts
+CHART_FUNCTIONS = {
+    "mountain": "generate_peak_mountain_chart",
+    "bar": "generate_question_bar_chart",
+    "trend": "generate_trend_chart",
+}
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+
+
+# --- Worker side ---
+def _warm_worker():
+    """Pool initializer: pay the matplotlib import and font lookup once per worker."""
+    import matplotlib
+    matplotlib.use("Agg")
+    from apps.pdfexport.utils import charts
+
+    charts.render_chart_png(charts.generate_peak_mountain_chart, "", [1, 1, 1, 1])
+    charts.generate_question_bar_charts([[1, 1, 1, 1]])
+
+
+def _render(job):
+    """job: (kind, args). Returns the PNG as bytes."""
+    from apps.pdfexport.utils import charts
+
+    kind, args = job
+    chart_fn = getattr(charts, CHART_FUNCTIONS[kind])
+    return bytes(charts.render_chart_png(chart_fn, *args))
+
+
+def _render_many(jobs, palette_colors=0, lossy=False):
+    """
+    Render a chunk of jobs; bar charts share this process's reusable figure.
+    With palette_colors, every PNG goes through images.optimize_png
+    (quantized to that many colours only when lossy).
+    """
+    from apps.pdfexport.utils import charts
+    from apps.pdfexport.utils.images import optimize_png
+
+    bar_counts = [args[1] for kind, args in jobs if kind == "bar"]
+    bars = iter(charts.generate_question_bar_charts(bar_counts))
+    pngs = [next(bars) if kind == "bar" else _render((kind, args)) for kind, args in jobs]
+    if palette_colors:
+        pngs = [optimize_png(png, max_colors=palette_colors, lossless=not lossy) for png in pngs]
+    return pngs
+
+
+# --- Web side ---
+def pool_size():
+    return max(0, int(getattr(settings, "REPORT_CHART_POOL_SIZE", 0) or 0))
+
+
+def palette_colors():
+    return max(0, int(getattr(settings, "REPORT_CHART_PALETTE_COLORS", 0) or 0))
+
+
+def palette_lossy():
+    return bool(getattr(settings, "REPORT_CHART_PALETTE_LOSSY", False))
+
+
+def get_pool():
+    """The process pool for this process, created on first use (and after a fork)."""
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=pool_size(),
+                # spawn: never fork a threaded gunicorn worker; required for max_tasks_per_child
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+                max_tasks_per_child=getattr(settings, "REPORT_CHART_POOL_MAX_TASKS", 200) or None,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_pool(wait=True):
+    global _pool, _pool_pid
+    with _lock:
+        pool, pid = _pool, _pool_pid
+        _pool = _pool_pid = None
+    # A pool inherited through fork belongs to the parent; leave it alone.
+    if pool is not None and pid == os.getpid():
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def warm_pool():
+    """Start every worker now (e.g. from a post-fork hook) instead of on the first report."""
+    if not pool_size():
+        return
+    pool = get_pool()
+    list(pool.map(_render, [("mountain", ("", [1, 1, 1, 1]))] * pool_size()))
+
+
+def render_charts(jobs):
+    """
+    Render a batch of charts; jobs: [(kind, args)] with kind in CHART_FUNCTIONS
+    and args as passed to the chart function (without the output path).
+    Returns the PNG bytes for each job, in order.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+
+    t0 = time.monotonic()
+    render_many = functools.partial(_render_many, palette_colors=palette_colors(), lossy=palette_lossy())
+    if pool_size():
+        try:
+            size = pool_size()
+            step = max(1, -(-len(jobs) // (size * 2)))  # ~2 chunks per worker
+            chunks = [jobs[i:i + step] for i in range(0, len(jobs), step)]
+            results = [png for chunk in get_pool().map(render_many, chunks) for png in chunk]
+            logger.info("[PDF] chart pool rendered %s charts in %.2fs", len(jobs), time.monotonic() - t0)
+            return results
+        except BrokenProcessPool:
+            logger.exception("[PDF] chart pool broke; rendering %s charts in-process", len(jobs))
+            shutdown_pool(wait=False)
+
+    results = render_many(jobs)
+    logger.info("[PDF] rendered %s charts in-process in %.2fs", len(jobs), time.monotonic() - t0)
+    return results
+
+
+atexit.register(shutdown_pool, wait=False)
@@ -1,12 +1,10 @@
-from collections import Counter
-from apps.assessments.models import Answer, Question
+import io
 import tempfile
+import threading
 from contextlib import contextmanager
 import os
-import matplotlib
-matplotlib.use("Agg")  # headless
-import matplotlib.pyplot as plt
-import numpy as np
+# matplotlib / numpy are imported inside each chart function so that importing
+# this module (views, chart pool) stays cheap; only drawing pays for them.
 
 
 def generate_peak_mountain_chart(title, percentages, output_path):
@@ -16,7 +14,7 @@ def generate_peak_mountain_chart(title, percentages, output_path):
     Args:
         title (str): Peak name (not rendered for now)
         percentages (list[float|int]): Four values for ratings 0..3
-        output_path (str): PNG path to save to
+        output_path (str | file): PNG path, or a binary file object such as BytesIO
     """
     import numpy as np
     import matplotlib
@@ -56,7 +54,7 @@ def generate_peak_mountain_chart(title, percentages, output_path):
         ax.spines[side].set_visible(False)
 
     plt.tight_layout(pad=0.2)
-    fig.savefig(output_path, bbox_inches="tight", pad_inches=0.02, transparent=True)
+    fig.savefig(output_path, format="png", bbox_inches="tight", pad_inches=0.02, transparent=True)
     plt.close(fig)
 
 
@@ -116,23 +114,11 @@ def get_peak_rating_distribution(assessment, peak_code):
     The order is: [Consistently Untrue, Somewhat Untrue, Somewhat True, Consistently True]
     Which maps to: [0, 1, 2, 3]
     """
-    # Get all questions for this peak
-    questions = Question.objects.filter(peak__code=peak_code)
+    # Imported here so chart pool workers can load this module without Django
+    from apps.reports.scoring import empty_histogram, get_assessment_histograms, rating_percentages
 
-    # Get all answers to those questions for this assessment
-    answers = Answer.objects.filter(
-        participant__assessment=assessment,
-        question__in=questions
-    ).values_list("value", flat=True)
-
-    total = len(answers)
-    counter = Counter(answers)
-
-    if total == 0:
-        return [0, 0, 0, 0]
-
-    # Calculate percentages in the correct order
-    return [round((counter.get(i, 0) / total) * 100) for i in range(4)]
+    counts = get_assessment_histograms(assessment)["peaks"].get(peak_code, empty_histogram())
+    return rating_percentages(counts)
 
 
 # Bar chart for each question
@@ -145,6 +131,8 @@ def generate_question_bar_chart(question_text: str, counts, output_path: str):
     - Diagonal x tick labels (Consistently Untrue .. Consistently True)
     - Small numeric labels above each bar
     - Transparent background so it sits on your PDF panel nicely
+
+    output_path may be a PNG path or a binary file object such as BytesIO.
     """
     import numpy as np
     import matplotlib
@@ -197,7 +185,137 @@ def generate_question_bar_chart(question_text: str, counts, output_path: str):
         )
 
     fig.tight_layout(pad=0.2)
-    fig.savefig(output_path, bbox_inches="tight", pad_inches=0.02, transparent=True)
+    fig.savefig(output_path, format="png", bbox_inches="tight", pad_inches=0.02, transparent=True)
+    plt.close(fig)
+
+# Batch mode for the question bar chart: one figure, reused artists
+class QuestionBarChartBatch:
+    """
+    Draws question bar charts on a single pre-laid-out figure. Only the bar
+    heights, value labels and y limit change between charts, so the figure,
+    tick labels and tight layout are built once and reused for every question
+    of every peak and assessment this process renders.
+
+    Output matches generate_question_bar_chart byte for byte.
+    """
+
+    def __init__(self):
+        import numpy as np
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from matplotlib.transforms import Bbox
+
+        self._plt = plt
+        self.fig, self.ax = plt.subplots(figsize=(3.6, 1.8), dpi=180)
+        ax = self.ax
+        x = np.arange(4)
+        self.bars = ax.bar(x, [1, 1, 1, 1], width=0.65, color="#0093ED")
+
+        for side in ("top", "right", "left", "bottom"):
+            ax.spines[side].set_visible(False)
+        ax.set_xticks(x, labels=[
+            "Consistently\nUntrue",
+            "Somewhat\nUntrue",
+            "Somewhat\nTrue",
+            "Consistently\nTrue",
+        ])
+        ax.tick_params(axis="x", labelsize=10, pad=2, rotation=-32)
+        for t in ax.get_xticklabels():
+            t.set_ha("left")
+            t.set_va("top")
+        ax.set_yticks([])
+        ax.set_ylabel("")
+        ax.set_xlabel("")
+        ax.set_ylim(0, 1.35)
+
+        self.labels = [
+            ax.text(rect.get_x() + rect.get_width() / 2, 1.04, "1", ha="center", va="bottom", fontsize=12)
+            for rect in self.bars
+        ]
+
+        # Layout once. Value labels always sit inside the axes (ylim leaves 35%
+        # headroom), so the tight bounding box is the same for every chart.
+        self.fig.tight_layout(pad=0.2)
+        tight = self.fig.get_tightbbox(self.fig.canvas.get_renderer())
+        self.bbox = Bbox.from_extents(tight.x0 - 0.02, tight.y0 - 0.02, tight.x1 + 0.02, tight.y1 + 0.02)
+
+    def render(self, counts):
+        """PNG bytes for one question (answers 0..3)."""
+        vals = [(int(counts[i]) if i < len(counts) else 0) for i in range(4)]
+        ymax = max(vals + [1])
+        self.ax.set_ylim(0, ymax * 1.35)
+        for rect, label, v in zip(self.bars, self.labels, vals):
+            rect.set_height(v)
+            label.set_y(v + ymax * 0.04)
+            label.set_text(f"{v}")
+
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format="png", bbox_inches=self.bbox, transparent=True)
+        return buf.getvalue()
+
+    def render_many(self, counts_list):
+        return [self.render(counts) for counts in counts_list]
+
+
+_bar_batch = None
+_bar_batch_lock = threading.Lock()
+
+
+def generate_question_bar_charts(counts_list):
+    """
+    Batch form of generate_question_bar_chart: PNG bytes for every question
+    of a peak (or any list of 4-value counts), in order.
+    """
+    global _bar_batch
+    with _bar_batch_lock:
+        if _bar_batch is None:
+            _bar_batch = QuestionBarChartBatch()
+        return _bar_batch.render_many(counts_list)
+
+
+# Small-multiple trend line for one peak or question across assessments
+def generate_trend_chart(title, labels, scores, output_path):
+    """
+    Render a compact trend line of 0–100 scores across successive assessments,
+    in the same style as the peak mountain chart.
+
+    Args:
+        title (str): Peak/question name (not rendered, like the mountain chart)
+        labels (list[str]): One x label per assessment, oldest first
+        scores (list[int|None]): One score per assessment; None leaves a gap
+        output_path (str | file): PNG path, or a binary file object such as BytesIO
+    """
+    import numpy as np
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    x = np.arange(len(labels))
+    y = np.array([np.nan if v is None else float(v) for v in scores], dtype=float)
+
+    fig, ax = plt.subplots(figsize=(3.6, 1.6), dpi=180)
+
+    ax.fill_between(x, 0, y, color="#0093ED", alpha=0.25)
+    ax.plot(x, y, linewidth=1.5, color="#0b81cb", marker="o", markersize=4)
+
+    # Value labels on each point
+    for xi, yi in zip(x, y):
+        if not np.isnan(yi):
+            ax.text(xi, yi + 6, f"{int(yi)}%", ha="center", va="bottom", fontsize=8)
+
+    ax.set_xlim(-0.3, max(len(labels) - 1, 0) + 0.3)
+    ax.set_ylim(0, 115)
+    ax.set_xticks(x, labels=labels)
+    ax.tick_params(axis="x", labelsize=8, pad=2)
+
+    ax.set_yticks([])
+    for side in ("top", "right", "left"):
+        ax.spines[side].set_visible(False)
+    ax.spines["bottom"].set_color("#cccccc")
+
+    fig.tight_layout(pad=0.2)
+    fig.savefig(output_path, format="png", bbox_inches="tight", pad_inches=0.02, transparent=True)
     plt.close(fig)
 
 # def generate_question_bar_chart(question_text, rating_counts, output_path):
@@ -218,6 +336,18 @@ def generate_question_bar_chart(question_text: str, counts, output_path: str):
 
 #     fig.write_image(output_path, width=320, height=180, format="svg")
 
+# Render any chart above straight into memory (no temp file round-trip)
+def render_chart_png(chart_fn, *args):
+    """
+    Call chart_fn(*args, output) with an in-memory buffer and return the PNG
+    as a memoryview over that buffer (no copy). Feed it to
+    images.png_bytes_to_data_uri or write it wherever it needs to go.
+    """
+    buf = io.BytesIO()
+    chart_fn(*args, buf)
+    return buf.getbuffer()
+
+
 # Creates temp pngs for graphs/charts
 @contextmanager
 def temporary_plotly_images(figures, format="svg"):
@@ -1,8 +1,63 @@
 import base64
+import io
 from pathlib import Path
 
+
+def png_bytes_to_data_uri(data) -> str:
+    """data: bytes, bytearray or memoryview holding a PNG."""
+    b64 = base64.b64encode(data).decode("ascii")
+    return f"data:image/png;base64,{b64}"
+
+
 def png_path_to_data_uri(path: str) -> str:
     p = Path(path)
     with p.open("rb") as f:
-        b64 = base64.b64encode(f.read()).decode("ascii")
-    return f"data:image/png;base64,{b64}"
\ No newline at end of file
+        return png_bytes_to_data_uri(f.read())
+
+
+# --- Helper: smaller PNGs for the report (charts at render time, static images at deploy) ---
+def _exact_palette(rgba, max_colors):
+    """Palette ("P") copy of an RGBA image if it has at most max_colors colours, else None."""
+    import numpy as np
+    from PIL import Image
+
+    pixels = np.asarray(rgba).copy()
+    pixels[pixels[..., 3] == 0] = 0  # fully transparent pixels all look the same
+    packed = pixels.view(np.uint32).reshape(pixels.shape[:2])
+    colors, index = np.unique(packed, return_inverse=True)
+    if len(colors) > max_colors:
+        return None
+    out = Image.fromarray(index.reshape(packed.shape).astype(np.uint8))  # 2-D uint8 -> "L"
+    out = out.convert("P")  # same indexes, palette set below
+    out.putpalette(colors.view(np.uint8).tobytes(), rawmode="RGBA")
+    return out
+
+
+def optimize_png(data, max_colors=256, lossless=True) -> bytes:
+    """
+    Re-encode a PNG as small as it will go without changing a pixel:
+    metadata (Software, dpi, text) dropped, zlib optimized, and stored as a
+    palette PNG with transparency when it has at most max_colors colours.
+
+    Images with more colours (anti-aliased chart edges) are only
+    recompressed, unless lossless=False opts into quantizing them to
+    max_colors. max_colors=0 never uses a palette. Returns the original bytes when re-encoding does not help.
+    """
+    from PIL import Image
+
+    data = bytes(data)
+    with Image.open(io.BytesIO(data)) as im:
+        rgba = im.convert("RGBA")
+
+    out = rgba
+    if max_colors:
+        palette = _exact_palette(rgba, max_colors)
+        if palette is not None:
+            out = palette
+        elif not lossless:
+            out = rgba.quantize(colors=max_colors, method=Image.Quantize.FASTOCTREE)
+
+    buf = io.BytesIO()
+    out.save(buf, format="PNG", optimize=True)
+    smaller = buf.getvalue()
+    return smaller if len(smaller) < len(data) else data
@@ -1,10 +1,6 @@
-import os
-import docraptor
+from django.conf import settings
 
-def _get_api_key():
-    return (
-        os.getenv("DOC_RAPTOR_API_KEY")
-    )
+from apps.common.clients import docraptor_client
 
 def render_pdf_from_html(html_content: str, filename: str, *, test: bool = True, javascript: bool = False) -> bytes:
     """
@@ -14,12 +10,10 @@ def render_pdf_from_html(html_content: str, filename: str, *, test: bool = True,
     - test: True => free test PDFs with watermark 
     - javascript: True if your HTML uses Chart.js (or any JS)
     """
-    api_key = _get_api_key()
-    if not api_key:
-        raise RuntimeError("DocRaptor API key not set (DOC_RAPTOR_API_KEY).")
+    if not settings.DOCRAPTOR_API_KEY:
+        raise RuntimeError("DocRaptor API key not set (DOCRAPTOR_API_KEY).")
 
-    client = docraptor.DocApi()
-    client.api_client.configuration.username = api_key
+    client = docraptor_client()
 
     doc = {
         "test": bool(test),
@@ -1,18 +1,59 @@
+import base64
+import hashlib
 import io
-import boto3
-from botocore.client import Config
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote as urlquote
 
+import logging
+logger = logging.getLogger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+
+
+class ChecksumMismatch(Exception):
+    """S3 stored something other than what we streamed."""
+
+
+def _md5(data):
+    digest = hashlib.md5(data)
+    return digest.digest(), base64.b64encode(digest.digest()).decode()
+
+
+def _etag_is_md5(resp):
+    """ETags are MD5-based only without SSE-KMS / SSE-C; S3 still checks each part's Content-MD5 either way."""
+    return (
+        resp.get("ServerSideEncryption") in (None, "AES256")
+        and "SSEKMSKeyId" not in resp
+        and "SSECustomerAlgorithm" not in resp
+    )
+
+
 class S3Uploader:
-    def __init__(self, bucket, region, access_key, secret_key):
+    def __init__(self, bucket, region=None, access_key=None, secret_key=None, endpoint_url=None, client=None):
+        """
+        Pass `client` to reuse a pooled boto3 S3 client (apps.common.clients.s3_client);
+        otherwise one is built from the credentials here.
+        """
         self.bucket = bucket
         self.region = region
-        self.session = boto3.session.Session(
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region,
-        )
-        self.client = self.session.client("s3", config=Config(signature_version="s3v4"))
+
+        if client is not None:
+            self.client = client
+        else:
+            # boto3 costs ~150ms to import; only pay for it when S3 is actually used
+            import boto3
+            from botocore.client import Config
+
+            self.session = boto3.session.Session(
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                region_name=region,
+            )
+            # endpoint_url points at a local S3 stand-in (MinIO, moto_server) in dev/tests
+            self.client = self.session.client(
+                "s3", config=Config(signature_version="s3v4"), endpoint_url=endpoint_url or None
+            )
 
         # Small helper: RFC 5987/6266 compatible disposition (ASCII fallback + UTF-8 filename*)
         self._disposition = lambda pretty: (
@@ -39,6 +80,124 @@ class S3Uploader:
         )
         return key, len(data)
 
+    def upload_stream(
+        self,
+        chunks,
+        key: str,
+        content_type: str = "application/octet-stream",
+        *,
+        part_size: int = 8 * 1024 * 1024,
+        max_workers: int = 4,
+    ):
+        """
+        Upload an iterable of byte chunks (e.g. requests' iter_content) without
+        holding the whole object: chunks are cut into part_size parts and sent
+        as a multipart upload, at most max_workers parts in flight. Each part
+        carries Content-MD5 (checked by S3 on receipt) and, where ETags are
+        MD5-based (no SSE-KMS / SSE-C), the ETags are checked against the MD5s
+        we computed. Objects smaller than one part go up with a single PUT.
+        Returns (key, size_bytes) with the size counted off the stream.
+        """
+        part_size = max(MIN_PART_SIZE, int(part_size))
+        buf = bytearray()
+        size = 0
+        stream = iter(chunks)
+
+        # Fill the first part; a small object never becomes a multipart upload
+        for chunk in stream:
+            buf += chunk
+            size += len(chunk)
+            if len(buf) >= part_size:
+                break
+        else:
+            data = bytes(buf)
+            _, md5_b64 = _md5(data)
+            self.client.put_object(
+                Bucket=self.bucket, Key=key, Body=data, ContentMD5=md5_b64,
+                ContentType=content_type, ACL="private",
+            )
+            return key, size
+
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=content_type, ACL="private",
+        )["UploadId"]
+        slots = threading.BoundedSemaphore(max_workers)
+        futures = []
+
+        def send(number, data):
+            try:
+                digest, md5_b64 = _md5(data)
+                resp = self.client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    PartNumber=number, Body=data, ContentMD5=md5_b64,
+                )
+                if _etag_is_md5(resp) and resp["ETag"].strip('"') != digest.hex():
+                    raise ChecksumMismatch(f"part {number} of {key}")
+                return {"PartNumber": number, "ETag": resp["ETag"]}, digest
+            finally:
+                slots.release()
+
+        completed = False
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-part") as pool:
+                def drain(final=False):
+                    while len(buf) >= part_size or (final and buf):
+                        data = bytes(buf[:part_size])
+                        del buf[:part_size]
+                        slots.acquire()  # bounds memory to max_workers parts in flight
+                        futures.append(pool.submit(send, len(futures) + 1, data))
+
+                drain()
+                for chunk in stream:
+                    buf += chunk
+                    size += len(chunk)
+                    drain()
+                drain(final=True)
+                results = [f.result() for f in futures]
+
+            parts = [part for part, _ in results]
+            resp = self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts},
+            )
+            completed = True
+            expected = f"{hashlib.md5(b''.join(d for _, d in results)).hexdigest()}-{len(parts)}"
+            if _etag_is_md5(resp) and resp.get("ETag", "").strip('"') != expected:
+                self.client.delete_object(Bucket=self.bucket, Key=key)
+                raise ChecksumMismatch(f"{key}: ETag {resp.get('ETag')} != {expected}")
+        except BaseException:
+            if not completed:
+                try:
+                    self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+                except Exception:
+                    logger.warning("Could not abort multipart upload %s for %s", upload_id, key, exc_info=True)
+            raise
+
+        return key, size
+
+    def object_size(self, key: str):
+        """Size in bytes of the object at `key`, or None if there is none."""
+        from botocore.exceptions import ClientError
+
+        try:
+            resp = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return resp["ContentLength"]
+
+    def download_stream(self, key: str, chunk_size: int = 256 * 1024):
+        """Iterator over the bytes of the object at `key`, or None if there is none."""
+        from botocore.exceptions import ClientError
+
+        try:
+            resp = self.client.get_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return resp["Body"].iter_chunks(chunk_size)
+
     def upload_file(self, local_path: str, key: str, content_type: str = "application/octet-stream"):
         extra = {"ContentType": content_type, "ACL": "private"}
         self.client.upload_file(local_path, self.bucket, key, ExtraArgs=extra)
@@ -0,0 +1,120 @@
+"""
+Inline SVG versions of the report charts (no matplotlib).
+
+Both charts are tiny: a 4-point area and 4 bars. Building them as SVG text
+takes microseconds instead of a matplotlib figure per chart, and the markup
+is a few hundred bytes instead of a base64 PNG. The geometry mirrors
+generate_peak_mountain_chart / generate_question_bar_chart in charts.py
+(same figure proportions, colours and font sizes, in points).
+
+Select them per report with REPORT_CHART_FORMAT = "svg" or ?charts=svg.
+"""
+from django.utils.safestring import mark_safe
+
+BLUE = "#0093ED"
+OUTLINE = "#0b81cb"
+FONT = "DejaVu Sans, Helvetica, Arial, sans-serif"
+
+RATING_LABELS = [
+    ("Consistently", "Untrue"),
+    ("Somewhat", "Untrue"),
+    ("Somewhat", "True"),
+    ("Consistently", "True"),
+]
+
+# Peak mountain: 6.5in x 2.2in figure
+MOUNTAIN_W, MOUNTAIN_H = 468, 158
+MOUNTAIN_X0, MOUNTAIN_X1 = 45, 423
+MOUNTAIN_TOP, MOUNTAIN_BASE = 7, 115
+
+# Question bars: 3.6in x 1.8in figure
+BAR_W, BAR_H = 256, 128
+BAR_X0, BAR_STEP, BAR_WIDTH = 29, 54, 35
+BAR_TOP, BAR_BASE = 2, 71
+
+TICK = 3.5
+
+
+def _n(v):
+    """Compact number for SVG attributes."""
+    return f"{v:.1f}".rstrip("0").rstrip(".")
+
+
+def _svg(width, height, body, label):
+    return mark_safe(
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'role="img" aria-label="{label}" font-family="{FONT}">{body}</svg>'
+    )
+
+
+def _ticks(xs, base):
+    return "".join(f"M{_n(x)} {base}v{TICK}" for x in xs)
+
+
+def peak_mountain_svg(percentages):
+    """
+    Inline SVG of the peak 'mountain' area for a 0–3 rating distribution.
+    percentages: four values for ratings 0..3 (rescaled to 0–100 like the PNG).
+    """
+    vals = [(float(percentages[i]) if i < len(percentages) else 0.0) for i in range(4)]
+    total = sum(vals) or 1.0
+    vals = [v * 100.0 / total for v in vals]
+
+    # matplotlib autoscale: 5% headroom above the highest point
+    ymax = (max(vals) * 1.05) or 1.0
+    scale = (MOUNTAIN_BASE - MOUNTAIN_TOP) / ymax
+    step = (MOUNTAIN_X1 - MOUNTAIN_X0) / 3
+    xs = [MOUNTAIN_X0 + i * step for i in range(4)]
+    line = " ".join(f"{_n(x)},{_n(MOUNTAIN_BASE - v * scale)}" for x, v in zip(xs, vals))
+
+    labels = "".join(
+        f'<text x="{_n(x)}" text-anchor="middle">'
+        f'<tspan x="{_n(x)}" y="136">{a}</tspan><tspan x="{_n(x)}" y="153">{b}</tspan></text>'
+        for x, (a, b) in zip(xs, RATING_LABELS)
+    )
+    body = (
+        f'<polygon points="{_n(xs[0])},{MOUNTAIN_BASE} {line} {_n(xs[-1])},{MOUNTAIN_BASE}" fill="{BLUE}"/>'
+        f'<polyline points="{line}" fill="none" stroke="{OUTLINE}" stroke-width="1"/>'
+        f'<path d="{_ticks(xs, MOUNTAIN_BASE)}" stroke="#000" stroke-width="0.8"/>'
+        f'<g font-size="14">{labels}</g>'
+    )
+    return _svg(MOUNTAIN_W, MOUNTAIN_H, body, "Rating distribution")
+
+
+def question_bar_svg(counts):
+    """
+    Inline SVG of the per-question bar chart (answers 0..3) with value labels
+    above each bar and slanted rating labels underneath.
+    """
+    vals = [(int(counts[i]) if i < len(counts) else 0) for i in range(4)]
+
+    # Same headroom as the PNG: ylim = 1.35 * max, labels 4% above each bar
+    ymax = max(vals + [1])
+    scale = (BAR_BASE - BAR_TOP) / (ymax * 1.35)
+    xs = [BAR_X0 + i * BAR_STEP for i in range(4)]
+
+    bars = []
+    values = []
+    labels = []
+    for x, v, (a, b) in zip(xs, vals, RATING_LABELS):
+        h = v * scale
+        if v:
+            bars.append(
+                f'<rect x="{_n(x - BAR_WIDTH / 2)}" y="{_n(BAR_BASE - h)}" '
+                f'width="{BAR_WIDTH}" height="{_n(h)}"/>'
+            )
+        values.append(
+            f'<text x="{_n(x)}" y="{_n(BAR_BASE - (v + ymax * 0.04) * scale - 2.5)}">{v}</text>'
+        )
+        labels.append(
+            f'<text transform="translate({_n(x + 7)} {BAR_BASE + TICK + 2}) rotate(32)">'
+            f'<tspan x="0" y="8">{a}</tspan><tspan x="0" y="20">{b}</tspan></text>'
+        )
+
+    body = (
+        f'<g fill="{BLUE}">{"".join(bars)}</g>'
+        f'<path d="{_ticks(xs, BAR_BASE)}" stroke="#000" stroke-width="0.8"/>'
+        f'<g font-size="12" text-anchor="middle">{"".join(values)}</g>'
+        f'<g font-size="10">{"".join(labels)}</g>'
+    )
+    return _svg(BAR_W, BAR_H, body, "Answer counts")
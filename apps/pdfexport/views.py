@@ -1,6 +1,5 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.template.loader import get_template
@@ -8,22 +7,27 @@ from django.templatetags.static import static
 from django.utils.text import slugify
 from django.views.decorators.http import require_POST
 
-import os
+import re
 import tempfile
 import time
-import docraptor
-from docraptor.rest import ApiException
 
-from apps.reports.models import PeakActions, PeakInsights
-from apps.assessments.models import Question, Answer, Assessment
+from apps.reports.content import get_report_content
+from apps.reports.scoring import empty_histogram, rating_percentages
+from apps.reports.snapshots import get_or_take_snapshot, questions_by_peak
+from apps.reports.benchmarks import load_benchmarks
+from apps.reports.trends import get_team_trends, render_trend_charts
+from apps.assessments.models import Assessment
 from apps.pdfexport.utils.context import get_report_context_data
-from apps.pdfexport.utils.charts import (
-    get_peak_rating_distribution,
-    generate_peak_mountain_chart,
-    generate_question_bar_chart,
-)
-from apps.pdfexport.utils.images import png_path_to_data_uri
+from apps.pdfexport.utils.chart_pool import render_charts
+from apps.pdfexport.utils.images import png_bytes_to_data_uri
+from apps.pdfexport.utils.svg_charts import peak_mountain_svg, question_bar_svg
+from apps.pdfexport.utils.chart_cache import chart_cache
 from apps.pdfexport.models import FinalReport
+from apps.pdfexport.assets import missing_glyphs, report_assets
+from apps.pdfexport.jobs import enqueue_report_job
+from apps.pdfexport.fingerprint import find_stored_pdf, report_fingerprint, reuse_stored_pdf
+from apps.pdfexport.prerender import load_prerendered_html
+from apps.pdfexport.renderers import get_renderer, report_s3_key
 
 import logging
 logger = logging.getLogger(__name__)
@@ -45,6 +49,13 @@ def build_report_filenames(assessment):
         slug_part = f"{slugify(team_name)}-report"
     return pretty, f"{slug_part}.pdf"
 
+# --- Helper: bytes of the report spent on inlined images (for the size budget) ---
+INLINE_IMAGE = re.compile(r"data:image/[a-z0-9.+-]+;base64,[A-Za-z0-9+/=]+")
+
+
+def inline_image_bytes(html):
+    return sum(len(m) for m in INLINE_IMAGE.findall(html))
+
 # ---- Canonical peak order and names (for display + tiebreaks) -----------
 ORDER = ["CC", "LA", "SM", "TM"]
 NAMES = {
@@ -54,9 +65,10 @@ NAMES = {
     "TM": "Talent Magnetism",
 }
 
-def compute_summary_and_display_rows(peak_sections):
+def compute_summary_and_display_rows(peak_sections, benchmarks=None):
     """
     Given peak_sections (each has at least code, name, and maybe score/range_label),
+    and optionally benchmarks from apps.reports.benchmarks.load_benchmarks,
     return:
       - peak_score_summary (always in canonical display order),
       - summary_text derived from lowest/highest scores with deterministic tiebreaks,
@@ -73,6 +85,7 @@ def compute_summary_and_display_rows(peak_sections):
             "name": s.get("name") or NAMES.get(code, code),
             "score": s.get("score"),
             "range": s.get("range_label"),
+            "percentile": (benchmarks or {}).get("peaks", {}).get(code),
         }
 
     # Always display in the fixed canonical order
@@ -85,94 +98,124 @@ def compute_summary_and_display_rows(peak_sections):
     if scored:
         lowest = min(scored, key=lambda r: (r["score"], ORDER.index(r["code"])))
         highest = max(scored, key=lambda r: (r["score"], -ORDER.index(r["code"])))
-        from apps.reports.models import ResultsSummary  # local import to avoid cycles
-
-        rs = ResultsSummary.objects.filter(high_peak=highest["code"], low_peak=lowest["code"]).first()
-        summary_text = rs.summary_text if rs else ""
+        summary_text = get_report_content().summaries.get((highest["code"], lowest["code"]), "")
 
     return peak_score_summary, summary_text, lowest, highest
 
 
-# Internal helper to enqueue DocRaptor for an assessment
-# Returns a JsonResponse matching the external API
-def _enqueue_docraptor_async(request, assessment, fr, stage=6):
-    # -----------------------------
-    # Build the HTML payload
-    # -----------------------------
+CHART_FORMATS = ("png", "svg")
+
+
+def resolve_chart_format(requested=None):
+    """Per-report chart format (?charts=svg), falling back to REPORT_CHART_FORMAT, then png."""
+    for candidate in (requested, getattr(settings, "REPORT_CHART_FORMAT", "png")):
+        if candidate and str(candidate).lower() in CHART_FORMATS:
+            return str(candidate).lower()
+    return "png"
+
+
+# Report templates (pdfexport/finalreport/<name>.html), written in this order;
+# peak_start / questions / peak_end repeat for every peak
+REPORT_TEMPLATES = ("head", "cover", "front", "peak_start", "questions", "peak_end", "back")
+
+
+def _report_template(name):
+    return get_template(f"pdfexport/finalreport/{name}.html")
+
+
+# --- Helper: charts are drawn for the piece being rendered and dropped after it ---
+def _draw_charts(charts, chart_format):
+    """
+    charts: [(target dict, kind, title, counts)], kind "mountain" or "bar".
+    Sets chart_svg or chart_data_uri on each target.
+    """
+    if not charts:
+        return
+    if chart_format == "svg":
+        for target, kind, _title, counts in charts:
+            draw = peak_mountain_svg if kind == "mountain" else question_bar_svg
+            target["chart_svg"] = chart_cache.get_or_render(f"{kind}-svg", counts, lambda: draw(counts))
+        return
+    uris = chart_cache.get_or_render_many(
+        [(kind, counts, (kind, (title, counts))) for _, kind, title, counts in charts],
+        lambda jobs: [png_bytes_to_data_uri(png) for png in render_charts(jobs)],
+    )
+    for (target, *_), uri in zip(charts, uris):
+        target["chart_data_uri"] = uri
+
+
+def _drop_charts(targets):
+    for target in targets:
+        target.pop("chart_svg", None)
+        target.pop("chart_data_uri", None)
+
+
+def iter_report_html(assessment, stage=6, chart_format=None, base_url=None):
+    """
+    Render the final report HTML for this assessment one piece at a time:
+    head, cover, front matter, then every peak (its questions in chunks of
+    REPORT_HTML_CHUNK_QUESTIONS), then the back matter. Yields the HTML
+    pieces in order. Each chunk's charts are drawn just before it is
+    rendered and released after, so memory stays flat as reports grow.
+    base_url: absolute site root the PDF renderer loads static assets from
+    (defaults to settings.BASE_URL).
+    """
     stage = max(1, min(int(stage or 6), 6))
+    chart_format = resolve_chart_format(chart_format)
+    base_url = (base_url or settings.BASE_URL).rstrip("/")
 
-    t0_total = time.monotonic()
-    logger.info("[PDF] Start async render for assessment_id=%s stage=%s", assessment.id, stage)
+    logger.info("[PDF] Build report HTML for assessment_id=%s stage=%s charts=%s",
+                assessment.id, stage, chart_format)
 
     base = get_report_context_data(assessment.id)
     assessment = base["assessment"]
     peaks = base["peaks"]
-    STATIC_ABS = request.build_absolute_uri(static(""))
+    STATIC_ABS = f"{base_url}{static('')}"
+    assets = report_assets(STATIC_ABS)
 
-    def range_for(pct):
-        if pct < 34: return "LOW"
-        if pct < 67: return "MEDIUM"
-        return "HIGH"
+    # Frozen scores; never re-scan Answer rows here
+    snapshot = get_or_take_snapshot(assessment)
+    snapshot_questions = questions_by_peak(snapshot)
+    benchmarks = load_benchmarks(snapshot) if stage >= 2 else None
 
-    peak_sections, temp_paths = [], []
+    content = get_report_content()
+
+    peak_sections = []
 
     for peak in peaks:
         section = {"name": peak.name, "code": peak.code}
+        peak_row = snapshot.peaks.get(peak.code)
+        peak_counts = peak_row["counts"] if peak_row else empty_histogram()
 
         # (1) score/range
         if stage >= 1:
-            perc = get_peak_rating_distribution(assessment, peak.code)
-            score0_3 = sum((i * p) for i, p in enumerate(perc)) / 100.0
-            pct_score = round(score0_3 * 100 / 3)
+            pct_score = peak_row["score"] if peak_row else 0
             section["score"] = pct_score
-            section["range_label"] = range_for(pct_score)
+            section["range_label"] = peak_row["range_label"] if peak_row else "LOW"
+            section["percentile"] = benchmarks["peaks"].get(peak.code) if benchmarks else None
 
-        # (2) insights/actions
+        # (2) insights/actions (markdown already rendered)
         if stage >= 2:
             rl = section.get("range_label")
-            insight = PeakInsights.objects.filter(peak=peak.code, range_label=rl).first() if rl else None
-            action  = PeakActions.objects.filter(peak=peak.code, range_label=rl).first() if rl else None
-            section["insights"] = insight.insight_text if insight else None
-            section["actions"]  = action.action_text  if action  else None
+            section["insights_html"] = content.insights.get((peak.code, rl), "")
+            section["actions_html"] = content.actions.get((peak.code, rl), "")
 
         # (3) focus image
         if stage >= 3:
-            section["ascent_image_abs"] = f"{STATIC_ABS}images/ascent-{peak.code.lower()}-focus.png"
+            section["ascent_image_abs"] = assets["img"].get(f"focus_{peak.code.lower()}")
 
-        # (4) peak distribution chart
+        # (4) peak distribution chart (drawn when the peak is rendered)
         if stage >= 4:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                path = tmp.name
-            generate_peak_mountain_chart(peak.name, get_peak_rating_distribution(assessment, peak.code), path)
-            temp_paths.append(path)
-            section["chart_data_uri"] = png_path_to_data_uri(path)
+            section["chart_spec"] = ("mountain", peak.name, rating_percentages(peak_counts))
 
         # (5/6) per-question rows (+ charts at 6)
         if stage >= 5:
             q_rows = []
-            participants = assessment.participants.all()
-            answers = Answer.objects.filter(participant__in=participants)
-            for q in Question.objects.filter(peak=peak):
-                qa = answers.filter(question=q)
-                counts = [0, 0, 0, 0]
-                for a in qa:
-                    if 0 <= a.value <= 3:
-                        counts[a.value] += 1
-                total = sum(counts)
-                if total:
-                    weighted = sum(i * c for i, c in enumerate(counts))
-                    hp = round((weighted / total) * 100 / 3)
-                else:
-                    hp = 0
-                row = {"text": q.text, "health_percentage": hp}
-
+            for number, q in enumerate(snapshot_questions.get(peak.code, []), start=1):
+                row = {"number": number, "text": q["text"], "health_percentage": q["health_percentage"]}
+                row["percentile"] = benchmarks["questions"].get(q["id"]) if benchmarks else None
                 if stage >= 6:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as qtmp:
-                        qpath = qtmp.name
-                    generate_question_bar_chart(q.text, counts, qpath)
-                    temp_paths.append(qpath)
-                    row["chart_data_uri"] = png_path_to_data_uri(qpath)
-
+                    row["chart_spec"] = ("bar", q["text"], q["counts"])
                 q_rows.append(row)
 
             section["questions"] = q_rows
@@ -204,10 +247,21 @@ def _enqueue_docraptor_async(request, assessment, fr, stage=6):
         highest_questions = []
         lowest_questions = []
 
+    # Trends across this team's earlier assessments (from stored snapshots)
+    trend_labels, trend_peaks, trend_questions = [], [], []
+    if stage >= 4:
+        trends = get_team_trends(assessment.team, until=assessment)
+        if len(trends["assessments"]) >= 2:
+            trend_labels = trends["labels"]
+            trend_peaks, _ = render_trend_charts(trends, include_questions=False)
+            trend_questions = trends["questions"]
+
     # Summary (when scores exist)
     summary_text = ""
     if stage >= 1 and peak_sections:
-        peak_score_summary, summary_text, low_row, high_row = compute_summary_and_display_rows(peak_sections)
+        peak_score_summary, summary_text, low_row, high_row = compute_summary_and_display_rows(
+            peak_sections, benchmarks=benchmarks
+        )
         logger.info("[ASYNC] summary order=%s low=%s high=%s",
                     [r["code"] for r in peak_score_summary],
                     low_row and low_row.get("code"),
@@ -217,6 +271,7 @@ def _enqueue_docraptor_async(request, assessment, fr, stage=6):
 
     ctx = {
         "STATIC_ABS": STATIC_ABS,
+        "assets": assets,
         "assessment": assessment,
         "team_name": assessment.team.name,
         "deadline": assessment.deadline,
@@ -231,83 +286,143 @@ def _enqueue_docraptor_async(request, assessment, fr, stage=6):
         "show_question_charts": (stage >= 6),
         "highest_questions": highest_questions,
         "lowest_questions": lowest_questions,
+        "benchmark_population": (benchmarks or {}).get("population", 0),
+        "show_benchmarks": bool(benchmarks and benchmarks["peaks"]),
+        "trend_labels": trend_labels,
+        "trend_peaks": trend_peaks,
+        "trend_questions": trend_questions,
     }
 
-    request._docraptor_ctx = ctx
-
-    html = get_template("pdfexport/finalreport_docraptor.html").render(ctx)
-    logger.info("[PDF] HTML size=%s bytes, img_count=%s", len(html), html.count("<img"))
-
-    # -----------------------------
-    # Queue async DocRaptor job
-    # -----------------------------
-    pretty_name, slug_name = build_report_filenames(assessment)
-    filename = slug_name
-
-    client = docraptor.DocApi()
-    client.api_client.configuration.username = settings.DOCRAPTOR_API_KEY
-    baseurl = request.build_absolute_uri("/")
-
+    # Running totals for the size/budget log line; no piece is kept after it is yielded
+    totals = {"size": 0, "images": 0, "img": 0, "svg": 0}
+    missing = set()
+
+    def render(name, **extra):
+        html = _report_template(name).render({**ctx, **extra})
+        totals["size"] += len(html.encode("utf-8"))
+        totals["images"] += inline_image_bytes(html)
+        totals["img"] += html.count("<img")
+        totals["svg"] += html.count("<svg")
+        missing.update(missing_glyphs(html, assets))
+        return html
+
+    yield render("head")
+    yield render("cover")
+    yield render("front")
+
+    chunk = max(1, getattr(settings, "REPORT_HTML_CHUNK_QUESTIONS", 20))
+    for section in peak_sections:
+        peak_chart = [(section, *section["chart_spec"])] if "chart_spec" in section else []
+        _draw_charts(peak_chart, chart_format)
+        yield render("peak_start", peak=section)
+        _drop_charts([section])
+
+        rows = section.get("questions") or []
+        for i in range(0, len(rows), chunk):
+            batch = rows[i:i + chunk]
+            _draw_charts([(row, *row["chart_spec"]) for row in batch if "chart_spec" in row], chart_format)
+            yield render("questions", peak=section, questions=batch)
+            _drop_charts(batch)
+
+        yield render("peak_end", peak=section)
+
+    yield render("back")
+
+    size = totals["size"]
+    budget = getattr(settings, "REPORT_HTML_BUDGET_BYTES", 0)
+    logger.info("[PDF] HTML size=%s bytes (%s of budget %s), inline images=%s bytes, img_count=%s, svg_count=%s, assets=%s %s",
+                size, f"{size / budget:.0%}" if budget else "-", budget or "-", totals["images"],
+                totals["img"], totals["svg"], assets["mode"], assets["version"])
+    if budget and size > budget:
+        logger.warning("[PDF] report HTML for assessment %s is over budget: %s > %s bytes", assessment.id, size, budget)
+    if missing:
+        logger.warning("[PDF] characters outside the report font subset (drawn in fallback font): %r",
+                       "".join(sorted(missing)))
+    logger.info("[PDF] chart cache %s", chart_cache.stats())
+
+
+def write_report_html(assessment, out, **kwargs):
+    """Write the report HTML (iter_report_html) to the text file `out`. Returns the characters written."""
+    written = 0
+    for piece in iter_report_html(assessment, **kwargs):
+        written += out.write(piece)
+    return written
+
+
+def build_report_html(assessment, stage=6, chart_format=None, base_url=None):
+    """The whole report HTML as one string; render_report spools it to a file instead."""
+    return "".join(iter_report_html(assessment, stage=stage, chart_format=chart_format, base_url=base_url))
+
+
+def render_report(assessment, fr, stage=6, chart_format=None, renderer=None, base_url=None):
+    """
+    Produce the report PDF for FinalReport `fr` (run by the report job workers).
+
+    If a PDF of the same inputs (apps.pdfexport.fingerprint) is already
+    stored, `fr` points at it and nothing is rendered. Otherwise the report
+    HTML goes to a spooled temp file (in memory up to
+    REPORT_HTML_SPOOL_MAX_BYTES, on disk beyond) that is handed to a PDF
+    renderer; HTML pre-rendered from the same inputs (apps.pdfexport.prerender)
+    is used instead of building it. Returns the renderer's payload; raises PdfRenderError.
+    """
+    t0_total = time.monotonic()
+    base_url = (base_url or settings.BASE_URL).rstrip("/")
+    stage = max(1, min(int(stage or 6), 6))
+    chart_format = resolve_chart_format(chart_format)
+    spool_max = getattr(settings, "REPORT_HTML_SPOOL_MAX_BYTES", 1024 * 1024)
     try:
-        t0_docraptor = time.monotonic()
-        job = client.create_async_doc({
-            "test": bool(getattr(settings, "DOCRAPTOR_TEST", True)),
-            "document_type": "pdf",
-            "name": filename,
-            "document_content": html,
-            "prince_options": {"media": "print", "baseurl": baseurl},
-        }, _request_timeout=(10, 700))
-        logger.info("[PDF] DocRaptor job queued in %.2fs", time.monotonic() - t0_docraptor)
-
-        # status_id is a Docraptor attribute; call for status_id object first
-        status_id = getattr(job, "status_id", None)
-        if not status_id and hasattr(job, "to_dict"):
-            d = job.to_dict()
-            status_id = d.get("status_id")
-
-        if not status_id:
-            logger.error("DocRaptor async response missing status_id; resp=%r",
-                         job.to_dict() if hasattr(job, "to_dict") else job)
-            return JsonResponse({"ok": False, "error": "docraptor_missing_status_id"}, status=502)
-
-        # Cache + persist using our model field name (docraptor_status_id)
-        cache.set(
-            f"docraptor:{status_id}",
-            {"assessment_id": assessment.id, "filename": filename, "pretty_name": pretty_name},
-            timeout=60 * 60,
-        )
-
-        fr.docraptor_status_id = status_id
-        fr.size_bytes = None
-        fr.save(update_fields=["docraptor_status_id", "size_bytes"])
+        pretty_name, slug_name = build_report_filenames(assessment)
+        renderer = get_renderer(renderer)
+
+        try:
+            fingerprint = report_fingerprint(assessment, stage=stage, chart_format=chart_format, renderer=renderer.name)
+        except Exception:
+            logger.exception("[PDF] could not fingerprint report inputs for assessment %s", assessment.id)
+            fingerprint = ""
+        if fingerprint:
+            stored = find_stored_pdf(fingerprint, report_s3_key(assessment, slug_name, fingerprint))
+            if stored:
+                return reuse_stored_pdf(fr, fingerprint, *stored)
+        fr.input_fingerprint = fingerprint
+        fr.save(update_fields=["input_fingerprint"])
+
+        with tempfile.SpooledTemporaryFile(max_size=spool_max, mode="w+", encoding="utf-8") as document:
+            if not (fingerprint and load_prerendered_html(fingerprint, base_url, document)):
+                write_report_html(assessment, document, stage=stage, chart_format=chart_format, base_url=base_url)
+            document.seek(0)
+
+            logger.info("[PDF] renderer=%s", renderer.name)
+            return renderer.start(
+                fr, document,
+                filename=slug_name,
+                pretty_name=pretty_name,
+                baseurl=f"{base_url}/",
+            )
+    finally:
+        logger.info("[PDF] render total time %.2fs", time.monotonic() - t0_total)
 
-        return JsonResponse({"ok": True, "docraptor_status_id": status_id}, status=200)
 
-    except ApiException as e:
-        logger.exception("DocRaptor API error")
-        return JsonResponse({"ok": False, "error": "docraptor_api", "detail": str(e)}, status=502)
-    except Exception as e:
-        logger.exception("Unexpected error during DocRaptor enqueue")
-        return JsonResponse({"ok": False, "error": "unexpected", "detail": str(e)}, status=500)
-    finally:
-        for p in temp_paths:
-            try:
-                os.remove(p)
-            except OSError:
-                pass
-        logger.info("[PDF] enqueue total time %.2fs", time.monotonic() - t0_total)
+# Internal helper: queue a report job for the start endpoints
+# Returns a JsonResponse matching the external API
+def _enqueue_report_job(request, assessment):
+    stage = int(request.GET.get("stage", "6") or 6)
+    job, created = enqueue_report_job(
+        assessment,
+        stage=stage,
+        chart_format=request.GET.get("charts") or "",
+        renderer=request.GET.get("renderer") or "",
+    )
+    return JsonResponse({"ok": True, "queued": created, "in_progress": not created, "job_id": job.id}, status=200)
 
 
 @require_POST
 @login_required
 def final_report_docraptor_start(request, assessment_id):
     """
-    Kick off an asynchronous DocRaptor job to generate the final report PDF
-    for this assessment. Returns JSON with a docraptor_status_id if a new job is queued,
-    or a simple ok/already_ready/in_progress signal otherwise.
-
-    The HTML/PDF building mirrors the synchronous renderer but we only
-    enqueue an async job here; no bytes are returned.
+    Queue generation of the final report PDF for this assessment (a
+    ReportJob picked up by `manage.py run_report_workers`). Returns JSON with
+    the job id, or a simple ok/already_ready/in_progress signal otherwise.
+    Optional ?stage=, ?charts= and ?renderer= are stored on the job.
     """
     assessment = get_object_or_404(Assessment, pk=assessment_id, team__admin=request.user)
 
@@ -322,8 +437,7 @@ def final_report_docraptor_start(request, assessment_id):
     if fr.docraptor_status_id:
         return JsonResponse({"ok": True, "in_progress": True, "docraptor_status_id": fr.docraptor_status_id}, status=200)
 
-    stage = int(request.GET.get("stage", "6") or 6)
-    return _enqueue_docraptor_async(request, assessment, fr, stage=stage)
+    return _enqueue_report_job(request, assessment)
 
 
 # Internal endpoint for server-to-server DocRaptor enqueue
@@ -345,6 +459,5 @@ def final_report_docraptor_start_internal(request, assessment_id):
     if fr.docraptor_status_id:
         return JsonResponse({"ok": True, "in_progress": True, "docraptor_status_id": fr.docraptor_status_id}, status=200)
 
-    stage = int(request.GET.get("stage", "6") or 6)
-    return _enqueue_docraptor_async(request, assessment, fr, stage=stage)
+    return _enqueue_report_job(request, assessment)
 
@@ -0,0 +1,186 @@
+"""
+Background watcher for in-flight DocRaptor jobs (`manage.py watch_docraptor`).
+
+One loop polls every FinalReport that has a docraptor_status_id but no PDF
+yet, with per-job adaptive backoff (2s, 4s, 8s ... up to
+REPORT_WATCH_MAX_INTERVAL). Completed jobs are downloaded and uploaded to
+S3 here, and every state change is written to the FinalReport row and
+the shared cache (apps.pdfexport.status) for report_status to read.
+
+Rows are claimed with SKIP LOCKED, so a second watcher (e.g. during a
+deploy) never checks the same job twice. A job still not stored after
+REPORT_WATCH_MAX_CHECKS checks (expired download URL, rejected upload,
+DocRaptor stuck) is failed so the user can start a new one.
+"""
+import time
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from apps.pdfexport import status
+from apps.pdfexport.models import FinalReport
+from apps.common.clients import docraptor_client, http_session
+from apps.pdfexport.renderers import report_s3_key, report_uploader
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def next_interval(checks):
+    """Seconds until the next check of a job that has been checked `checks` times."""
+    base = _setting("REPORT_WATCH_MIN_INTERVAL", 2)
+    cap = _setting("REPORT_WATCH_MAX_INTERVAL", 30)
+    return min(cap, base * 2 ** min(checks, 16))
+
+
+def in_flight():
+    return FinalReport.objects.filter(docraptor_status_id__isnull=False, s3_key__isnull=True).exclude(
+        docraptor_status_id=""
+    )
+
+
+def claim_due(limit=20):
+    """
+    Lock up to `limit` due reports and push their next check out, so a
+    concurrent watcher skips them. Returns the claimed rows.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            in_flight()
+            .select_for_update(skip_locked=True)
+            .filter(Q(docraptor_next_check_at__isnull=True) | Q(docraptor_next_check_at__lte=now))
+            .select_related("assessment")
+            .order_by("docraptor_next_check_at", "id")[:limit]
+        )
+        for fr in due:
+            fr.docraptor_checks += 1
+            fr.docraptor_next_check_at = now + timedelta(seconds=next_interval(fr.docraptor_checks))
+            fr.save(update_fields=["docraptor_checks", "docraptor_next_check_at"])
+    return due
+
+
+def _mark(fr, docraptor_status, state, error="", **fields):
+    fr.docraptor_status = docraptor_status
+    for name, value in fields.items():
+        setattr(fr, name, value)
+    fr.save(update_fields=["docraptor_status", *fields])
+    status.publish_report_status(fr.assessment_id, state, error)
+
+
+def store_pdf(fr, download_url):
+    """
+    Stream the finished PDF from DocRaptor into S3 (multipart, bounded
+    memory). Returns (s3_key, size_bytes).
+    """
+    from apps.pdfexport.views import build_report_filenames
+
+    _, slug_name = build_report_filenames(fr.assessment)
+    part_size = _setting("REPORT_S3_PART_SIZE_MB", 8) * 1024 * 1024
+    with http_session().get(download_url, stream=True) as r:
+        r.raise_for_status()
+        return report_uploader().upload_stream(
+            r.iter_content(chunk_size=256 * 1024),
+            report_s3_key(fr.assessment, slug_name, fr.input_fingerprint),
+            content_type="application/pdf",
+            part_size=part_size,
+            max_workers=_setting("REPORT_S3_UPLOAD_WORKERS", 4),
+        )
+
+
+def check(fr, client):
+    """Poll DocRaptor once for this report and act on the answer."""
+    from docraptor.rest import ApiException
+
+    job_id = fr.docraptor_status_id
+    max_checks = _setting("REPORT_WATCH_MAX_CHECKS", 120)
+    if fr.docraptor_checks > max_checks:
+        logger.error("DocRaptor job %s (assessment %s) not stored after %s checks; giving up",
+                     job_id, fr.assessment_id, max_checks)
+        _mark(fr, "failed", status.FAILED, "PDF generation failed. Please try again.",
+              docraptor_status_id=None)
+        return
+
+    try:
+        result = client.get_async_doc_status(job_id)
+    except ApiException as e:
+        # Hard failures: the job is gone; let the user start a new one
+        if getattr(e, "status", None) in (404, 422):
+            logger.error("DocRaptor status hard error for job %s (assessment %s): %s",
+                         job_id, fr.assessment_id, e)
+            _mark(fr, "failed", status.FAILED,
+                  "The PDF job could not be found or failed to initialize. Please try again.",
+                  docraptor_status_id=None)
+            return
+        # Transient failures: try again after the backoff
+        logger.warning("DocRaptor status transient error for job %s: %s", job_id, e)
+        return
+
+    st = getattr(result, "status", None)
+    if st in (None, "queued", "processing"):
+        if fr.docraptor_status != (st or ""):
+            _mark(fr, st or "", status.RENDERING)
+        return
+
+    if st == "failed":
+        # Log as much detail as possible, but don't leak it to users.
+        detail = getattr(result, "message", None) or getattr(result, "validation_errors", None)
+        logger.error("DocRaptor job failed for assessment %s (job %s): %r", fr.assessment_id, job_id, detail)
+        _mark(fr, "failed", status.FAILED, "PDF generation failed. Please try again.",
+              docraptor_status_id=None)
+        return
+
+    if st == "completed":
+        download_url = getattr(result, "download_url", None)
+        if not download_url:
+            return  # Rare; DocRaptor exposes the URL on a later check
+        status.publish_report_status(fr.assessment_id, status.UPLOADING)
+        try:
+            s3_key, size_bytes = store_pdf(fr, download_url)
+        except requests.RequestException as e:
+            logger.warning("DocRaptor download transient error for job %s: %s", job_id, e)
+            return
+        except Exception as e:
+            logger.error("S3 upload failed for assessment %s: %s", fr.assessment_id, e, exc_info=True)
+            return
+        _mark(fr, "completed", status.READY, s3_key=s3_key, size_bytes=size_bytes)
+        logger.info("[PDF] assessment %s ready after %s checks", fr.assessment_id, fr.docraptor_checks)
+        return
+
+    logger.warning("DocRaptor returned unexpected status %r for job %s", st, job_id)
+
+
+def watch(stop=None, once=False, idle_seconds=None):
+    """
+    Watcher loop. Sleeps until the earliest scheduled check, but never more
+    than idle_seconds so newly queued jobs are picked up quickly.
+    once=True returns after one pass. Returns checks made.
+    """
+    idle_seconds = idle_seconds or _setting("REPORT_WATCH_MIN_INTERVAL", 2)
+    client = docraptor_client()
+    checks = 0
+    while not (stop and stop.is_set()):
+        close_old_connections()
+        due = claim_due()
+        for fr in due:
+            check(fr, client)
+            checks += 1
+        if once:
+            break
+        if due:
+            continue
+
+        upcoming = in_flight().aggregate(t=Min("docraptor_next_check_at"))["t"]
+        wait = idle_seconds
+        if upcoming is not None:
+            wait = max(0.5, min(wait, (upcoming - timezone.now()).total_seconds()))
+        (stop.wait if stop else time.sleep)(wait)
+    return checks
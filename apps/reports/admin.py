@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ResultsSummary, UniformRangeSummary, PeakInsights, PeakActions
+from .models import ResultsSummary, UniformRangeSummary, PeakInsights, PeakActions, QuestionHistogram, ScoreSnapshot
 
 @admin.register(ResultsSummary)
 class ResultsSummaryAdmin(admin.ModelAdmin):
@@ -19,4 +19,18 @@ class PeakInsightsAdmin(admin.ModelAdmin):
 @admin.register(PeakActions)
 class PeakActionsAdmin(admin.ModelAdmin):
     list_display = ("peak",)
-    list_filter = ("peak",)
\ No newline at end of file
+    list_filter = ("peak",)
+
+@admin.register(QuestionHistogram)
+class QuestionHistogramAdmin(admin.ModelAdmin):
+    list_display = ("assessment", "question", "count_0", "count_1", "count_2", "count_3")
+    list_filter = ("question__peak",)
+    list_select_related = ("assessment", "assessment__team", "question")
+
+
+@admin.register(ScoreSnapshot)
+class ScoreSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("assessment", "reason", "computed_at", "input_hash")
+    list_filter = ("reason",)
+    list_select_related = ("assessment", "assessment__team")
+    readonly_fields = ("assessment", "peaks", "questions", "input_hash", "reason", "computed_at")
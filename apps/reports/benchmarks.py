@@ -0,0 +1,122 @@
+"""
+Population benchmarks: where a team's scores sit among every closed
+assessment ("your Strategic Momentum is at the 72nd percentile").
+
+BenchmarkIndex keeps one 101-bucket score distribution per peak and per
+question. `update_index` folds in only the snapshots that changed since the
+last run; `load_benchmarks` reads a handful of index rows for a report.
+Only snapshots of closed assessments (ScoreSnapshot.CLOSED_REASONS) count:
+a report or manual snapshot of an assessment still in progress is left
+out, and taken back out if it was counted before.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from apps.reports.models import BenchmarkIndex, ScoreSnapshot
+
+SCORE_BUCKETS = 101  # whole percentages 0..100
+
+
+def peak_key(code):
+    return f"peak:{code}"
+
+
+def question_key(question_id):
+    return f"question:{question_id}"
+
+
+def snapshot_values(snapshot):
+    """{index key: score} this snapshot contributes. Unanswered questions are left out."""
+    values = {peak_key(code): row["score"] for code, row in snapshot.peaks.items()}
+    for q in snapshot.questions:
+        if sum(q["counts"]):
+            values[question_key(q["id"])] = q["health_percentage"]
+    return values
+
+
+def percentile(counts, score):
+    """Share of the population below `score`, counting ties as half (0..100)."""
+    total = sum(counts)
+    if not total:
+        return None
+    score = max(0, min(int(score), SCORE_BUCKETS - 1))
+    below = sum(counts[:score])
+    return round((below + counts[score] / 2) * 100 / total)
+
+
+def update_index(full=False):
+    """
+    Fold changed snapshots into BenchmarkIndex. Returns the number of snapshots applied.
+    With full=True the index is dropped and rebuilt from every closed snapshot.
+    """
+    closed = Q(reason__in=ScoreSnapshot.CLOSED_REASONS)
+    with transaction.atomic():
+        if full:
+            BenchmarkIndex.objects.all().delete()
+            ScoreSnapshot.objects.update(benchmarked_values=None, benchmarked_hash="")
+
+        pending = (
+            ScoreSnapshot.objects
+            .select_for_update()
+            .filter(
+                (closed & ~Q(benchmarked_hash=F("input_hash")))
+                | (~closed & Q(benchmarked_values__isnull=False))
+            )
+            .only("id", "peaks", "questions", "input_hash", "reason", "benchmarked_values")
+        )
+
+        deltas = defaultdict(lambda: [0] * SCORE_BUCKETS)
+        applied = []
+        for snap in pending:
+            old = snap.benchmarked_values or {}
+            is_closed = snap.reason in ScoreSnapshot.CLOSED_REASONS
+            new = snapshot_values(snap) if is_closed else {}
+            for key, score in old.items():
+                deltas[key][score] -= 1
+            for key, score in new.items():
+                deltas[key][score] += 1
+            snap.benchmarked_values = new if is_closed else None
+            snap.benchmarked_hash = snap.input_hash if is_closed else ""
+            applied.append(snap)
+
+        if not applied:
+            return 0
+
+        existing = {
+            row.key: row
+            for row in BenchmarkIndex.objects.select_for_update().filter(key__in=list(deltas))
+        }
+        for key, delta in deltas.items():
+            row = existing.get(key) or BenchmarkIndex(key=key, counts=[0] * SCORE_BUCKETS)
+            row.counts = [max(0, c + d) for c, d in zip(row.counts, delta)]
+            row.population = sum(row.counts)
+            row.save()
+
+        ScoreSnapshot.objects.bulk_update(applied, ["benchmarked_values", "benchmarked_hash"])
+        return len(applied)
+
+
+def load_benchmarks(snapshot):
+    """
+    Percentiles for one snapshot, read from the index in a single query.
+    Returns {"peaks": {code: pct}, "questions": {question_id: pct}, "population": n}.
+    Scores whose population is below REPORT_BENCHMARK_MIN_POPULATION are left out.
+    """
+    values = snapshot_values(snapshot)
+    min_population = getattr(settings, "REPORT_BENCHMARK_MIN_POPULATION", 10)
+
+    out = {"peaks": {}, "questions": {}, "population": 0}
+    for row in BenchmarkIndex.objects.filter(key__in=list(values)):
+        if row.population < min_population:
+            continue
+        pct = percentile(row.counts, values[row.key])
+        kind, ident = row.key.split(":", 1)
+        if kind == "peak":
+            out["peaks"][ident] = pct
+            out["population"] = max(out["population"], row.population)
+        else:
+            out["questions"][int(ident)] = pct
+    return out
@@ -0,0 +1,79 @@
+"""
+In-process cache of the report content tables.
+
+PeakInsights, PeakActions and ResultsSummary hold a few dozen rows and almost
+never change, so each worker loads them once into immutable lookups (with
+the markdown already rendered) and reuses them for every report.
+
+Edits in the admin bump a version key in the shared cache (see signals.py);
+every worker compares that key on each read and reloads when it moves.
+"""
+import hashlib
+import json
+import threading
+import uuid
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.core.cache import cache
+
+from apps.common.templatetags.markdown_extras import markdown as render_markdown
+
+VERSION_KEY = "reports:content:version"
+
+# insights/actions: {(peak, range_label): rendered html}
+# summaries:        {(high_peak, low_peak): summary text}
+# digest:           sha256 of the source rows (stable across cache flushes, unlike version)
+ReportContent = namedtuple("ReportContent", ["version", "insights", "actions", "summaries", "digest"])
+
+_lock = threading.Lock()
+_current = None
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _load(version):
+    from apps.reports.models import PeakActions, PeakInsights, ResultsSummary
+
+    insight_rows = sorted(PeakInsights.objects.values_list("peak", "range_label", "insight_text"))
+    action_rows = sorted(PeakActions.objects.values_list("peak", "range_label", "action_text"))
+    summary_rows = sorted(ResultsSummary.objects.values_list("high_peak", "low_peak", "summary_text"))
+
+    insights = {(peak, rl): render_markdown(text) for peak, rl, text in insight_rows}
+    actions = {(peak, rl): render_markdown(text) for peak, rl, text in action_rows}
+    summaries = {(high, low): text for high, low, text in summary_rows}
+    blob = json.dumps([insight_rows, action_rows, summary_rows], ensure_ascii=False)
+    return ReportContent(
+        version=version,
+        insights=MappingProxyType(insights),
+        actions=MappingProxyType(actions),
+        summaries=MappingProxyType(summaries),
+        digest=hashlib.sha256(blob.encode("utf-8")).hexdigest(),
+    )
+
+
+def get_report_content():
+    """The current content tables; reloads only when the shared version has moved."""
+    global _current
+    version = _shared_version()
+    current = _current
+    if current is not None and current.version == version:
+        return current
+
+    with _lock:
+        if _current is None or _current.version != version:
+            _current = _load(version)
+        return _current
+
+
+def invalidate_report_content():
+    """Drop this worker's copy and tell every other worker to reload."""
+    global _current
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    _current = None
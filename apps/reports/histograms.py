@@ -0,0 +1,108 @@
+"""
+Incrementally maintained answer histograms (QuestionHistogram).
+
+`record_answers` is called from the submission view inside the same
+transaction that writes the Answer rows. Reads go through
+`get_live_histograms`, which returns the same shape as
+`scoring.get_assessment_histograms` so either source can feed the scoring
+helpers.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from apps.reports.models import QuestionHistogram
+from apps.reports.scoring import empty_histogram, get_assessment_histograms
+
+
+def record_answers(assessment, values_by_question):
+    """
+    Add one submission to the counters.
+
+    values_by_question: {question_id: value (0..3)}
+    Uses F() increments, so concurrent submissions never lose a count.
+    Must run inside the caller's transaction.
+    """
+    if not values_by_question:
+        return
+
+    # Make sure a row exists for every question before incrementing
+    QuestionHistogram.objects.bulk_create(
+        [QuestionHistogram(assessment=assessment, question_id=qid) for qid in values_by_question],
+        ignore_conflicts=True,
+    )
+
+    # At most four UPDATEs: one per answer value
+    by_value = defaultdict(list)
+    for qid, value in values_by_question.items():
+        if 0 <= value <= 3:
+            by_value[value].append(qid)
+
+    for value, qids in by_value.items():
+        field = f"count_{value}"
+        (
+            QuestionHistogram.objects
+            .filter(assessment=assessment, question_id__in=qids)
+            .update(**{field: F(field) + 1})
+        )
+
+
+def get_live_histograms(assessment):
+    """
+    Same shape as scoring.get_assessment_histograms, read from the counters:
+    {"questions": {question_id: [c0..c3]}, "peaks": {peak_code: [c0..c3]}}
+    """
+    rows = (
+        QuestionHistogram.objects
+        .filter(assessment=assessment)
+        .values_list("question_id", "question__peak__code",
+                     "count_0", "count_1", "count_2", "count_3")
+    )
+
+    questions, peaks = {}, {}
+    for question_id, peak_code, *counts in rows:
+        if not sum(counts):
+            continue
+        questions[question_id] = list(counts)
+        peak = peaks.setdefault(peak_code, empty_histogram())
+        for i, c in enumerate(counts):
+            peak[i] += c
+
+    return {"questions": questions, "peaks": peaks}
+
+
+def find_mismatches(assessment):
+    """
+    Compare the counters against Answer. Returns a list of
+    (question_id, counter_counts, answer_counts) for every question that differs.
+    """
+    live = get_live_histograms(assessment)["questions"]
+    truth = get_assessment_histograms(assessment)["questions"]
+
+    mismatches = []
+    for qid in sorted(set(live) | set(truth)):
+        have = live.get(qid, empty_histogram())
+        want = truth.get(qid, empty_histogram())
+        if have != want:
+            mismatches.append((qid, have, want))
+    return mismatches
+
+
+@transaction.atomic
+def rebuild_histograms(assessment):
+    """Replace this assessment's counters with fresh counts from Answer."""
+    truth = get_assessment_histograms(assessment)["questions"]
+    QuestionHistogram.objects.filter(assessment=assessment).delete()
+    QuestionHistogram.objects.bulk_create([
+        QuestionHistogram(
+            assessment=assessment,
+            question_id=qid,
+            count_0=counts[0],
+            count_1=counts[1],
+            count_2=counts[2],
+            count_3=counts[3],
+        )
+        for qid, counts in truth.items()
+    ])
+    return len(truth)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.assessments.models import Assessment
+from apps.reports.histograms import rebuild_histograms
+
+
+class Command(BaseCommand):
+    help = "Rebuild QuestionHistogram counters from Answer rows (all launched assessments by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assessment", type=int, action="append", dest="assessment_ids",
+                            help="Only rebuild this assessment id (repeatable).")
+
+    def handle(self, *args, assessment_ids=None, **options):
+        qs = Assessment.objects.filter(launched_at__isnull=False).order_by("id")
+        if assessment_ids:
+            qs = qs.filter(id__in=assessment_ids)
+
+        total = 0
+        for assessment in qs.iterator():
+            n = rebuild_histograms(assessment)
+            total += 1
+            self.stdout.write(f"assessment {assessment.id}: {n} question rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {total} assessment(s)."))
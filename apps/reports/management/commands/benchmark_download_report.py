@@ -0,0 +1,98 @@
+import statistics
+import time
+from datetime import date
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.dummy import DummyCache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from apps.assessments.models import Assessment
+from apps.common.clients import reset_clients
+from apps.pdfexport import downloads, renderers
+from apps.pdfexport.models import FinalReport
+from apps.pdfexport.utils.storage import S3Uploader
+from apps.reports import views
+from apps.teams.models import Team
+
+
+class Rollback(Exception):
+    pass
+
+
+def per_request_uploader():
+    """The old path: a new boto3 session and S3 client on every request."""
+    return S3Uploader(
+        bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        region=settings.AWS_S3_REGION_NAME,
+        access_key=getattr(settings, "AWS_ACCESS_KEY_ID", None),
+        secret_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
+        endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL", None),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Time download_report (p50/p99): fresh S3 client per request, pooled client "
+        "(apps.common.clients), and pooled client plus the presigned URL cache. "
+        "Presigning is local, so no AWS calls are made; test rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--iterations", type=int, default=200,
+                            help="Requests per variant.")
+
+    def time_view(self, request, report_id, n):
+        views.download_report(request, report_id)  # warmup (imports, first client)
+        samples = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            response = views.download_report(request, report_id)
+            samples.append((time.perf_counter() - t0) * 1000)
+            assert response.status_code == 302
+        return sorted(samples)
+
+    def handle(self, *args, iterations=200, **options):
+        # Placeholder credentials are enough to presign when none are configured
+        overrides = {
+            "AWS_STORAGE_BUCKET_NAME": settings.AWS_STORAGE_BUCKET_NAME or "benchmark-bucket",
+            "AWS_S3_REGION_NAME": settings.AWS_S3_REGION_NAME or "us-east-1",
+            "AWS_ACCESS_KEY_ID": settings.AWS_ACCESS_KEY_ID or "benchmark",
+            "AWS_SECRET_ACCESS_KEY": settings.AWS_SECRET_ACCESS_KEY or "benchmark",
+        }
+        try:
+            with override_settings(**overrides), transaction.atomic():
+                user = get_user_model().objects.create_user("download-benchmark", "bench@example.com", "x")
+                team = Team.objects.create(name="Benchmark", admin=user)
+                assessment = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+                fr = FinalReport.objects.create(assessment=assessment, s3_key=f"reports/assessments/{assessment.id}/b.pdf")
+                request = RequestFactory().get(f"/reports/download/{fr.id}/")
+                request.user = user
+
+                no_cache = DummyCache("benchmark", {})
+                with mock.patch.object(downloads, "cache", no_cache):
+                    with mock.patch.object(renderers, "report_uploader", per_request_uploader):
+                        before = self.time_view(request, fr.id, iterations)
+                    reset_clients()
+                    pooled = self.time_view(request, fr.id, iterations)
+                cached = self.time_view(request, fr.id, iterations)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            reset_clients()
+
+        def p(samples, q):
+            return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+        self.stdout.write(f"{'client':<14}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, samples in (("per-request", before), ("pooled", pooled), ("url cache", cached)):
+            self.stdout.write(
+                f"{name:<14}{statistics.mean(samples):>10.2f}"
+                f"{statistics.median(samples):>10.2f}{p(samples, 0.99):>10.2f}"
+            )
+        for name, samples in (("pooled", pooled), ("url cache", cached)):
+            self.stdout.write(f"p50 speedup, {name}: {statistics.median(before) / statistics.median(samples):.1f}x")
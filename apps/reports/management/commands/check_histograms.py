@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.assessments.models import Assessment
+from apps.reports.histograms import find_mismatches, rebuild_histograms
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare QuestionHistogram counters against Answer rows. "
+        "Use --fix to rebuild any assessment that has drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assessment", type=int, action="append", dest="assessment_ids",
+                            help="Only check this assessment id (repeatable).")
+        parser.add_argument("--fix", action="store_true",
+                            help="Rebuild the counters of mismatched assessments from Answer.")
+
+    def handle(self, *args, assessment_ids=None, fix=False, **options):
+        qs = Assessment.objects.filter(launched_at__isnull=False).order_by("id")
+        if assessment_ids:
+            qs = qs.filter(id__in=assessment_ids)
+
+        drifted = 0
+        for assessment in qs.iterator():
+            mismatches = find_mismatches(assessment)
+            if not mismatches:
+                continue
+            drifted += 1
+            for qid, have, want in mismatches:
+                self.stdout.write(
+                    f"assessment {assessment.id} question {qid}: counters={have} answers={want}"
+                )
+            if fix:
+                rebuild_histograms(assessment)
+                self.stdout.write(f"assessment {assessment.id}: rebuilt")
+
+        if drifted and not fix:
+            raise CommandError(f"{drifted} assessment(s) have drifted counters; rerun with --fix.")
+        self.stdout.write(self.style.SUCCESS(f"Checked; {drifted} assessment(s) drifted."))
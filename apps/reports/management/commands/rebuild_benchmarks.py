@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.reports.benchmarks import update_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold new or changed ScoreSnapshots into the population BenchmarkIndex. "
+        "Use --full to rebuild from scratch (e.g. after deleting assessments)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true",
+                            help="Drop the index and rebuild it from every closed snapshot.")
+
+    def handle(self, *args, full=False, **options):
+        applied = update_index(full=full)
+        self.stdout.write(self.style.SUCCESS(f"Applied {applied} snapshot(s) to the benchmark index."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.assessments.models import Assessment
+from apps.reports.snapshots import assessments_due_for_snapshot, take_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write ScoreSnapshots for launched assessments whose deadline has passed. "
+        "Run daily from the scheduler; safe to rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--assessment", type=int, action="append", dest="assessment_ids",
+                            help="(Re)snapshot this assessment id regardless of deadline (repeatable). "
+                                 "Closed assessments keep their closed reason.")
+
+    def handle(self, *args, assessment_ids=None, **options):
+        if assessment_ids:
+            qs = Assessment.objects.filter(id__in=assessment_ids, launched_at__isnull=False)
+            reason = None  # completed / deadline if closed, else manual
+        else:
+            qs = assessments_due_for_snapshot()
+            reason = "deadline"
+
+        count = 0
+        for assessment in qs.iterator():
+            snap = take_snapshot(assessment, reason=reason)
+            count += 1
+            self.stdout.write(f"assessment {assessment.id}: {snap.input_hash[:12]}")
+
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted {count} assessment(s)."))
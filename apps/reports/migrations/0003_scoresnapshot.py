@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0004_participant_snapshots'),
+        ('reports', '0002_questionhistogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('peaks', models.JSONField(default=dict)),
+                ('questions', models.JSONField(default=list)),
+                ('input_hash', models.CharField(db_index=True, max_length=64)),
+                ('reason', models.CharField(choices=[('completed', 'All participants submitted'), ('deadline', 'Deadline passed'), ('report', 'Report requested'), ('manual', 'Manual')], default='manual', max_length=20)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('assessment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='score_snapshot', to='assessments.assessment')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_scoresnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BenchmarkIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('counts', models.JSONField(default=list)),
+                ('population', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='scoresnapshot',
+            name='benchmarked_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='scoresnapshot',
+            name='benchmarked_values',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
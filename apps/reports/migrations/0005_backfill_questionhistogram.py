@@ -0,0 +1,58 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def backfill(apps, schema_editor):
+    """
+    Set every QuestionHistogram to the counts in Answer, so answers from
+    before the counters existed are counted. Answer is locked against writes
+    (SHARE) while counting, so a submission either finishes first (and is
+    in the count) or waits until this commits (and increments on top).
+    """
+    Answer = apps.get_model("assessments", "Answer")
+    QuestionHistogram = apps.get_model("reports", "QuestionHistogram")
+
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {schema_editor.quote_name(Answer._meta.db_table)} IN SHARE MODE")
+
+    counts = {}
+    rows = (
+        Answer.objects
+        .filter(value__gte=0, value__lte=3)
+        .values_list("participant__assessment_id", "question_id", "value")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for assessment_id, question_id, value, n in rows:
+        counts.setdefault((assessment_id, question_id), [0, 0, 0, 0])[value] += n
+
+    fields = ["count_0", "count_1", "count_2", "count_3"]
+    changed = []
+    for row in QuestionHistogram.objects.all().iterator():
+        want = counts.pop((row.assessment_id, row.question_id), [0, 0, 0, 0])
+        if [getattr(row, f) for f in fields] != want:
+            for f, c in zip(fields, want):
+                setattr(row, f, c)
+            changed.append(row)
+    QuestionHistogram.objects.bulk_update(changed, fields, batch_size=1000)
+    QuestionHistogram.objects.bulk_create(
+        [
+            QuestionHistogram(assessment_id=assessment_id, question_id=question_id, **dict(zip(fields, c)))
+            for (assessment_id, question_id), c in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0004_participant_snapshots'),
+        ('reports', '0004_benchmarkindex'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -55,4 +55,85 @@ class PeakActions(models.Model):
         unique_together = ("peak", "range_label")
 
     def __str__(self):
-        return f"{self.get_peak_display()} – {self.range_label.capitalize()} Actions"
\ No newline at end of file
+        return f"{self.get_peak_display()} – {self.range_label.capitalize()} Actions"
+
+class QuestionHistogram(models.Model):
+    """
+    Running 4-bucket answer counts for one question in one assessment.
+    Incremented in the same transaction as the Answer rows, so reading scores
+    costs O(questions) instead of O(answers).
+    """
+    assessment = models.ForeignKey(
+        "assessments.Assessment", on_delete=models.CASCADE, related_name="histograms"
+    )
+    question = models.ForeignKey(
+        "assessments.Question", on_delete=models.CASCADE, related_name="histograms"
+    )
+    count_0 = models.PositiveIntegerField(default=0)
+    count_1 = models.PositiveIntegerField(default=0)
+    count_2 = models.PositiveIntegerField(default=0)
+    count_3 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("assessment", "question")
+
+    @property
+    def counts(self):
+        return [self.count_0, self.count_1, self.count_2, self.count_3]
+
+    def __str__(self):
+        return f"{self.assessment} – Q{self.question_id}: {self.counts}"
+
+
+class ScoreSnapshot(models.Model):
+    """
+    Frozen scores for one assessment, written once when it closes (last
+    participant submits or the deadline passes). Reports and analytics read
+    from here instead of re-scanning Answer rows.
+
+    peaks:     {peak_code: {"score", "range_label", "counts", "percentages"}}
+    questions: [{"id", "peak_code", "text", "counts", "health_percentage"}, ...]
+    """
+    REASON_CHOICES = [
+        ("completed", "All participants submitted"),
+        ("deadline", "Deadline passed"),
+        ("report", "Report requested"),
+        ("manual", "Manual"),
+    ]
+    # Snapshots of closed assessments; only these count towards benchmarks
+    CLOSED_REASONS = ("completed", "deadline")
+
+    assessment = models.OneToOneField(
+        "assessments.Assessment", on_delete=models.CASCADE, related_name="score_snapshot"
+    )
+    peaks = models.JSONField(default=dict)
+    questions = models.JSONField(default=list)
+    input_hash = models.CharField(max_length=64, db_index=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default="manual")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    # What this snapshot last contributed to BenchmarkIndex ({key: score}),
+    # so a refreshed snapshot can be swapped out of the index incrementally.
+    benchmarked_values = models.JSONField(null=True, blank=True)
+    benchmarked_hash = models.CharField(max_length=64, blank=True, default="")
+
+    def __str__(self):
+        return f"Scores for {self.assessment}"
+
+
+class BenchmarkIndex(models.Model):
+    """
+    Population distribution of one score across all snapshotted assessments.
+    Scores are whole percentages, so the distribution is kept as 101 counts
+    (one per score 0..100): adding/removing an assessment and looking up a
+    percentile are both constant time.
+
+    key: "peak:<code>" or "question:<question_id>"
+    """
+    key = models.CharField(max_length=40, unique=True)
+    counts = models.JSONField(default=list)
+    population = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} (n={self.population})"
@@ -0,0 +1,90 @@
+"""
+Scoring for an assessment, read from one grouped query.
+
+Every per-question and per-peak histogram comes from a single
+``GROUP BY question_id, value`` over the assessment's answers, so the cost
+is one round trip no matter how many peaks or questions there are.
+
+A histogram is always a 4-item list of counts for the values 0..3:
+[Consistently Untrue, Somewhat Untrue, Somewhat True, Consistently True]
+"""
+from django.db.models import Count
+
+from apps.assessments.models import Answer
+from apps.reports.utils import get_score_range_label
+
+
+def empty_histogram():
+    return [0, 0, 0, 0]
+
+
+def get_assessment_histograms(assessment):
+    """
+    Returns {"questions": {question_id: [c0..c3]}, "peaks": {peak_code: [c0..c3]}}
+    for every question/peak that has at least one answer in this assessment.
+    """
+    rows = (
+        Answer.objects
+        .filter(participant__assessment=assessment, value__gte=0, value__lte=3)
+        .values_list("question_id", "question__peak__code", "value")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+
+    questions, peaks = {}, {}
+    for question_id, peak_code, value, n in rows:
+        questions.setdefault(question_id, empty_histogram())[value] += n
+        peaks.setdefault(peak_code, empty_histogram())[value] += n
+
+    return {"questions": questions, "peaks": peaks}
+
+
+def rating_percentages(counts):
+    """Whole-number percentages (0-100) per value, as shown on the peak charts."""
+    total = sum(counts)
+    if not total:
+        return empty_histogram()
+    return [round((c / total) * 100) for c in counts]
+
+
+def peak_score(counts):
+    """
+    Peak percentage score. Computed from the rounded rating percentages so
+    the number matches what the report has always printed.
+    """
+    perc = rating_percentages(counts)
+    score0_3 = sum((i * p) for i, p in enumerate(perc)) / 100.0
+    return round(score0_3 * 100 / 3)
+
+
+def health_percentage(counts):
+    """Question health percentage: weighted mean of the answers on a 0-100 scale."""
+    total = sum(counts)
+    if not total:
+        return 0
+    weighted = sum(i * c for i, c in enumerate(counts))
+    return round((weighted / total) * 100 / 3)
+
+
+def range_label_for(pct):
+    return get_score_range_label(pct)
+
+
+def get_peak_scores(assessment, histograms=None):
+    """
+    Returns {peak_code: {"score", "range_label", "counts", "percentages"}}
+    for each peak that has answers.
+    """
+    if histograms is None:
+        histograms = get_assessment_histograms(assessment)
+
+    scores = {}
+    for code, counts in histograms["peaks"].items():
+        pct = peak_score(counts)
+        scores[code] = {
+            "score": pct,
+            "range_label": range_label_for(pct),
+            "counts": counts,
+            "percentages": rating_percentages(counts),
+        }
+    return scores
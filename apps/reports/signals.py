@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.reports.content import invalidate_report_content
+from apps.reports.models import PeakActions, PeakInsights, ResultsSummary
+
+
+# Any admin edit to the content tables invalidates the per-worker cache
+@receiver(post_save, sender=PeakInsights)
+@receiver(post_save, sender=PeakActions)
+@receiver(post_save, sender=ResultsSummary)
+@receiver(post_delete, sender=PeakInsights)
+@receiver(post_delete, sender=PeakActions)
+@receiver(post_delete, sender=ResultsSummary)
+def report_content_changed(sender, **kwargs):
+    invalidate_report_content()
@@ -0,0 +1,126 @@
+"""
+Persisted score snapshots (ScoreSnapshot).
+
+A snapshot is taken once an assessment closes and is what the PDF pipeline
+and analytics views read. It is built from the QuestionHistogram counters,
+so taking one costs O(questions) and never touches Answer rows. An
+assessment without counters (answers from before they existed) is scored
+from Answer instead, so it never freezes as all zeros.
+"""
+import hashlib
+import json
+
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.assessments.models import Assessment, Question
+from apps.reports.histograms import get_live_histograms
+from apps.reports.models import ScoreSnapshot
+from apps.reports.scoring import empty_histogram, get_assessment_histograms, get_peak_scores, health_percentage
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def compute_input_hash(questions):
+    """sha256 over everything the scores depend on: question ids, texts, peaks and counts."""
+    payload = [
+        [q["id"], q["peak_code"], q["text"], q["counts"]]
+        for q in sorted(questions, key=lambda q: q["id"])
+    ]
+    blob = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def build_snapshot_data(assessment, histograms=None):
+    """Return (peaks, questions, input_hash) without saving anything."""
+    if histograms is None:
+        histograms = get_live_histograms(assessment)
+        if not histograms["questions"]:
+            histograms = get_assessment_histograms(assessment)
+
+    questions = []
+    for q in Question.objects.select_related("peak").order_by("peak__code", "id"):
+        counts = histograms["questions"].get(q.id, empty_histogram())
+        questions.append({
+            "id": q.id,
+            "peak_code": q.peak.code,
+            "text": q.text,
+            "counts": counts,
+            "health_percentage": health_percentage(counts),
+        })
+
+    peaks = get_peak_scores(assessment, histograms=histograms)
+    return peaks, questions, compute_input_hash(questions)
+
+
+def closed_reason(assessment, today=None):
+    """"deadline" or "completed" once the assessment has closed, else None."""
+    today = today or timezone.localdate()
+    if assessment.deadline and assessment.deadline < today:
+        return "deadline"
+    participants = assessment.participants.all()
+    if participants.exists() and not participants.filter(has_submitted=False).exists():
+        return "completed"
+    return None
+
+
+def take_snapshot(assessment, reason=None):
+    """
+    Compute and store (or refresh) the snapshot for this assessment. Without
+    a reason, a closed assessment keeps its closed reason; an open one is "manual".
+    """
+    reason = reason or closed_reason(assessment) or "manual"
+    peaks, questions, input_hash = build_snapshot_data(assessment)
+    snap, created = ScoreSnapshot.objects.update_or_create(
+        assessment=assessment,
+        defaults={
+            "peaks": peaks,
+            "questions": questions,
+            "input_hash": input_hash,
+            "reason": reason,
+        },
+    )
+    logger.info("snapshot.%s", "created" if created else "refreshed",
+                extra={"assessment_id": assessment.id, "reason": reason, "input_hash": input_hash})
+    return snap
+
+
+def get_or_take_snapshot(assessment, reason="report"):
+    """
+    The stored snapshot, or a new one if the assessment never closed on its
+    own. A snapshot taken while the assessment was open is retaken once it closes.
+    """
+    snap = ScoreSnapshot.objects.filter(assessment=assessment).first()
+    if snap is not None and snap.reason in ScoreSnapshot.CLOSED_REASONS:
+        return snap
+    closed = closed_reason(assessment)
+    if snap is None or closed:
+        snap = take_snapshot(assessment, reason=closed or reason)
+    return snap
+
+
+def maybe_snapshot_completed(assessment):
+    """Take the snapshot once every participant has submitted."""
+    if assessment.participants.filter(has_submitted=False).exists():
+        return None
+    return take_snapshot(assessment, reason="completed")
+
+
+def assessments_due_for_snapshot(today=None):
+    """Launched assessments past their deadline without a closed snapshot (none yet, or one taken while open)."""
+    today = today or timezone.localdate()
+    return (
+        Assessment.objects
+        .filter(launched_at__isnull=False, deadline__lt=today)
+        .filter(~Q(score_snapshot__reason__in=ScoreSnapshot.CLOSED_REASONS))
+        .order_by("deadline", "id")
+    )
+
+
+def questions_by_peak(snapshot):
+    """{peak_code: [question rows]} in the stored order."""
+    grouped = {}
+    for q in snapshot.questions:
+        grouped.setdefault(q["peak_code"], []).append(q)
+    return grouped
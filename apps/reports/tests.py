@@ -1,3 +1,340 @@
-from django.test import TestCase
+from collections import Counter
+from io import StringIO
+from datetime import date
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from apps.assessments.models import (
+    Answer,
+    Assessment,
+    AssessmentParticipant,
+    Peak,
+    Question,
+)
+from apps.reports import benchmarks, content, histograms, scoring, snapshots, trends
+from apps.reports.models import BenchmarkIndex, PeakInsights
+from apps.teams.models import Team
+
+
+def legacy_peak_distribution(assessment, peak_code):
+    """The per-peak query the PDF pipeline used before the scoring module."""
+    questions = Question.objects.filter(peak__code=peak_code)
+    answers = Answer.objects.filter(
+        participant__assessment=assessment, question__in=questions
+    ).values_list("value", flat=True)
+    total = len(answers)
+    counter = Counter(answers)
+    if total == 0:
+        return [0, 0, 0, 0]
+    return [round((counter.get(i, 0) / total) * 100) for i in range(4)]
+
+
+def legacy_question_row(assessment, question):
+    """The per-question loop the PDF pipeline used before the scoring module."""
+    answers = Answer.objects.filter(participant__in=assessment.participants.all())
+    counts = [0, 0, 0, 0]
+    for a in answers.filter(question=question):
+        if 0 <= a.value <= 3:
+            counts[a.value] += 1
+    total = sum(counts)
+    if total:
+        weighted = sum(i * c for i, c in enumerate(counts))
+        hp = round((weighted / total) * 100 / 3)
+    else:
+        hp = 0
+    return counts, hp
+
+
+class ScoringMatchesLegacyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("admin", "admin@example.com", "pw")
+        team = Team.objects.create(name="Imperials", admin=user)
+        cls.assessment = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+        other = Assessment.objects.create(team=team, deadline=date(2025, 12, 31))
+
+        cls.peaks = [
+            Peak.objects.create(code="CC", name="Collaborative Culture"),
+            Peak.objects.create(code="LA", name="Leadership Accountability"),
+            Peak.objects.create(code="SM", name="Strategic Momentum"),
+            Peak.objects.create(code="TM", name="Talent Magnetism"),
+        ]
+        cls.questions = []
+        for peak in cls.peaks[:3]:  # TM intentionally has no questions
+            for n in range(3):
+                cls.questions.append(
+                    Question.objects.create(peak=peak, text=f"{peak.code} q{n}", order=n)
+                )
+
+        # Uneven answers so rounding differences would show up
+        for p in range(7):
+            participant = AssessmentParticipant.objects.create(
+                assessment=cls.assessment, member_name=f"P{p}"
+            )
+            for i, q in enumerate(cls.questions):
+                if (p + i) % 5 == 0:
+                    continue  # skipped question
+                Answer.objects.create(participant=participant, question=q, value=(p * 7 + i * 3) % 4)
+
+        # Answers on another assessment must not leak in
+        outsider = AssessmentParticipant.objects.create(assessment=other, member_name="X")
+        for q in cls.questions:
+            Answer.objects.create(participant=outsider, question=q, value=3)
+
+    def test_histograms_use_one_query(self):
+        with self.assertNumQueries(1):
+            scoring.get_assessment_histograms(self.assessment)
+
+    def test_peak_percentages_and_scores_match(self):
+        hist = scoring.get_assessment_histograms(self.assessment)
+        for peak in self.peaks:
+            counts = hist["peaks"].get(peak.code, scoring.empty_histogram())
+            legacy = legacy_peak_distribution(self.assessment, peak.code)
+            self.assertEqual(scoring.rating_percentages(counts), legacy)
+
+            legacy_score = round(sum(i * p for i, p in enumerate(legacy)) / 100.0 * 100 / 3)
+            self.assertEqual(scoring.peak_score(counts), legacy_score)
+
+    def test_question_counts_and_health_match(self):
+        hist = scoring.get_assessment_histograms(self.assessment)
+        for q in self.questions:
+            counts = hist["questions"].get(q.id, scoring.empty_histogram())
+            legacy_counts, legacy_hp = legacy_question_row(self.assessment, q)
+            self.assertEqual(counts, legacy_counts)
+            self.assertEqual(scoring.health_percentage(counts), legacy_hp)
+
+    def test_peak_scores_skip_unanswered_peaks(self):
+        scores = scoring.get_peak_scores(self.assessment)
+        self.assertEqual(set(scores), {"CC", "LA", "SM"})
+        for row in scores.values():
+            self.assertIn(row["range_label"], ("LOW", "MEDIUM", "HIGH"))
+
+
+class SubmissionFixture:
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("admin", "admin@example.com", "pw")
+        team = Team.objects.create(name="Imperials", admin=user)
+        cls.assessment = Assessment.objects.create(team=team, deadline=date(2025, 9, 30))
+        peak = Peak.objects.create(code="CC", name="Collaborative Culture")
+        cls.questions = [Question.objects.create(peak=peak, text=f"q{n}") for n in range(3)]
+
+    def submit(self, values):
+        participant = AssessmentParticipant.objects.create(assessment=self.assessment)
+        for q, v in zip(self.questions, values):
+            Answer.objects.create(participant=participant, question=q, value=v)
+        histograms.record_answers(
+            self.assessment, {q.id: v for q, v in zip(self.questions, values)}
+        )
+
+
+class HistogramCounterTests(SubmissionFixture, TestCase):
+    def test_counters_match_answers(self):
+        self.submit([0, 3, 2])
+        self.submit([3, 3, 1])
+        self.assertEqual(
+            histograms.get_live_histograms(self.assessment),
+            scoring.get_assessment_histograms(self.assessment),
+        )
+        self.assertEqual(histograms.find_mismatches(self.assessment), [])
+
+    def test_rebuild_repairs_drift(self):
+        self.submit([1, 2, 3])
+        Answer.objects.filter(question=self.questions[0]).update(value=0)
+        self.assertEqual(len(histograms.find_mismatches(self.assessment)), 1)
+
+        histograms.rebuild_histograms(self.assessment)
+        self.assertEqual(histograms.find_mismatches(self.assessment), [])
+
+    def test_migration_backfills_answers_from_before_the_counters(self):
+        from importlib import import_module
+        from unittest import mock
+
+        from django.apps import apps
+        from django.db import connection
+
+        from apps.reports.models import QuestionHistogram
+
+        self.submit([1, 2, 3])
+        participant = AssessmentParticipant.objects.create(assessment=self.assessment)
+        Answer.objects.create(participant=participant, question=self.questions[0], value=0)  # no counter update
+        row_ids = set(QuestionHistogram.objects.values_list("id", flat=True))
+
+        backfill = import_module("apps.reports.migrations.0005_backfill_questionhistogram").backfill
+        backfill(apps, mock.Mock(connection=connection))
+        self.assertEqual(histograms.find_mismatches(self.assessment), [])
+        self.assertEqual(set(QuestionHistogram.objects.values_list("id", flat=True)), row_ids)  # updated in place
+
+
+class ScoreSnapshotTests(SubmissionFixture, TestCase):
+    def test_snapshot_freezes_scores(self):
+        self.submit([0, 3, 2])
+        snap = snapshots.take_snapshot(self.assessment, reason="completed")
+        self.assertEqual(snap.peaks, scoring.get_peak_scores(self.assessment))
+        self.assertEqual([q["counts"] for q in snap.questions], [[1, 0, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]])
+
+        # Later answers don't move the stored snapshot, but do change the hash
+        old_hash = snap.input_hash
+        self.submit([3, 3, 3])
+        self.assertEqual(snapshots.get_or_take_snapshot(self.assessment).input_hash, old_hash)
+        self.assertNotEqual(snapshots.take_snapshot(self.assessment).input_hash, old_hash)
+
+    def test_report_snapshot_of_an_open_assessment_is_retaken_once_it_closes(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        Assessment.objects.filter(id=self.assessment.id).update(
+            deadline=date.today() + timedelta(days=7), launched_at=timezone.now()
+        )
+        self.assessment.refresh_from_db()
+        AssessmentParticipant.objects.create(assessment=self.assessment)  # not submitted yet
+        self.submit([0, 0, 0])
+        self.assertEqual(snapshots.get_or_take_snapshot(self.assessment).reason, "report")
+
+        self.submit([3, 3, 3])
+        Assessment.objects.filter(id=self.assessment.id).update(deadline=date.today() - timedelta(days=1))
+        self.assessment.refresh_from_db()
+        self.assertEqual(list(snapshots.assessments_due_for_snapshot()), [self.assessment])
+
+        snap = snapshots.get_or_take_snapshot(self.assessment)
+        self.assertEqual(snap.reason, "deadline")
+        self.assertEqual([q["counts"] for q in snap.questions][0], [1, 0, 0, 1])
+        self.assertEqual(list(snapshots.assessments_due_for_snapshot()), [])
+
+    def test_resnapshot_keeps_the_closed_reason(self):
+        from django.core.management import call_command
+
+        from apps.reports.models import ScoreSnapshot
+
+        Assessment.objects.filter(id=self.assessment.id).update(
+            deadline=date(2099, 1, 1), launched_at=self.assessment.created_at
+        )
+        self.assessment.refresh_from_db()
+        AssessmentParticipant.objects.create(assessment=self.assessment, has_submitted=True)
+        snapshots.maybe_snapshot_completed(self.assessment)
+
+        call_command("snapshot_scores", assessment_ids=[self.assessment.id], stdout=StringIO())
+        self.assertEqual(ScoreSnapshot.objects.get(assessment=self.assessment).reason, "completed")
+
+        AssessmentParticipant.objects.create(assessment=self.assessment)  # reopened
+        self.assertEqual(snapshots.take_snapshot(self.assessment).reason, "manual")
+
+    def test_answers_without_counters_are_scored_from_answer(self):
+        # Submitted before the counters existed, never backfilled
+        participant = AssessmentParticipant.objects.create(assessment=self.assessment)
+        for q, v in zip(self.questions, [3, 2, 3]):
+            Answer.objects.create(participant=participant, question=q, value=v)
+
+        snap = snapshots.take_snapshot(self.assessment, reason="completed")
+        self.assertEqual([q["counts"] for q in snap.questions], [[0, 0, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]])
+        self.assertEqual(snap.peaks, scoring.get_peak_scores(self.assessment))
+
+
+@override_settings(REPORT_BENCHMARK_MIN_POPULATION=1)
+class BenchmarkIndexTests(SubmissionFixture, TestCase):
+    def test_percentile_counts_ties_as_half(self):
+        counts = [0] * benchmarks.SCORE_BUCKETS
+        counts[10] = counts[50] = counts[90] = 1
+        self.assertEqual(benchmarks.percentile(counts, 50), 50)
+        self.assertEqual(benchmarks.percentile(counts, 100), 100)
+        self.assertIsNone(benchmarks.percentile([0] * benchmarks.SCORE_BUCKETS, 50))
+
+    def test_refreshed_snapshot_replaces_its_old_values(self):
+        self.submit([0, 0, 0])
+        snap = snapshots.take_snapshot(self.assessment, reason="completed")
+        self.assertEqual(benchmarks.update_index(), 1)
+        self.assertEqual(benchmarks.update_index(), 0)
+
+        self.submit([3, 3, 3])
+        snap = snapshots.take_snapshot(self.assessment, reason="completed")
+        self.assertEqual(benchmarks.update_index(), 1)
+
+        row = BenchmarkIndex.objects.get(key="peak:CC")
+        self.assertEqual(row.population, 1)
+        self.assertEqual(row.counts[snap.peaks["CC"]["score"]], 1)
+        self.assertEqual(benchmarks.load_benchmarks(snap)["peaks"], {"CC": 50})
+
+    def test_only_closed_assessments_are_counted(self):
+        self.submit([3, 3, 3])
+        snapshots.take_snapshot(self.assessment, reason="report")
+        self.assertEqual(benchmarks.update_index(), 0)
+        self.assertFalse(BenchmarkIndex.objects.exists())
+
+        snapshots.take_snapshot(self.assessment, reason="completed")
+        self.assertEqual(benchmarks.update_index(), 1)
+        self.assertEqual(BenchmarkIndex.objects.get(key="peak:CC").population, 1)
+
+        # Re-snapshotted manually (e.g. reopened): its values leave the index
+        snapshots.take_snapshot(self.assessment, reason="manual")
+        self.assertEqual(benchmarks.update_index(), 1)
+        self.assertEqual(BenchmarkIndex.objects.get(key="peak:CC").population, 0)
+        self.assertEqual(benchmarks.update_index(), 0)
+
+
+class TeamTrendTests(SubmissionFixture, TestCase):
+    def test_trends_follow_deadline_order(self):
+        self.submit([3, 3, 3])
+        snapshots.take_snapshot(self.assessment)
+
+        earlier = Assessment.objects.create(
+            team=self.assessment.team, deadline=date(2025, 6, 30), launched_at=self.assessment.created_at
+        )
+        self.assessment.launched_at = self.assessment.created_at
+        self.assessment.save(update_fields=["launched_at"])
+        participant = AssessmentParticipant.objects.create(assessment=earlier)
+        Answer.objects.create(participant=participant, question=self.questions[0], value=0)
+        histograms.record_answers(earlier, {self.questions[0].id: 0})
+        snapshots.take_snapshot(earlier)
+
+        with self.assertNumQueries(1):
+            result = trends.get_team_trends(self.assessment.team)
+        self.assertEqual(result["labels"], ["Jun 2025", "Sep 2025"])
+        self.assertEqual(result["peaks"]["CC"], [0, 100])
+        self.assertEqual(result["questions"][1]["scores"], [None, 100])
+
+        self.assertEqual(len(trends.get_team_trends(self.assessment.team, until=earlier)["labels"]), 1)
+
+    def test_trend_charts_are_cached_and_need_two_snapshots(self):
+        from unittest import mock
+
+        from apps.pdfexport.utils.chart_cache import chart_cache
+
+        self.submit([3, 2, 1])
+        snapshots.take_snapshot(self.assessment)
+        self.client.force_login(self.assessment.team.admin)
+        self.assertNotContains(self.client.get("/reports/overview/"), f"/reports/trends/{self.assessment.team.id}/")
+
+        earlier = Assessment.objects.create(
+            team=self.assessment.team, deadline=date(2025, 6, 30), launched_at=self.assessment.created_at
+        )
+        self.assessment.launched_at = self.assessment.created_at
+        self.assessment.save(update_fields=["launched_at"])
+        snapshots.take_snapshot(earlier)
+        self.assertContains(self.client.get("/reports/overview/"), f"/reports/trends/{self.assessment.team.id}/")
+
+        chart_cache.clear()
+        with mock.patch("apps.pdfexport.utils.chart_pool.render_charts",
+                        side_effect=lambda jobs: [b"png"] * len(jobs)) as render:
+            self.client.get(f"/reports/trends/{self.assessment.team.id}/")
+            self.client.get(f"/reports/trends/{self.assessment.team.id}/")
+        render.assert_called_once()
+        self.assertEqual(len(render.call_args.args[0]), 1 + 3)  # CC + three questions
+
+
+class ReportContentCacheTests(TestCase):
+    def test_loaded_once_and_dropped_on_edit(self):
+        row = PeakInsights.objects.create(peak="CC", range_label="LOW", insight_text="* **first**")
+        first = content.get_report_content()
+        self.assertEqual(first.insights[("CC", "LOW")], "<ul>\n<li><strong>first</strong></li>\n</ul>")
+
+        with self.assertNumQueries(0):
+            self.assertIs(content.get_report_content(), first)
+
+        row.insight_text = "second"
+        row.save()
+        self.assertEqual(content.get_report_content().insights[("CC", "LOW")], "<p>second</p>")
+
+        row.delete()
+        self.assertNotIn(("CC", "LOW"), content.get_report_content().insights)
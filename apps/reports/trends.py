@@ -0,0 +1,94 @@
+"""
+Score trends across a team's successive assessments.
+
+Everything comes from the stored ScoreSnapshots (one query), so the cost
+grows with the number of assessments, not with the number of answers.
+"""
+from apps.reports.models import ScoreSnapshot
+
+
+def get_team_trends(team, until=None):
+    """
+    Returns:
+      {
+        "assessments": [Assessment, ...]            # oldest first
+        "labels": ["Mar 2025", ...],
+        "peaks": {code: [score | None, ...]},
+        "questions": [{"id", "peak_code", "text", "scores": [...]}, ...],
+      }
+    until: optional Assessment; later assessments are left out (used by the report).
+    """
+    qs = (
+        ScoreSnapshot.objects
+        .filter(assessment__team=team, assessment__launched_at__isnull=False)
+        .select_related("assessment")
+        .order_by("assessment__deadline", "assessment__id")
+    )
+    if until is not None:
+        qs = qs.filter(assessment__deadline__lte=until.deadline)
+
+    snapshots = list(qs)
+    n = len(snapshots)
+
+    peaks = {}
+    questions = {}
+    for i, snap in enumerate(snapshots):
+        for code, row in snap.peaks.items():
+            peaks.setdefault(code, [None] * n)[i] = row["score"]
+        for q in snap.questions:
+            if not sum(q["counts"]):
+                continue
+            entry = questions.setdefault(q["id"], {
+                "id": q["id"],
+                "peak_code": q["peak_code"],
+                "text": q["text"],
+                "scores": [None] * n,
+            })
+            entry["text"] = q["text"]  # latest wording wins
+            entry["scores"][i] = q["health_percentage"]
+
+    return {
+        "assessments": [s.assessment for s in snapshots],
+        "labels": [f"{s.assessment.deadline:%b %Y}" for s in snapshots],
+        "peaks": peaks,
+        "questions": sorted(questions.values(), key=lambda q: (q["peak_code"], q["id"])),
+    }
+
+
+def render_trend_charts(trends, include_questions=True):
+    """
+    Adds a "chart_data_uri" to every peak/question series. Returns
+    (peak_rows, question_rows) ready for templates; peak_rows follow the
+    canonical peak order.
+    """
+    from apps.assessments.models import Peak
+    from apps.pdfexport.utils.chart_cache import chart_cache
+    from apps.pdfexport.utils.chart_pool import render_charts
+    from apps.pdfexport.utils.images import png_bytes_to_data_uri
+
+    labels = trends["labels"]
+
+    names = dict(Peak.objects.values_list("code", "name"))
+    peak_rows = [
+        {"code": code, "name": names.get(code, code), "scores": scores}
+        for code, scores in sorted(trends["peaks"].items())
+    ]
+
+    question_rows = []
+    if include_questions:
+        for q in trends["questions"]:
+            question_rows.append({**q, "peak_name": names.get(q["peak_code"], q["peak_code"])})
+
+    # One batch for every chart not already cached; the title is not drawn
+    rows = peak_rows + question_rows
+    uris = chart_cache.get_or_render_many(
+        [
+            ("trend", [labels, row["scores"]], ("trend", (row.get("name") or row["text"], labels, row["scores"])))
+            for row in rows
+        ],
+        lambda jobs: [png_bytes_to_data_uri(png) for png in render_charts(jobs)],
+    )
+    for row, uri in zip(rows, uris):
+        row["chart_data_uri"] = uri
+
+    return peak_rows, question_rows
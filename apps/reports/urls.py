@@ -6,4 +6,5 @@ app_name = "reports"
 urlpatterns = [
     path('overview/', views.reports_overview, name='reports_overview'),
     path('download/<int:report_id>/', views.download_report, name='download_report'),
+    path('trends/<int:team_id>/', views.team_trends, name='team_trends'),
 ]
\ No newline at end of file
@@ -1,9 +1,11 @@
-from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db.models import Count
 from django.shortcuts import render, get_object_or_404, redirect
 
 from apps.pdfexport.models import FinalReport
-from apps.pdfexport.utils.storage import S3Uploader
+from apps.reports.trends import get_team_trends, render_trend_charts
+from apps.teams.models import Team
+from apps.pdfexport.downloads import report_download_url
 from apps.pdfexport.views import build_report_filenames
 
 
@@ -20,8 +22,35 @@ def reports_overview(request):
         .select_related('assessment', 'assessment__team')
         .order_by('-created_at')
     )
+    # A trend needs at least two snapshotted assessments
+    teams_with_history = (
+        Team.objects
+        .filter(admin=request.user)
+        .annotate(n_snapshots=Count('assessments__score_snapshot'))
+        .filter(n_snapshots__gte=2)
+        .order_by('name')
+    )
     return render(request, 'reports/overview.html', {
         'reports': reports,
+        'teams_with_history': teams_with_history,
+    })
+
+
+@login_required
+def team_trends(request, team_id: int):
+    """
+    Each peak's and question's score across all of a team's launched
+    assessments, as small-multiple trend charts. Reads stored snapshots only.
+    """
+    team = get_object_or_404(Team, id=team_id, admin=request.user)
+    trends = get_team_trends(team)
+    peak_rows, question_rows = render_trend_charts(trends)
+
+    return render(request, 'reports/trends.html', {
+        'team': team,
+        'labels': trends['labels'],
+        'peak_rows': peak_rows,
+        'question_rows': question_rows,
     })
 
 
@@ -44,17 +73,5 @@ def download_report(request, report_id: int):
     # Build a user-friendly filename like "Imperials – September 2025.pdf"
     pretty_name, _slug_name = build_report_filenames(fr.assessment)
 
-    uploader = S3Uploader(
-        bucket=settings.AWS_STORAGE_BUCKET_NAME,
-        region=settings.AWS_S3_REGION_NAME,
-        access_key=getattr(settings, "AWS_ACCESS_KEY_ID", None),
-        secret_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
-    )
-
-    url = uploader.presign_get(
-        fr.s3_key,
-        expires_seconds=300,
-        pretty_filename=pretty_name,
-        content_type="application/pdf",
-    )
+    url = report_download_url(fr, pretty_filename=pretty_name, content_type="application/pdf")
     return redirect(url)
\ No newline at end of file
@@ -77,6 +77,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.humanize',
     # my apps
     'apps.accounts.apps.AccountsConfig',
     'apps.assessments.apps.AssessmentsConfig',
@@ -142,6 +143,34 @@ DATABASES = {
 }
 
 
+# Cache
+# Workers share state through the cache (report content version, DocRaptor job
+# metadata), so production needs a backend every gunicorn worker can see.
+# "db" needs a one-off `python manage.py createcachetable`.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "db" if IS_PRODUCTION else "locmem").lower()
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        }
+    }
+elif CACHE_BACKEND == "db":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -228,12 +257,100 @@ DOCRAPTOR_API_KEY = os.getenv("DOCRAPTOR_API_KEY", "")
 DOCRAPTOR_TEST = env_bool("DOCRAPTOR_TEST", True)
 INTERNAL_WEBHOOK_TOKEN = os.getenv("INTERNAL_WEBHOOK_TOKEN", "") # assigned to secure internal DocRaptor enqueue URL
 
+# --- Report PDF rendering ---
+# "docraptor" (async API) or "weasyprint" (local); ?renderer= overrides per job
+REPORT_PDF_RENDERER = os.getenv("REPORT_PDF_RENDERER", "docraptor").lower()
+# WeasyPrint runs in its own worker processes, replaced after N reports
+REPORT_WEASYPRINT_WORKERS = int(os.getenv("REPORT_WEASYPRINT_WORKERS", "1"))
+REPORT_WEASYPRINT_MAX_TASKS = int(os.getenv("REPORT_WEASYPRINT_MAX_TASKS", "20"))
+REPORT_WEASYPRINT_TIMEOUT = int(os.getenv("REPORT_WEASYPRINT_TIMEOUT", "300"))
+
+# How DocRaptor gets the HTML: "inline" (document_content) or "staged" (HTML and
+# data-URI assets uploaded to REPORT_STAGING_PREFIX in S3, sent as document_url).
+# Expire that prefix with an S3 lifecycle rule.
+REPORT_DOCRAPTOR_DELIVERY = os.getenv("REPORT_DOCRAPTOR_DELIVERY", "inline")
+REPORT_STAGING_PREFIX = os.getenv("REPORT_STAGING_PREFIX", "report-staging/")
+REPORT_STAGING_URL_TTL = int(os.getenv("REPORT_STAGING_URL_TTL", "3600"))
+
+# --- Report job queue (manage.py run_report_workers) ---
+REPORT_JOB_LEASE_SECONDS = int(os.getenv("REPORT_JOB_LEASE_SECONDS", "120"))
+REPORT_JOB_MAX_ATTEMPTS = int(os.getenv("REPORT_JOB_MAX_ATTEMPTS", "5"))
+REPORT_JOB_RETRY_BASE_SECONDS = int(os.getenv("REPORT_JOB_RETRY_BASE_SECONDS", "30"))
+REPORT_JOB_RETRY_MAX_SECONDS = int(os.getenv("REPORT_JOB_RETRY_MAX_SECONDS", "1800"))
+REPORT_JOB_POLL_SECONDS = float(os.getenv("REPORT_JOB_POLL_SECONDS", "2"))
+
+# --- Report pre-rendering (manage.py prerender_reports) ---
+# Report HTML is built ahead of payment for assessments closed in the last MAX_AGE_DAYS,
+# BATCH per sweep, PAUSE_SECONDS apart, and never while report jobs are queued or running
+REPORT_PRERENDER_INTERVAL = float(os.getenv("REPORT_PRERENDER_INTERVAL", "300"))
+REPORT_PRERENDER_BATCH = int(os.getenv("REPORT_PRERENDER_BATCH", "5"))
+REPORT_PRERENDER_PAUSE_SECONDS = float(os.getenv("REPORT_PRERENDER_PAUSE_SECONDS", "5"))
+REPORT_PRERENDER_MAX_AGE_DAYS = int(os.getenv("REPORT_PRERENDER_MAX_AGE_DAYS", "14"))
+REPORT_PRERENDER_NICE = int(os.getenv("REPORT_PRERENDER_NICE", "10"))
+# S3 prefix of the pre-rendered HTML; expire it with a lifecycle rule
+REPORT_PRERENDER_PREFIX = os.getenv("REPORT_PRERENDER_PREFIX", "report-prerender/")
+
+# --- DocRaptor watcher (manage.py watch_docraptor) ---
+# Per-job status checks back off from MIN to MAX seconds
+REPORT_WATCH_MIN_INTERVAL = float(os.getenv("REPORT_WATCH_MIN_INTERVAL", "2"))
+REPORT_WATCH_MAX_INTERVAL = float(os.getenv("REPORT_WATCH_MAX_INTERVAL", "30"))
+# Jobs not stored after this many checks (~1h at the max interval) are failed
+REPORT_WATCH_MAX_CHECKS = int(os.getenv("REPORT_WATCH_MAX_CHECKS", "120"))
+
+# --- Report progress on the success page ---
+# SSE stream (payments:report_events, ASGI only): cache read per tick, browser reconnects after MAX
+REPORT_EVENTS_TICK_SECONDS = float(os.getenv("REPORT_EVENTS_TICK_SECONDS", "1"))
+REPORT_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("REPORT_EVENTS_HEARTBEAT_SECONDS", "15"))
+REPORT_EVENTS_MAX_SECONDS = float(os.getenv("REPORT_EVENTS_MAX_SECONDS", "300"))
+# HTMX polling fallback backs off from 3s up to this
+REPORT_POLL_MAX_SECONDS = int(os.getenv("REPORT_POLL_MAX_SECONDS", "30"))
+
+
+# --- Report benchmarks ---
+# Percentiles are only printed once this many assessments are in the population
+REPORT_BENCHMARK_MIN_POPULATION = int(os.getenv("REPORT_BENCHMARK_MIN_POPULATION", "10"))
+
+
+# --- Report charts ---
+# In-process LRU size, and whether to also keep chart images in the shared cache
+REPORT_CHART_CACHE_SIZE = int(os.getenv("REPORT_CHART_CACHE_SIZE", "512"))
+REPORT_CHART_CACHE_SHARED = env_bool("REPORT_CHART_CACHE_SHARED", IS_PRODUCTION)
+# "png" (matplotlib data URIs) or "svg" (inline vector markup); ?charts= overrides per report
+REPORT_CHART_FORMAT = os.getenv("REPORT_CHART_FORMAT", "png").lower()
+# Worker processes drawing PNG charts (0 = draw in the web process), and how many
+# charts each worker draws before it is replaced
+REPORT_CHART_POOL_SIZE = int(os.getenv("REPORT_CHART_POOL_SIZE", "2" if IS_PRODUCTION else "0"))
+REPORT_CHART_POOL_MAX_TASKS = int(os.getenv("REPORT_CHART_POOL_MAX_TASKS", "200"))
+# PNG charts with at most this many colours are stored as exact palette images, the rest
+# are only recompressed (0 = keep truecolour). LOSSY quantizes every chart to that many
+# colours instead: about a third of the size, at the cost of shifted anti-aliased edges.
+REPORT_CHART_PALETTE_COLORS = int(os.getenv("REPORT_CHART_PALETTE_COLORS", "256"))
+REPORT_CHART_PALETTE_LOSSY = os.getenv("REPORT_CHART_PALETTE_LOSSY", "false").lower() == "true"
+# Expected report HTML size; the "[PDF] HTML size" log line reports against it
+REPORT_HTML_BUDGET_BYTES = int(os.getenv("REPORT_HTML_BUDGET_BYTES", str(1024 * 1024)))
+# Report HTML is rendered in pieces (questions per chunk) into a temp file kept
+# in memory up to REPORT_HTML_SPOOL_MAX_BYTES
+REPORT_HTML_CHUNK_QUESTIONS = int(os.getenv("REPORT_HTML_CHUNK_QUESTIONS", "20"))
+REPORT_HTML_SPOOL_MAX_BYTES = int(os.getenv("REPORT_HTML_SPOOL_MAX_BYTES", str(1024 * 1024)))
+
+# Report fonts/CSS/images: "bundle" inlines the prebuilt asset bundle
+# (manage.py build_report_assets, run by bin/post_compile), "static" links static URLs
+REPORT_ASSETS = os.getenv("REPORT_ASSETS", "bundle")
+REPORT_ASSET_BUNDLE_DIR = os.getenv("REPORT_ASSET_BUNDLE_DIR", str(BASE_DIR / "build" / "report-assets"))
+REPORT_ASSET_DPI = int(os.getenv("REPORT_ASSET_DPI", "300"))
+
 
 # --- AWS / S3 (Reports storage) ---
 AWS_STORAGE_BUCKET_NAME = os.getenv("AWS_STORAGE_BUCKET_NAME", "")
 AWS_S3_REGION_NAME = os.getenv("AWS_S3_REGION_NAME", "")  # e.g., "ca-central-1"
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID", "")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY", "")
+# Local S3 stand-in (MinIO, moto_server) for dev/tests; empty = real S3
+AWS_S3_ENDPOINT_URL = os.getenv("AWS_S3_ENDPOINT_URL", "")
+
+# Streamed DocRaptor -> S3 copies: multipart part size and parts in flight
+REPORT_S3_PART_SIZE_MB = int(os.getenv("REPORT_S3_PART_SIZE_MB", "8"))
+REPORT_S3_UPLOAD_WORKERS = int(os.getenv("REPORT_S3_UPLOAD_WORKERS", "4"))
 
 # We use boto3 on the server to:
 #  - upload the final PDF to a private S3 bucket
@@ -247,6 +364,19 @@ REPORTS_S3_PREFIX = os.getenv("REPORTS_S3_PREFIX", "final-reports/")
 # Signature version for pre-signed URLs
 AWS_S3_SIGNATURE_VERSION = os.getenv("AWS_S3_SIGNATURE_VERSION", "s3v4")
 
+# Presigned report download URLs: lifetime, and how long before expiry a cached one stops being reused
+REPORT_DOWNLOAD_URL_TTL = int(os.getenv("REPORT_DOWNLOAD_URL_TTL", "300"))
+REPORT_DOWNLOAD_URL_MARGIN = int(os.getenv("REPORT_DOWNLOAD_URL_MARGIN", "60"))
+
+
+# --- Outbound clients (apps.common.clients: one pooled client per process) ---
+OUTBOUND_CONNECT_TIMEOUT = float(os.getenv("OUTBOUND_CONNECT_TIMEOUT", "5"))
+OUTBOUND_READ_TIMEOUT = float(os.getenv("OUTBOUND_READ_TIMEOUT", "60"))
+OUTBOUND_HTTP_RETRIES = int(os.getenv("OUTBOUND_HTTP_RETRIES", "3"))
+OUTBOUND_HTTP_POOL_SIZE = int(os.getenv("OUTBOUND_HTTP_POOL_SIZE", "10"))
+OUTBOUND_S3_POOL_SIZE = int(os.getenv("OUTBOUND_S3_POOL_SIZE", "10"))  # >= REPORT_S3_UPLOAD_WORKERS
+STRIPE_MAX_NETWORK_RETRIES = int(os.getenv("STRIPE_MAX_NETWORK_RETRIES", "2"))
+
 
 # --- Stripe ---
 STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY", "")